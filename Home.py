@@ -1,24 +1,30 @@
+import os
+
 import streamlit as st
-from PIL import Image
-import base64
-from io import BytesIO
 
-# Ruta al logo (debe estar en el mismo directorio o usar ruta relativa desde /page)
-LOGO_PATH = "Picus BG.png"
+# Home no importa pandas ni lee datos; la caché se precarga en otro hilo
+from picus.arranque import precargar_en_segundo_plano
+from picus.instrumentacion import cerrar_pagina, iniciar_pagina
 
-# Convertir logo a base64 para manejo de modo oscuro/claro
-@st.cache_data
-def image_to_base64(img_path):
-    with open(img_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode()
+iniciar_pagina("Inicio")
 
-logo_b64 = image_to_base64(LOGO_PATH)
+# El logo se sirve como archivo estático (static/, ver .streamlit/config.toml):
+# el navegador lo guarda en caché en lugar de recibirlo en base64 en cada carga
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "Picus BG.png")
+LOGO_URL = "app/static/Picus%20BG.png"
 
 # Mostrar encabezado con logo
-st.markdown(f"""
-    <div style='text-align: center;'>
-        <img src="data:image/png;base64,{logo_b64}" style="height: 120px; margin-bottom: 20px;">
-    </div>
+if st.get_option("server.enableStaticServing"):
+    st.markdown(f"""
+        <div style='text-align: center;'>
+            <img src="{LOGO_URL}" style="height: 120px; margin-bottom: 20px;">
+        </div>
+    """, unsafe_allow_html=True)
+else:
+    # Sin la configuración del proyecto (se arrancó desde otra carpeta) se sirve como archivo de medios
+    _, centro, _ = st.columns([2, 1, 2])
+    centro.image(LOGO_PATH)
+st.markdown("""
     <h1 style='text-align: center; color: #003366;'>Sistema Cotizador PICUS</h1>
     <p style='text-align: center;'>Control de rutas, costos, programación y simulación de utilidad</p>
     <hr style='margin-top: 20px; margin-bottom: 30px;'>
@@ -33,6 +39,13 @@ st.markdown("""
 - **🚚 Programación de Viajes:** Registro y simulación de tráficos ida y vuelta
 - **🗂️ Gestión de Rutas:** Editar y eliminar rutas existentes
 - **📂 Archivos:** Descargar / cargar respaldos de datos
+- **📊 Análisis de Rentabilidad:** Utilidad y margen por cliente, carril, tipo, modo y mes
+- **🌡️ Sensibilidad de Costos:** Utilidad del catálogo ante cambios de diesel, tipo de cambio, rendimiento y pago por KM
 """)
 
 st.info("Selecciona una opción desde el menú lateral para comenzar")
+
+cerrar_pagina()
+
+# Al final, cuando la portada ya se envió al navegador, para no competir con ella
+precargar_en_segundo_plano()
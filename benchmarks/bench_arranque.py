@@ -0,0 +1,100 @@
+"""Tiempo de arranque: de proceso nuevo a portada pintada, en frío y en tibio.
+
+Cada repetición lanza un proceso nuevo (como un contenedor recién levantado)
+que ejecuta Home con el AppTest de Streamlit sobre un catálogo sintético,
+vuelve a ejecutarlo (tibio) y, tras una pausa como la de un usuario leyendo
+la portada, abre Programación de Viajes dos veces. Se compara con y sin la
+precarga de cachés en segundo plano (PICUS_PRECARGA).
+
+Uso: python benchmarks/bench_arranque.py [n_rutas] [repeticiones] [pausa_s]
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOME = os.path.join(RAIZ, "Home.py")
+PAGINA = os.path.join(RAIZ, "pages", "3_🚚 Programación de Viajes.py")
+
+
+def hijo(pausa):
+    # Corre en el proceso nuevo, con el directorio de trabajo ya preparado
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    def correr(script):
+        t = time.perf_counter()
+        at = AppTest.from_file(script, default_timeout=300).run()
+        if at.exception:
+            raise RuntimeError(f"{os.path.basename(script)}: {at.exception[0].value}")
+        return time.perf_counter() - t
+
+    portada = correr(HOME)
+    tiempos = {"importar_streamlit_s": None, "arranque_a_portada_s": time.perf_counter() - inicio,
+               "portada_s": portada, "portada_tibia_s": correr(HOME)}
+    time.sleep(pausa)
+    tiempos["primera_pagina_s"] = correr(PAGINA)
+    tiempos["pagina_tibia_s"] = correr(PAGINA)
+    tiempos["importar_streamlit_s"] = tiempos["arranque_a_portada_s"] - portada
+    print(json.dumps(tiempos))
+
+
+def preparar(directorio, n_rutas):
+    sys.path.insert(0, RAIZ)
+    from picus import almacen, datos
+    from picus.sintetico import generar_rutas, generar_viajes
+
+    shutil.copytree(os.path.join(RAIZ, "static"), os.path.join(directorio, "static"))
+    shutil.copytree(os.path.join(RAIZ, ".streamlit"), os.path.join(directorio, ".streamlit"))
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    try:
+        rutas = generar_rutas(n_rutas)
+        almacen.guardar_catalogo(almacen.aplicar_esquema(rutas))
+        datos.guardar_viajes(generar_viajes(rutas, n_rutas))
+    finally:
+        os.chdir(anterior)
+
+
+def medir(directorio, precarga, pausa):
+    entorno = dict(os.environ, PICUS_PRECARGA="1" if precarga else "0", PYTHONPATH=RAIZ)
+    inicio = time.perf_counter()
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), "--hijo", str(pausa)], cwd=directorio,
+                            env=entorno, capture_output=True, text=True, check=True).stdout
+    tiempos = json.loads(salida.strip().splitlines()[-1])
+    tiempos["proceso_total_s"] = time.perf_counter() - inicio
+    return tiempos
+
+
+def main():
+    n_rutas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    pausa = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+
+    directorio = tempfile.mkdtemp(prefix="picus_arranque_")
+    try:
+        inicio = time.perf_counter()
+        preparar(directorio, n_rutas)
+        print(f"{n_rutas:,} rutas y tramos sintéticos en {time.perf_counter() - inicio:.1f} s; "
+              f"{repeticiones} procesos por modo, pausa de {pausa:.1f} s en la portada\n")
+        for precarga in (False, True):
+            corridas = [medir(directorio, precarga, pausa) for _ in range(repeticiones)]
+            print(f"Precarga {'activa' if precarga else 'desactivada'} (mediana):")
+            for clave in ("importar_streamlit_s", "portada_s", "arranque_a_portada_s", "portada_tibia_s",
+                          "primera_pagina_s", "pagina_tibia_s"):
+                print(f"  {clave:<22} {statistics.median(c[clave] for c in corridas) * 1000:10.1f} ms")
+            print()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--hijo":
+        hijo(float(sys.argv[2]))
+    else:
+        main()
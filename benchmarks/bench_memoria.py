@@ -0,0 +1,41 @@
+"""Compara la memoria del catálogo como objetos contra el catálogo compacto.
+
+Uso: python benchmarks/bench_memoria.py [n_rutas]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from picus.almacen import aplicar_esquema  # noqa: E402
+from picus.compacto import como_objetos, compactar_catalogo, reporte_memoria  # noqa: E402
+from picus.costos import calcular_utilidad  # noqa: E402
+from picus.sintetico import generar_rutas  # noqa: E402
+
+
+def main():
+    n_rutas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = generar_rutas(n_rutas)
+
+    # Representación anterior: todo object y la ruta concatenada en cada carga
+    inicio = time.perf_counter()
+    plano = calcular_utilidad(como_objetos(df))
+    plano["Ruta"] = plano["Origen"] + " → " + plano["Destino"]
+    t_plano = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    compacto = compactar_catalogo(aplicar_esquema(df))
+    t_compacto = time.perf_counter() - inicio
+
+    mb_plano = reporte_memoria(plano)["KB"].sum() / 1024
+    mb_compacto = reporte_memoria(compacto)["KB"].sum() / 1024
+    print(f"Catálogo sintético: {n_rutas:,} rutas")
+    print(f"objetos:  {mb_plano:8.2f} MB  preparación {t_plano * 1000:8.1f} ms")
+    print(f"compacto: {mb_compacto:8.2f} MB  preparación {t_compacto * 1000:8.1f} ms  ({mb_plano / mb_compacto:.1f}x menos)")
+    print()
+    print(reporte_memoria(compacto).head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
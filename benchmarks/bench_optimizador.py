@@ -0,0 +1,30 @@
+"""Mide el optimizador de vueltas sobre catálogos sintéticos.
+
+Uso: python benchmarks/bench_optimizador.py [n_rutas]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from picus.costos import VALORES_POR_DEFECTO  # noqa: E402
+from picus.optimizador import mejores_vueltas  # noqa: E402
+from picus.sintetico import generar_rutas  # noqa: E402
+
+
+def main():
+    n_rutas = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    df_rutas = generar_rutas(n_rutas)
+    base = df_rutas["Origen"].iloc[0]
+    print(f"Catálogo sintético: {n_rutas:,} rutas, base {base}")
+    for max_tramos in (2, 3, 4, 5, 6):
+        inicio = time.perf_counter()
+        vueltas, completa = mejores_vueltas(df_rutas, VALORES_POR_DEFECTO, base, max_tramos=max_tramos, top_k=10)
+        segundos = time.perf_counter() - inicio
+        mejor = vueltas["Utilidad Neta"].iloc[0] if not vueltas.empty else float("nan")
+        print(f"hasta {max_tramos} tramos: {segundos * 1000:8.1f} ms  mejor ${mejor:,.2f}  completa={completa}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compara el ciclo iterrows original de "Completar y Simular Tráfico" con el cruce vectorizado.
+
+Uso: python benchmarks/bench_regresos.py [n_rutas] [n_idas]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from picus.costos import calcular_utilidad  # noqa: E402
+from picus.regresos import mejores_regresos_con_vacio  # noqa: E402
+from picus.sintetico import generar_ida, generar_rutas  # noqa: E402
+
+
+def safe(x): return 0 if pd.isna(x) or x is None else x
+
+
+def ciclo_original(ida, df_rutas, tipo_regreso):
+    # Copia del Bloque 3 de Programación de Viajes antes del cambio (con sort
+    # estable para que los empates se resuelvan igual en ambas versiones)
+    vacios = df_rutas[(df_rutas["Tipo"] == "VACIO") & (df_rutas["Origen"] == ida["Destino"])].copy()
+    mejor_combo = None
+    mejor_utilidad = -999999
+    for _, vacio in vacios.iterrows():
+        origen_expo = vacio["Destino"]
+        expo = df_rutas[(df_rutas["Tipo"] == tipo_regreso) & (df_rutas["Origen"] == origen_expo)]
+        if not expo.empty:
+            expo = expo.sort_values(by="% Utilidad", ascending=False, kind="stable").iloc[0]
+            ingreso_total = safe(ida["Ingreso Total"]) + safe(expo["Ingreso Total"])
+            costo_total = safe(ida["Costo_Total_Ruta"]) + safe(vacio["Costo_Total_Ruta"]) + safe(expo["Costo_Total_Ruta"])
+            utilidad = ingreso_total - costo_total
+            if utilidad > mejor_utilidad:
+                mejor_utilidad = utilidad
+                mejor_combo = (vacio, expo)
+    return mejor_combo, mejor_utilidad
+
+
+def main():
+    n_rutas = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_idas = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    df_rutas = calcular_utilidad(generar_rutas(n_rutas))
+    print(f"Catálogo sintético: {n_rutas:,} rutas")
+
+    t_original = t_vectorizado = 0.0
+    for semilla in range(n_idas):
+        ida = generar_ida(df_rutas, semilla)
+        tipo_regreso = "EXPO" if ida["Tipo"] == "IMPO" else "IMPO"
+
+        inicio = time.perf_counter()
+        combo, utilidad = ciclo_original(ida, df_rutas, tipo_regreso)
+        t_original += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        mejores = mejores_regresos_con_vacio(ida, df_rutas, tipo_regreso)
+        t_vectorizado += time.perf_counter() - inicio
+
+        if combo is None:
+            assert mejores.empty, "el cruce encontró regreso donde el ciclo no"
+            continue
+        vacio, expo = combo
+        mejor = mejores.iloc[0]
+        assert df_rutas.iloc[int(mejor["pos_vacio"])]["ID_Ruta"] == vacio["ID_Ruta"], "vacío distinto"
+        assert df_rutas.iloc[int(mejor["pos_regreso"])]["ID_Ruta"] == expo["ID_Ruta"], "regreso distinto"
+        assert abs(mejor["Utilidad"] - utilidad) < 1e-6, "utilidad distinta"
+
+    print(f"Ciclo iterrows:   {t_original / n_idas * 1000:10.1f} ms por tráfico")
+    print(f"Cruce vectorial:  {t_vectorizado / n_idas * 1000:10.1f} ms por tráfico")
+    print(f"Aceleración:      {t_original / t_vectorizado:10.1f}x (mismo resultado en {n_idas} tráficos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Mide el barrido de sensibilidad (rutas × puntos de la malla) y lo compara
+contra recostear el catálogo con calcular_costos en algunos puntos.
+
+Uso: python benchmarks/bench_sensibilidad.py [n_rutas] [puntos_por_eje]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from picus.costos import VALORES_POR_DEFECTO, calcular_costos  # noqa: E402
+from picus.sensibilidad import barrido  # noqa: E402
+from picus.sintetico import generar_rutas  # noqa: E402
+
+
+def main():
+    n_rutas = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    puntos = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    df = generar_rutas(n_rutas)
+    ejes = {"Costo Diesel": np.linspace(20, 30, puntos), "Tipo de cambio USD": np.linspace(16, 20, puntos)}
+
+    inicio = time.perf_counter()
+    resultado = barrido(df, VALORES_POR_DEFECTO, ejes)
+    segundos = time.perf_counter() - inicio
+    print(f"{n_rutas:,} rutas × {puntos}×{puntos} puntos: {segundos:.2f} s "
+          f"({n_rutas * puntos * puntos / segundos / 1e6:,.0f} M evaluaciones/s)")
+
+    # Unos cuantos puntos recosteados con el motor completo deben coincidir
+    muestra = resultado.sample(5, random_state=0)
+    inicio = time.perf_counter()
+    for _, fila in muestra.iterrows():
+        valores = dict(VALORES_POR_DEFECTO, **{clave: fila[clave] for clave in ejes})
+        costos = calcular_costos(df, valores)
+        utilidad = costos["Ingreso Total"] - costos["Costo_Total_Ruta"]
+        assert np.isclose(utilidad.sum(), fila["Utilidad"]) and (utilidad < 0).sum() == fila["No rentables"]
+    por_punto = (time.perf_counter() - inicio) / len(muestra)
+    print(f"calcular_costos punto por punto: {por_punto * 1000:.1f} ms/punto "
+          f"(≈ {por_punto * puntos * puntos:.1f} s para la malla completa); resultados idénticos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Prueba de carga del servicio de cotización: solicitudes por segundo sostenidas en una máquina.
+
+Arma un catálogo sintético en una carpeta temporal, levanta picus.servicio
+con uvicorn en otro proceso y, para cada escenario, mantiene `conexiones`
+clientes HTTP con keep-alive mandando solicitudes durante `segundos`. Al
+final agrega una ruta al catálogo y mide cuánto tarda el servicio en
+publicar la nueva versión sin reiniciarse.
+
+Uso: python benchmarks/carga_servicio.py [n_rutas] [segundos] [conexiones] [workers]
+"""
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from picus import almacen  # noqa: E402
+from picus.sintetico import generar_rutas  # noqa: E402
+
+CAMPOS_CARRIL = ["Tipo", "Cliente", "Origen", "Destino", "Modo_Viaje", "KM", "Casetas", "Moneda", "Ingreso_Original"]
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def solicitar(conexion, metodo, ruta, cuerpo=None):
+    datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+    conexion.request(metodo, ruta, body=datos, headers={"Content-Type": "application/json"})
+    respuesta = conexion.getresponse()
+    contenido = respuesta.read()
+    return respuesta.status, contenido
+
+
+def esperar_servicio(puerto, proceso, limite_s=120):
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite_s:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servicio terminó al arrancar:\n{proceso.stderr.read().decode()}")
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=5)
+            estado, contenido = solicitar(conexion, "GET", "/salud")
+            if estado == 200:
+                return json.loads(contenido), time.perf_counter() - inicio
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("El servicio no respondió a tiempo")
+
+
+def carga(puerto, ruta, generar, segundos, conexiones):
+    """(solicitudes completadas, errores, latencias en s) con `conexiones` clientes durante `segundos`."""
+    latencias, errores = [], []
+    fin = time.perf_counter() + segundos
+
+    def cliente(numero):
+        conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+        propias, fallidas, i = [], 0, numero
+        while time.perf_counter() < fin:
+            cuerpo = generar(i)
+            i += conexiones
+            inicio = time.perf_counter()
+            try:
+                estado, _ = solicitar(conexion, "POST", ruta, cuerpo)
+            except (OSError, http.client.HTTPException):
+                conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+                estado = None
+            if estado == 200:
+                propias.append(time.perf_counter() - inicio)
+            else:
+                fallidas += 1
+        latencias.extend(propias)
+        errores.append(fallidas)
+
+    hilos = [threading.Thread(target=cliente, args=(n,)) for n in range(conexiones)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return len(latencias), sum(errores), latencias, time.perf_counter() - inicio
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else float("nan")
+
+
+def escenarios(rutas):
+    impo = rutas.loc[rutas["Tipo"] == "IMPO", "ID_Ruta"].tolist()
+    vacios = rutas.loc[rutas["Tipo"] == "VACIO", "ID_Ruta"].tolist()
+    expo = rutas.loc[rutas["Tipo"] == "EXPO", "ID_Ruta"].tolist()
+    carriles = rutas[[c for c in CAMPOS_CARRIL if c in rutas.columns]].head(1000)
+    carriles = json.loads(carriles.to_json(orient="records"))
+
+    def lote(i, n):
+        inicio = (i * n) % (len(carriles) - n)
+        return carriles[inicio:inicio + n]
+
+    return [
+        # (nombre, ruta, cuerpo para la i-ésima solicitud, unidades por solicitud)
+        ("cotizar 1 carril", "/cotizar", lambda i: carriles[i % len(carriles)], 1),
+        ("cotizar lote de 100", "/cotizar", lambda i: lote(i, 100), 100),
+        ("vuelta IMPO+VACIO+EXPO", "/vuelta", lambda i: {
+            "tramos": [impo[i % len(impo)], vacios[i % len(vacios)], expo[i % len(expo)]], "modo": "Operador"}, 1),
+        ("regresos top 5", "/regresos", lambda i: {"ida": impo[i % len(impo)], "top_k": 5}, 1),
+        ("regresos lote de 20", "/regresos", lambda i: [
+            {"ida": impo[(i * 20 + j) % len(impo)], "top_k": 5} for j in range(20)], 20),
+    ]
+
+
+def medir_recarga(puerto, antes):
+    """Segundos desde que se agrega una ruta hasta que /salud reporta la nueva versión."""
+    nueva = generar_rutas(1, semilla=99).iloc[0].to_dict()
+    nueva.pop("ID_Ruta", None)
+    inicio = time.perf_counter()
+    almacen.agregar_ruta(nueva)
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    while time.perf_counter() - inicio < 60:
+        salud = json.loads(solicitar(conexion, "GET", "/salud")[1])
+        if salud["rutas"] == antes["rutas"] + 1:
+            return time.perf_counter() - inicio, salud
+        time.sleep(0.01)
+    raise RuntimeError("El servicio no recargó el catálogo")
+
+
+def main():
+    n_rutas = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    conexiones = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+
+    directorio = tempfile.mkdtemp(prefix="picus_servicio_")
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    proceso = None
+    try:
+        rutas = almacen.aplicar_esquema(generar_rutas(n_rutas))
+        almacen.guardar_catalogo(rutas)
+        rutas = almacen.cargar_rutas()
+
+        puerto = puerto_libre()
+        proceso = subprocess.Popen(
+            [sys.executable, "-m", "picus.servicio", "--datos", directorio, "--port", str(puerto),
+             "--workers", str(workers)],
+            env=dict(os.environ, PYTHONPATH=RAIZ), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        salud, arranque = esperar_servicio(puerto, proceso)
+        print(f"{salud['rutas']:,} rutas en memoria; servicio listo en {arranque:.1f} s ({workers} worker(s), "
+              f"{conexiones} conexiones, {segundos:.0f} s por escenario, {os.cpu_count()} CPUs)\n")
+
+        print(f"{'Escenario':<26}{'sol/s':>9}{'unid/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>9}")
+        for nombre, ruta, generar, unidades in escenarios(rutas):
+            completadas, errores, latencias, duracion = carga(puerto, ruta, generar, segundos, conexiones)
+            por_s = completadas / duracion
+            print(f"{nombre:<26}{por_s:>9,.0f}{por_s * unidades:>10,.0f}"
+                  f"{percentil(latencias, 0.50) * 1000:>9.1f}{percentil(latencias, 0.95) * 1000:>9.1f}"
+                  f"{percentil(latencias, 0.99) * 1000:>9.1f}{errores:>9,}")
+
+        recarga, salud = medir_recarga(puerto, salud)
+        print(f"\nRuta agregada visible en {recarga * 1000:.0f} ms sin reiniciar "
+              f"(versión de catálogo {salud['version_catalogo']})")
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+        os.chdir(anterior)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Páginas y etapas más lentas según la bitácora de tiempos de uso real.
+
+Uso: python benchmarks/peores_paginas.py [bitacora_tiempos.jsonl] [n]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from picus.instrumentacion import RUTA_BITACORA, resumir_bitacora  # noqa: E402
+
+
+def main():
+    ruta = sys.argv[1] if len(sys.argv) > 1 else RUTA_BITACORA
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    paginas = resumir_bitacora(ruta)
+    if paginas.empty:
+        print(f"Sin registros en {ruta}")
+        return
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("Páginas por p95:")
+        print(paginas.head(n).to_string(index=False))
+        print("\nEtapas por p95:")
+        print(resumir_bitacora(ruta, por="etapa").head(n).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Prueba de estrés de escrituras concurrentes entre procesos.
+
+Varios procesos agregan rutas, programan tráficos y leen al mismo tiempo en
+un directorio temporal; al final se verifica que no se perdió ninguna fila,
+que ningún lector vio un archivo a medias, que el cubo de rentabilidad que
+mantienen los escritores cuadra con el catálogo y que la verificación
+optimista de versión deja pasar exactamente a uno de dos editores simultáneos.
+
+Uso: python benchmarks/stress_escrituras.py [procesos] [operaciones_por_proceso]
+"""
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from picus import almacen, analitica, datos  # noqa: E402
+from picus.bloqueo import ConflictoVersion  # noqa: E402
+from picus.sintetico import generar_rutas  # noqa: E402
+from picus.viajes import resumir_tramos  # noqa: E402
+
+
+def escritor(directorio, proceso, operaciones):
+    os.chdir(directorio)
+    # Umbral bajo para que las compactaciones coincidan con las altas de otros procesos
+    almacen.UMBRAL_COMPACTACION = 20_000
+    for i in range(operaciones):
+        almacen.agregar_ruta({
+            "Tipo": "IMPO", "Cliente": f"P{proceso}", "Origen": "A", "Destino": "B",
+            "Ingreso Total": float(i), "Costo_Total_Ruta": 0.0
+        })
+        datos.guardar_programacion(pd.DataFrame([{
+            "ID_Programacion": f"P{proceso}-{i}", "Tramo": "IDA", "Fecha": f"2025-{i % 12 + 1:02d}-01",
+            "Número_Trafico": f"T{proceso}-{i}", "Ingreso Total": 1.0, "Costo_Total_Ruta": 0.5
+        }]))
+    almacen.compactar()
+
+
+def lector(directorio, segundos, errores):
+    os.chdir(directorio)
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        try:
+            almacen.cargar_rutas()
+            datos.cargar_viajes()
+        except Exception as e:  # noqa: BLE001 - cualquier error de lectura cuenta como falla
+            errores.put(repr(e))
+
+
+def editor(directorio, version, resultados):
+    os.chdir(directorio)
+    df = almacen.cargar_rutas()
+    try:
+        almacen.guardar_catalogo(df, version=version)
+        resultados.put("ok")
+    except ConflictoVersion:
+        resultados.put("conflicto")
+
+
+def main():
+    procesos = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    operaciones = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    contexto = mp.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        base = generar_rutas(2_000)
+        almacen.guardar_catalogo(base)
+
+        errores = contexto.Queue()
+        inicio = time.perf_counter()
+        escritores = [contexto.Process(target=escritor, args=(directorio, p, operaciones)) for p in range(procesos)]
+        lectores = [contexto.Process(target=lector, args=(directorio, 3.0, errores)) for _ in range(2)]
+        for p in escritores + lectores:
+            p.start()
+        for p in escritores + lectores:
+            p.join()
+        segundos = time.perf_counter() - inicio
+
+        rutas = almacen.cargar_rutas()
+        viajes = datos.cargar_viajes()
+        esperadas = len(base) + procesos * operaciones
+        estado_ok = resumir_tramos(viajes)["Tramos"].sum() == datos.cargar_estado_viajes()["Tramos"].sum()
+        cubo, version_cubo = analitica.leer_cubo(almacen.ruta_cubo())
+        cubo_ok = (analitica.vigente(version_cubo, almacen.version_catalogo())
+                   and int(cubo[analitica.CONTEO].sum()) == len(rutas)
+                   and abs(cubo["Ingreso Total"].sum() - rutas["Ingreso Total"].sum()) < 0.01)
+        fallas_lectura = []
+        while not errores.empty():
+            fallas_lectura.append(errores.get())
+
+        # Dos editores con la misma versión: sólo uno debe poder guardar
+        version = almacen.version_catalogo()
+        resultados = contexto.Queue()
+        editores = [contexto.Process(target=editor, args=(directorio, version, resultados)) for _ in range(2)]
+        for p in editores:
+            p.start()
+        for p in editores:
+            p.join()
+        desenlaces = sorted(resultados.get() for _ in editores)
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    print(f"{procesos} procesos x {operaciones} operaciones en {segundos:.1f} s")
+    print(f"rutas:   {len(rutas):,} de {esperadas:,} esperadas")
+    print(f"tramos:  {len(viajes):,} de {procesos * operaciones:,} esperados, estado consistente={estado_ok}")
+    print(f"cubo de rentabilidad al día y cuadrado: {cubo_ok}")
+    print(f"errores de lectura: {len(fallas_lectura)}" + (f" (p. ej. {fallas_lectura[0]})" if fallas_lectura else ""))
+    print(f"editores simultáneos: {desenlaces}")
+    exito = (len(rutas) == esperadas and len(viajes) == procesos * operaciones and estado_ok and cubo_ok
+             and not fallas_lectura and desenlaces == ["conflicto", "ok"])
+    print("✅ sin pérdidas" if exito else "❌ se detectaron problemas")
+    sys.exit(0 if exito else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Suite de benchmarks sin Streamlit: costeo, simulador, regresos y resúmenes de viajes.
+
+Cada escenario llama las mismas funciones que usan las páginas sobre catálogos
+y viajes sintéticos de 1k/10k/100k/1M filas. Reporta latencia (mediana y
+mínima), unidades por segundo (filas, rutas o tráficos) y pico de memoria
+(tracemalloc, en una corrida aparte para no afectar los tiempos), y guarda
+todo en JSON para comparar entre versiones.
+
+Uso: python benchmarks/suite.py [--tamanos 1000,10000,100000,1000000]
+                                [--escenarios costeo,regresos,...]
+                                [--salida resultados.json] [--comparar anterior.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from picus.almacen import aplicar_esquema  # noqa: E402
+from picus.compacto import compactar_catalogo  # noqa: E402
+from picus.costos import VALORES_POR_DEFECTO, calcular_costos, cotizar_ruta, detalle_vuelta, resumen_utilidad  # noqa: E402
+from picus.cotizacion import COLUMNAS_CARRIL, cotizar_lote, leer_carriles  # noqa: E402
+from picus.indice import IndiceRutas  # noqa: E402
+from picus.regresos import sugerir_regresos  # noqa: E402
+from picus.sintetico import generar_ida, generar_rutas, generar_viajes  # noqa: E402
+from picus.viajes import CONCLUIDO, resumir_concluidos, resumir_tramos, totales_tramos  # noqa: E402
+
+TAMANOS = [1_000, 10_000, 100_000, 1_000_000]
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+IDAS_POR_MEDICION = 20
+CARRILES_POR_LOTE = 300
+
+
+def repeticiones(filas):
+    return 7 if filas <= 10_000 else 3 if filas <= 100_000 else 1
+
+
+def medir(funcion, veces):
+    """(tiempos en segundos, pico de memoria en bytes) de llamar `funcion`."""
+    funcion()  # calentamiento: cachés de pandas, importaciones perezosas
+    tiempos = []
+    for _ in range(veces):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tiempos, pico
+
+
+# ==============================
+# Escenarios: cada uno regresa (función a medir, unidades que procesa por llamada:
+# filas del catálogo o del historial, o rutas, vueltas y tráficos atendidos)
+# ==============================
+
+def escenario_costeo(datos):
+    """Recosteo del catálogo completo (Captura → Recalcular catálogo)."""
+    return lambda: calcular_costos(datos["rutas"], VALORES_POR_DEFECTO), len(datos["rutas"])
+
+
+def escenario_cotizacion(datos):
+    """Captura de una ruta nueva: costeo de una sola fila."""
+    captura = datos["rutas"].iloc[0].to_dict()
+    return lambda: cotizar_ruta(captura, VALORES_POR_DEFECTO), 1
+
+
+def escenario_lote(datos):
+    """Cotización por lote: leer un CSV de 300 carriles y costearlos (meta: < 1 s)."""
+    carriles = datos["rutas"].head(CARRILES_POR_LOTE)[COLUMNAS_CARRIL]
+    archivo = carriles.to_csv(index=False).encode("utf-8")
+
+    def cotizar():
+        leidos, _ = leer_carriles(io.BytesIO(archivo), "carriles.csv")
+        return cotizar_lote(leidos, VALORES_POR_DEFECTO)
+    return cotizar, len(carriles)
+
+
+def escenario_instantanea(datos):
+    """Catálogo compacto + índice (lo que se rearma cuando cambia el catálogo)."""
+    def armar():
+        compacto = compactar_catalogo(datos["esquema"])
+        IndiceRutas().sincronizar(compacto)
+    return armar, len(datos["rutas"])
+
+
+def escenario_simulador(datos):
+    """Simulador de vuelta redonda: ruta inicial, vacío y final sugeridos más el desglose."""
+    catalogo, indice = datos["catalogo"], datos["indice"]
+    ruta_inicial = generar_ida(catalogo, 1)
+
+    def simular():
+        principales = catalogo[(catalogo["Tipo"] == ruta_inicial["Tipo"]) & (catalogo["Ruta"] == ruta_inicial["Ruta"])]
+        ruta1 = principales.sort_values(by="% Utilidad", ascending=False).iloc[0]
+        tramos = [ruta1]
+        vacios = indice.buscar("VACIO", ruta1["Destino"])
+        if len(vacios):
+            tramos.append(catalogo.iloc[vacios[0]])
+        tipo_final = "IMPO" if ruta1["Tipo"] == "EXPO" else "EXPO"
+        finales = indice.buscar(tipo_final, tramos[-1]["Destino"])
+        if len(finales):
+            tramos.append(catalogo.iloc[finales[0]])
+        detalle = detalle_vuelta(tramos, VALORES_POR_DEFECTO, modo="Operador")
+        return resumen_utilidad(detalle["Ingreso"].sum(), detalle["Total Ruta"].sum())
+    return simular, 1
+
+
+def escenario_regresos(datos):
+    """Bloque 3: sugerencias de regreso (directo o con vacío) y totales del tráfico."""
+    catalogo, indice = datos["catalogo"], datos["indice"]
+    idas = [generar_ida(catalogo, semilla) for semilla in range(IDAS_POR_MEDICION)]
+
+    def buscar():
+        for ida in idas:
+            directas, combos = sugerir_regresos(ida, catalogo, indice, top_k=5)
+            if not directas.empty:
+                totales_tramos([ida, directas.iloc[0]])
+            elif not combos.empty:
+                totales_tramos([ida, catalogo.iloc[combos.loc[0, "pos_vacio"]], catalogo.iloc[combos.loc[0, "pos_regreso"]]])
+    return buscar, len(idas)
+
+
+def escenario_estado(datos):
+    """Estado por tráfico (tramos, pendiente/concluido) a partir del historial."""
+    return lambda: resumir_tramos(datos["viajes"]), len(datos["viajes"])
+
+
+def escenario_concluidos(datos):
+    """Bloque 4: resumen de tráficos concluidos."""
+    viajes, estado = datos["viajes"], datos["estado"]
+    concluidos = estado.index[estado["Estado"] == CONCLUIDO]
+    return lambda: resumir_concluidos(viajes[viajes["ID_Programacion"].isin(concluidos)]), len(viajes)
+
+
+ESCENARIOS = {
+    "costeo": escenario_costeo,
+    "cotizacion": escenario_cotizacion,
+    "lote": escenario_lote,
+    "instantanea": escenario_instantanea,
+    "simulador": escenario_simulador,
+    "regresos": escenario_regresos,
+    "estado": escenario_estado,
+    "concluidos": escenario_concluidos,
+}
+
+
+def preparar(filas):
+    rutas = generar_rutas(filas)
+    esquema = aplicar_esquema(rutas)
+    catalogo = compactar_catalogo(esquema)
+    indice = IndiceRutas()
+    indice.sincronizar(catalogo)
+    viajes = generar_viajes(rutas, filas)
+    return {"rutas": rutas, "esquema": esquema, "catalogo": catalogo, "indice": indice,
+            "viajes": viajes, "estado": resumir_tramos(viajes)}
+
+
+def version_repo():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIRECTORIO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocida"
+
+
+def comparar(resultados, anterior):
+    previos = {(r["escenario"], r["filas_dataset"]): r for r in anterior["resultados"]}
+    print(f"\nComparación contra {anterior.get('version', '?')} ({anterior.get('fecha', '?')}):")
+    for r in resultados:
+        previo = previos.get((r["escenario"], r["filas_dataset"]))
+        if previo is None:
+            continue
+        tiempo = r["mediana_s"] / previo["mediana_s"] if previo["mediana_s"] else float("nan")
+        memoria = r["pico_mb"] / previo["pico_mb"] if previo["pico_mb"] else float("nan")
+        # Sólo se señalan diferencias de más de 20% que además no sean ruido (< 1 ms o < 1 MB)
+        lento = tiempo > 1.2 and r["mediana_s"] - previo["mediana_s"] > 1e-3
+        pesado = memoria > 1.2 and r["pico_mb"] - previo["pico_mb"] > 1
+        alerta = "  ⚠️" if lento or pesado else ""
+        print(f"  {r['escenario']:<12} {r['filas_dataset']:>10,}  tiempo x{tiempo:5.2f}  memoria x{memoria:5.2f}{alerta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", default=",".join(str(t) for t in TAMANOS))
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS))
+    parser.add_argument("--salida")
+    parser.add_argument("--comparar")
+    args = parser.parse_args()
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+    escenarios = args.escenarios.split(",")
+    desconocidos = set(escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultados = []
+    for filas in tamanos:
+        inicio = time.perf_counter()
+        datos = preparar(filas)
+        print(f"\n{filas:,} filas (datos sintéticos en {time.perf_counter() - inicio:.1f} s)")
+        for nombre in escenarios:
+            funcion, procesadas = ESCENARIOS[nombre](datos)
+            tiempos, pico = medir(funcion, repeticiones(filas))
+            mediana = statistics.median(tiempos)
+            resultado = {
+                "escenario": nombre,
+                "filas_dataset": filas,
+                "unidades_por_llamada": procesadas,
+                "repeticiones": len(tiempos),
+                "mediana_s": mediana,
+                "minimo_s": min(tiempos),
+                "unidades_por_s": procesadas / mediana if mediana else None,
+                "pico_mb": pico / 2**20,
+            }
+            resultados.append(resultado)
+            print(f"  {nombre:<12} {mediana * 1000:10.2f} ms  (mín {min(tiempos) * 1000:9.2f})  "
+                  f"{resultado['unidades_por_s'] or 0:14,.0f} /s  pico {resultado['pico_mb']:8.1f} MB")
+        del datos
+
+    reporte = {
+        "version": version_repo(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                    "plataforma": platform.platform(), "procesador": platform.processor()},
+        "resultados": resultados,
+    }
+    salida = args.salida or os.path.join(
+        DIRECTORIO, "resultados", f"suite_{reporte['version']}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(resultados, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,20 @@
 import streamlit as st
-import pandas as pd
-import os
 from datetime import datetime
 
-# Rutas de archivos
-RUTA_RUTAS = "rutas_guardadas.csv"
-RUTA_DATOS = "datos_generales.csv"
+from picus.almacen import ErrorImportacion, agregar_ruta, agregar_rutas, existe_catalogo, recalcular_catalogo
+from picus.costos import VALORES_POR_DEFECTO, cotizar_ruta
+from picus.cotizacion import (MARGEN_BRUTO_MINIMO, MARGEN_NETO_MINIMO, RENTABLE, cotizar_lote, excel_disponible,
+                              exportar_cotizacion, leer_carriles, rutas_para_catalogo)
+from picus.datos import cargar_datos_generales, guardar_datos_generales
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
 
-# Valores por defecto
-valores_por_defecto = {
-    "Rendimiento Camion": 2.5,
-    "Costo Diesel": 24.0,
-    "Pago x KM (General)": 1.50,
-    "Bono ISR IMSS": 462.66,
-    "Bono Rendimiento": 250.0,
-    "Tipo de cambio USD": 17.5,
-    "Tipo de cambio MXN": 1.0
-}
-
-def cargar_datos_generales():
-    if os.path.exists(RUTA_DATOS):
-        return pd.read_csv(RUTA_DATOS).set_index("Parametro").to_dict()["Valor"]
-    else:
-        return valores_por_defecto.copy()
+iniciar_pagina("Captura de Rutas")
 
-def guardar_datos_generales(valores):
-    df = pd.DataFrame(valores.items(), columns=["Parametro", "Valor"])
-    df.to_csv(RUTA_DATOS, index=False)
-
-def safe_number(x):
-    return 0 if (x is None or (isinstance(x, float) and pd.isna(x))) else x
+# Valores por defecto
+valores_por_defecto = VALORES_POR_DEFECTO
 
-valores = cargar_datos_generales()
+with etapa("cargar datos generales"):
+    valores = cargar_datos_generales() or valores_por_defecto.copy()
 
 st.title("🚛 Captura de Rutas Largas - PICUS")
 
@@ -42,11 +25,17 @@ with st.expander("⚙️ Configurar Datos Generales"):
     if st.button("Guardar Datos Generales"):
         guardar_datos_generales(valores)
         st.success("✅ Datos Generales guardados correctamente.")
-
-if os.path.exists(RUTA_RUTAS):
-    df_rutas = pd.read_csv(RUTA_RUTAS)
-else:
-    df_rutas = pd.DataFrame()
+        # Los costos e ingresos guardados se recalculan con los mismos valores que se acaban de guardar
+        if existe_catalogo():
+            with etapa("recalcular catálogo"):
+                filas, segundos = recalcular_catalogo(cargar_datos_generales())
+            st.success(f"✅ {filas:,} rutas recalculadas en {segundos:.2f} s ({filas / max(segundos, 1e-9):,.0f} rutas/s).")
+    st.caption("Guardar recalcula el catálogo con los nuevos valores. "
+               "\"Recalcular catálogo\" usa los datos generales guardados, no los cambios sin guardar.")
+    if st.button("🔄 Recalcular catálogo"):
+        with etapa("recalcular catálogo"):
+            filas, segundos = recalcular_catalogo(cargar_datos_generales())
+        st.success(f"✅ {filas:,} rutas recalculadas en {segundos:.2f} s ({filas / max(segundos, 1e-9):,.0f} rutas/s).")
 
 st.subheader("🚣️ Nueva Ruta Larga")
 
@@ -89,57 +78,90 @@ with st.form("captura_ruta"):
 
     revisar = st.form_submit_button("🔍 Revisar Ruta")
     if revisar:
-        tipo_cambio_flete = valores["Tipo de cambio USD"] if moneda_ingreso == "USD" else valores["Tipo de cambio MXN"]
-        tipo_cambio_cruce = valores["Tipo de cambio USD"] if moneda_cruce == "USD" else valores["Tipo de cambio MXN"]
-        tipo_cambio_costo_cruce = valores["Tipo de cambio USD"] if moneda_costo_cruce == "USD" else valores["Tipo de cambio MXN"]
-
-        ingreso_flete_convertido = ingreso_flete * tipo_cambio_flete
-        ingreso_cruce_convertido = ingreso_cruce * tipo_cambio_cruce
-        costo_cruce_convertido = costo_cruce * tipo_cambio_costo_cruce
-        ingreso_total = ingreso_flete_convertido + ingreso_cruce_convertido
-
-        costo_diesel_camion = (km / valores["Rendimiento Camion"]) * valores["Costo Diesel"]
-
-        pago_km = valores["Pago x KM (General)"]
-        bono_rendimiento = valores["Bono Rendimiento"]
-
-        if modo_viaje == "Team":
-            sueldo = 1300
-            bono = 0
-        else:
-            if tipo == "VACIO":
-                sueldo = 100 if km < 100 else km * pago_km
-                bono = 0
-            else:
-                sueldo = km * pago_km
-                bono = valores["Bono ISR IMSS"]
-
-        extras = sum(map(safe_number, [
-            movimiento_local, puntualidad, pension, estancia,
-            pistas_extra, stop, falso, gatas, accesorios, guias
-        ]))
-
-        costo_total = costo_diesel_camion + sueldo + bono + bono_rendimiento + casetas + extras + costo_cruce_convertido
-
-        nueva_ruta = {
+        captura = {
             "Fecha": fecha, "Tipo": tipo, "Cliente": cliente, "Origen": origen, "Destino": destino,
             "Modo_Viaje": modo_viaje, "KM": km,
-            "Moneda": moneda_ingreso, "Ingreso_Original": ingreso_flete, "Tipo de cambio": tipo_cambio_flete,
-            "Ingreso Flete": ingreso_flete_convertido, "Moneda_Cruce": moneda_cruce, "Cruce_Original": ingreso_cruce,
-            "Tipo cambio Cruce": tipo_cambio_cruce, "Ingreso Cruce": ingreso_cruce_convertido,
+            "Moneda": moneda_ingreso, "Ingreso_Original": ingreso_flete,
+            "Moneda_Cruce": moneda_cruce, "Cruce_Original": ingreso_cruce,
             "Moneda Costo Cruce": moneda_costo_cruce, "Costo Cruce": costo_cruce,
-            "Costo Cruce Convertido": costo_cruce_convertido, "Ingreso Total": ingreso_total,
-            "Pago por KM": pago_km, "Sueldo_Operador": sueldo, "Bono": bono,
-            "Bono Rendimiento": bono_rendimiento, "Casetas": casetas,
+            "Casetas": casetas,
             "Movimiento_Local": movimiento_local, "Puntualidad": puntualidad,
             "Pension": pension, "Estancia": estancia,
             "Pistas Extra": pistas_extra, "Stop": stop, "Falso": falso,
-            "Gatas": gatas, "Accesorios": accesorios, "Guías": guias,
-            "Costo_Diesel_Camion": costo_diesel_camion, "Costo_Extras": extras,
-            "Costo_Total_Ruta": costo_total
+            "Gatas": gatas, "Accesorios": accesorios, "Guías": guias
         }
-
-        df_rutas = pd.concat([df_rutas, pd.DataFrame([nueva_ruta])], ignore_index=True)
-        df_rutas.to_csv(RUTA_RUTAS, index=False)
+        with etapa("cotizar y guardar ruta"):
+            agregar_ruta(cotizar_ruta(captura, valores))
         st.success("✅ Ruta larga guardada exitosamente.")
         st.experimental_rerun()
+
+# ==============================
+# Cotización por lote (RFQ)
+# ==============================
+st.markdown("---")
+st.subheader("📑 Cotización por Lote")
+st.caption("Sube un CSV o Excel con un carril por fila (Tipo, Origen, Destino, KM, Casetas, ingresos, monedas y extras). "
+           "Todos se cotizan con los Datos Generales guardados.")
+
+COLUMNAS_VISTA_LOTE = ["Bandera", "Tipo", "Cliente", "Origen", "Destino", "Modo_Viaje", "KM", "Ingreso Total",
+                       "Costo_Total_Ruta", "Utilidad", "% Utilidad", "Utilidad Neta", "% Utilidad Neta"]
+
+excel = excel_disponible()
+archivo_lote = st.file_uploader("Archivo de carriles", type=["csv", "xlsx"] if excel else ["csv"], key="lote_upload")
+if not excel:
+    st.caption("Para subir y descargar Excel instala openpyxl; mientras tanto usa CSV.")
+col_m1, col_m2 = st.columns(2)
+with col_m1:
+    margen_bruto = st.number_input("% Utilidad bruta mínima", value=MARGEN_BRUTO_MINIMO, step=1.0)
+with col_m2:
+    margen_neto = st.number_input("% Utilidad neta mínima", value=MARGEN_NETO_MINIMO, step=1.0)
+
+if archivo_lote:
+    try:
+        with etapa("leer carriles"):
+            carriles, ignoradas = leer_carriles(archivo_lote, archivo_lote.name)
+    except ErrorImportacion as e:
+        st.error("❌ El archivo no es válido.")
+        for error in e.errores:
+            st.write(f"- {error}")
+    else:
+        if ignoradas:
+            st.info(f"Columnas ignoradas: {', '.join(ignoradas)}")
+        # El lote se cotiza (y se guarda) con los datos generales guardados, igual que el
+        # recálculo del catálogo; los cambios sin guardar del expander no cuentan
+        guardados = cargar_datos_generales() or valores_por_defecto.copy()
+        if any(float(guardados.get(k, v)) != float(valores[k]) for k, v in valores_por_defecto.items()):
+            st.warning("⚠️ Hay cambios sin guardar en los Datos Generales: el lote usa los valores guardados.")
+        with etapa("cotizar lote", filas=len(carriles)):
+            cotizadas = cotizar_lote(carriles, guardados, margen_bruto, margen_neto)
+
+        rentables = cotizadas["Bandera"] == RENTABLE
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Carriles cotizados", f"{len(cotizadas):,}")
+        col2.metric("Rentables", f"{int(rentables.sum()):,}")
+        col3.metric("Utilidad bruta total", f"${cotizadas['Utilidad'].sum():,.2f}")
+
+        # Sólo la columna Aceptar es editable; por defecto se aceptan los rentables
+        vista = cotizadas[COLUMNAS_VISTA_LOTE].copy()
+        vista.insert(0, "Aceptar", rentables.to_numpy())
+        with etapa("mostrar lote"):
+            editado = st.data_editor(vista, use_container_width=True, hide_index=True,
+                                     disabled=COLUMNAS_VISTA_LOTE, key="lote_editor")
+
+        col_d1, col_d2 = st.columns(2)
+        with col_d1:
+            st.download_button("📥 Descargar cotización en CSV", data=lambda: exportar_cotizacion(cotizadas, "csv"),
+                               file_name="cotizacion_lote.csv", mime="text/csv")
+        if excel:
+            with col_d2:
+                st.download_button("📥 Descargar cotización en Excel", data=lambda: exportar_cotizacion(cotizadas, "xlsx"),
+                                   file_name="cotizacion_lote.xlsx",
+                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+        aceptadas = cotizadas[editado["Aceptar"].to_numpy(dtype=bool)]
+        if st.button(f"💾 Guardar {len(aceptadas):,} carriles aceptados en el catálogo", disabled=aceptadas.empty):
+            with etapa("guardar lote"):
+                ids = agregar_rutas(rutas_para_catalogo(aceptadas))
+            st.success(f"✅ {len(ids):,} rutas agregadas al catálogo.")
+
+cerrar_pagina()
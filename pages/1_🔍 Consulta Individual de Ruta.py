@@ -1,53 +1,51 @@
 import streamlit as st
 import pandas as pd
-import os
 
-RUTA_RUTAS = "rutas_guardadas.csv"
-RUTA_DATOS = "datos_generales.csv"
+from picus.almacen import cargar_rutas_por_id, existe_catalogo
+from picus.costos import COSTOS_INDIRECTOS, costear_ruta
+from picus.datos import cargar_datos_generales, cargar_rutas
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
+
+iniciar_pagina("Consulta Individual de Ruta")
 
 def safe_number(x):
     return 0 if pd.isna(x) or x is None else x
 
-def cargar_datos_generales():
-    if os.path.exists(RUTA_DATOS):
-        return pd.read_csv(RUTA_DATOS).set_index("Parametro").to_dict()["Valor"]
-    else:
-        return {}
-
-valores = cargar_datos_generales()
+with etapa("cargar datos generales"):
+    valores = cargar_datos_generales()
 
 st.title("🔍 Consulta Individual de Ruta")
 
-if os.path.exists(RUTA_RUTAS):
-    df = pd.read_csv(RUTA_RUTAS)
+if existe_catalogo():
+    # Para el selector basta con leer cuatro columnas del catálogo
+    with etapa("cargar rutas (selector)"):
+        df = cargar_rutas(columnas=["Tipo", "Cliente", "Origen", "Destino"]).set_index("ID_Ruta")
 
     st.subheader("📌 Selecciona una Ruta")
-    index_sel = st.selectbox(
-        "Selecciona índice",
+    id_sel = st.selectbox(
+        "Selecciona la ruta",
         df.index.tolist(),
-        format_func=lambda x: f"{df.loc[x, 'Tipo']} - {df.loc[x, 'Cliente']} - {df.loc[x, 'Origen']} → {df.loc[x, 'Destino']}"
+        format_func=lambda x: f"{df.at[x, 'Tipo']} - {df.at[x, 'Cliente']} - {df.at[x, 'Origen']} → {df.at[x, 'Destino']}"
     )
 
-    ruta = df.loc[index_sel]
+    # Sólo la ruta elegida: filtro por ID en la base más su historial en el log
+    with etapa("cargar ruta"):
+        ruta = cargar_rutas_por_id([id_sel]).iloc[0]
     tipo = ruta.get("Tipo", "IMPO")
     km = safe_number(ruta.get("KM", 0))
     modo = ruta.get("Modo_Viaje", "Operador")
 
-    # Bonos ajustados
-    bono_isr = float(valores.get("Bono ISR IMSS", 462.66)) if tipo != "VACIO" else 0.0
-    bono_rend = float(valores.get("Bono Rendimiento", 250.0)) if tipo != "VACIO" else 0.0
-    if modo == "Team" and tipo != "VACIO":
-        bono_isr *= 2
-        bono = bono_isr
-    else:
-        bono = bono_isr
+    # Bonos ajustados con los parámetros vigentes
+    desglose = costear_ruta(ruta, valores)
+    bono = desglose["Bono"]
+    bono_rend = desglose["Bono Rendimiento"]
 
     # Cálculo de utilidad
     clasificacion = ruta.get("Clasificación Ruta", "RL")
     ingreso_total = safe_number(ruta["Ingreso Total"])
     costo_total = safe_number(ruta["Costo_Total_Ruta"])
     utilidad_bruta = ingreso_total - costo_total
-    costos_indirectos = ingreso_total * 0.35
+    costos_indirectos = ingreso_total * COSTOS_INDIRECTOS
     utilidad_neta = utilidad_bruta - costos_indirectos
 
     porcentaje_bruta = (utilidad_bruta / ingreso_total * 100) if ingreso_total > 0 else 0
@@ -77,38 +75,8 @@ if os.path.exists(RUTA_RUTAS):
     st.markdown("---")
     st.subheader("📋 Detalles y Costos de la Ruta")
 
-    bono_isr = valores.get("Bono ISR IMSS", 462.66)
-    bono_rendimiento = valores.get("Bono Rendimiento", 250.0)
-    pago_km = valores.get("Pago x KM (General)", 1.50)
-
-    km = safe_number(ruta["KM"])
-    if modo == "Team":
-        sueldo = 1300
-        bono = bono_isr * 2
-    else:
-        if ruta["Tipo"] == "VACIO":
-            sueldo = 100 if km < 100 else km * pago_km
-            bono = 0
-        else:
-            sueldo = km * pago_km
-            bono = bono_isr
-
-    costo_diesel = safe_number(ruta.get("Costo_Diesel_Camion", 0))
-    costo_extras = sum(map(safe_number, [
-        ruta.get("Movimiento_Local", 0),
-        ruta.get("Puntualidad", 0),
-        ruta.get("Pension", 0),
-        ruta.get("Estancia", 0),
-        ruta.get("Pistas Extra", 0),
-        ruta.get("Stop", 0),
-        ruta.get("Falso", 0),
-        ruta.get("Gatas", 0),
-        ruta.get("Accesorios", 0),
-        ruta.get("Guías", 0)
-    ]))
-
     detalles = [
-        f"Fecha: {ruta['Fecha']}",
+        f"Fecha: {ruta['Fecha']:%Y-%m-%d}" if pd.notna(ruta['Fecha']) else "Fecha: -",
         f"Tipo: {tipo}",
         f"Modo de viaje: {modo}",
         f"Cliente: {ruta['Cliente']}",
@@ -149,3 +117,5 @@ if os.path.exists(RUTA_RUTAS):
 
 else:
     st.warning("⚠️ No hay rutas guardadas todavía.")
+
+cerrar_pagina()
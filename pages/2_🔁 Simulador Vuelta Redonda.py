@@ -1,37 +1,30 @@
 import streamlit as st
-import pandas as pd
-import os
-from datetime import datetime
 
-RUTA_RUTAS = "rutas_guardadas.csv"
-RUTA_DATOS = "datos_generales.csv"
+from picus.almacen import existe_catalogo
+from picus.costos import detalle_vuelta, resumen_utilidad
+from picus.datos import cargar_datos_generales, instantanea_catalogo
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
+from picus.optimizador import mejores_vueltas
+
+iniciar_pagina("Simulador Vuelta Redonda")
 
 st.title("🔁 Simulador de Vuelta Redonda - PICUS")
 
-def safe(x):
-    return 0 if pd.isna(x) or x is None else x
-
-def cargar_datos_generales():
-    if os.path.exists(RUTA_DATOS):
-        return pd.read_csv(RUTA_DATOS).set_index("Parametro").to_dict()["Valor"]
-    return {}
-
-def cargar_rutas():
-    if os.path.exists(RUTA_RUTAS):
-        df = pd.read_csv(RUTA_RUTAS)
-        df["Ruta"] = df["Origen"] + " → " + df["Destino"]
-        df["Utilidad"] = df["Ingreso Total"] - df["Costo_Total_Ruta"]
-        df["% Utilidad"] = (df["Utilidad"] / df["Ingreso Total"] * 100).round(2)
-        return df
-    st.error("❌ No se encontró rutas_guardadas.csv")
+if not existe_catalogo():
+    st.error("❌ No se encontró el catálogo de rutas")
     st.stop()
 
 valores = cargar_datos_generales()
-df_rutas = cargar_rutas()
+# Catálogo e índice de la misma versión compartida por todas las sesiones
+with etapa("cargar rutas"):
+    catalogo = instantanea_catalogo()
+df_rutas = catalogo.rutas.copy(deep=False)
+indice = catalogo.indice
 
 st.subheader("📌 Paso 1: Selecciona tipo de ruta principal")
 tipo_principal = st.selectbox("Tipo de ruta inicial", ["IMPO", "EXPO", "VACIO"])
-rutas_principales = df_rutas[df_rutas["Tipo"] == tipo_principal].copy()
+with etapa("filtrar rutas principales", filas=len(df_rutas)):
+    rutas_principales = df_rutas[df_rutas["Tipo"] == tipo_principal].copy()
 
 if rutas_principales.empty:
     st.warning(f"No hay rutas tipo {tipo_principal} registradas.")
@@ -47,11 +40,10 @@ ruta1 = rutas_filtradas.loc[cliente_idx]
 
 st.subheader("📌 Paso 2: Ruta intermedia sugerida (opcional)")
 destino1 = ruta1["Destino"]
-vacios = df_rutas[(df_rutas["Tipo"] == "VACIO") & (df_rutas["Origen"] == destino1)].copy()
+vacios = df_rutas.iloc[indice.buscar("VACIO", destino1)]
 
 opcion_intermedia = None
 if not vacios.empty:
-    vacios = vacios.sort_values(by="% Utilidad", ascending=False)
     idx = st.selectbox("Ruta vacía sugerida", vacios.index,
         format_func=lambda x: f"{vacios.loc[x, 'Ruta']} ({vacios.loc[x, 'Cliente']})")
     opcion_intermedia = vacios.loc[idx]
@@ -66,10 +58,9 @@ elif tipo_principal == "EXPO":
 else:
     tipo_final = "EXPO"
 
-rutas_finales = df_rutas[(df_rutas["Tipo"] == tipo_final) & (df_rutas["Origen"] == origen_final)].copy()
+rutas_finales = df_rutas.iloc[indice.buscar(tipo_final, origen_final)]
 ruta3 = None
 if not rutas_finales.empty:
-    rutas_finales = rutas_finales.sort_values(by="% Utilidad", ascending=False)
     idx = st.selectbox("Ruta final sugerida", rutas_finales.index,
         format_func=lambda x: f"{rutas_finales.loc[x, 'Cliente']} - {rutas_finales.loc[x, 'Ruta']}")
     ruta3 = rutas_finales.loc[idx]
@@ -89,69 +80,51 @@ modo = st.radio("Modo de viaje", ["Operador", "Team"], horizontal=True)
 # =====================
 # Cálculos por ruta
 # =====================
-detalle = []
-ingreso_total = 0
-costo_total = 0
-
-for r in rutas_seleccionadas:
-    ingreso = safe(r["Ingreso Total"])
-    costo = safe(r["Costo_Total_Ruta"])
-    tipo = r["Tipo"]
-    km = safe(r["KM"])
-
-    # Bono ISR solo si no es VACIO
-    bono = float(valores.get("Bono ISR", 0)) if tipo != "VACIO" else 0
-    if modo == "Team" and tipo != "VACIO":
-        bono *= 2
-    elif modo != "Team" and tipo == "VACIO":
-        bono = 0
-
-    # Sueldo
-    if modo == "Team":
-        sueldo = 650 * 2
-    else:
-        if tipo == "VACIO":
-            sueldo = 100 if km < 100 else km * float(valores.get("Pago por km VACIO", 1.25))
-        elif tipo == "IMPO":
-            sueldo = km * float(valores.get("Pago por km IMPO", 1.25))
-        elif tipo == "EXPO":
-            sueldo = km * float(valores.get("Pago por km EXPO", 1.63))
-        else:
-            sueldo = 0
-
-    # Bono de rendimiento solo si no es VACIO
-    rendimiento = safe(valores.get("Bono Rendimiento", 0)) if tipo != "VACIO" else 0
-
-    # Extras
-    extras = sum(safe(r.get(campo, 0)) for campo in ["Pistas Extra", "Stop", "Falso", "Gatas", "Accesorios", "Guías"])
-
-    total_costos = costo + sueldo + bono + extras + rendimiento
-    ingreso_total += ingreso
-    costo_total += total_costos
-
-    detalle.append({
-        "Tipo": tipo,
-        "Cliente": r["Cliente"],
-        "Ruta": r["Origen"] + " → " + r["Destino"],
-        "Ingreso": ingreso,
-        "Costo Base": costo,
-        "Sueldo": sueldo,
-        "Bono": bono,
-        "Extras": extras,
-        "Rendimiento": rendimiento,
-        "Total Ruta": total_costos
-    })
-
-utilidad_bruta = ingreso_total - costo_total
-costos_indirectos = ingreso_total * 0.35
-utilidad_neta = utilidad_bruta - costos_indirectos
+# Cada tramo se recostea con el modo de viaje elegido para la vuelta completa
+with etapa("costear vuelta"):
+    detalle = detalle_vuelta(rutas_seleccionadas, valores, modo=modo)
+    totales = resumen_utilidad(detalle["Ingreso"].sum(), detalle["Total Ruta"].sum())
 
 st.header("📊 Resultados Generales")
-st.metric("Ingreso Total", f"${ingreso_total:,.2f}")
-st.metric("Costo Total", f"${costo_total:,.2f}")
-st.metric("Utilidad Bruta", f"${utilidad_bruta:,.2f} ({(utilidad_bruta/ingreso_total*100):.2f}%)")
-st.metric("Costos Indirectos (35%)", f"${costos_indirectos:,.2f}")
-st.metric("Utilidad Neta", f"${utilidad_neta:,.2f} ({(utilidad_neta/ingreso_total*100):.2f}%)")
+st.metric("Ingreso Total", f"${totales['Ingreso Total']:,.2f}")
+st.metric("Costo Total", f"${totales['Costo Total']:,.2f}")
+st.metric("Utilidad Bruta", f"${totales['Utilidad Bruta']:,.2f} ({totales['% Utilidad Bruta']:.2f}%)")
+st.metric("Costos Indirectos (35%)", f"${totales['Costos Indirectos']:,.2f}")
+st.metric("Utilidad Neta", f"${totales['Utilidad Neta']:,.2f} ({totales['% Utilidad Neta']:.2f}%)")
 
 st.subheader("📋 Detalle por Ruta")
-st.dataframe(pd.DataFrame(detalle), use_container_width=True)
+with etapa("mostrar detalle"):
+    st.dataframe(detalle, use_container_width=True)
+
+# =====================
+# Optimizador de vueltas multi-tramo
+# =====================
+st.markdown("---")
+st.header("🧭 Optimizador de Vueltas")
+st.caption("Busca automáticamente las vueltas cerradas más rentables (incluye 35% de indirectos y sueldo/bono del modo elegido).")
+
+with etapa("listar ciudades", filas=len(df_rutas)):
+    ciudades = sorted(set(df_rutas["Origen"].dropna()) | set(df_rutas["Destino"].dropna()))
+col1, col2, col3 = st.columns(3)
+with col1:
+    base = st.selectbox("Terminal base", ciudades)
+with col2:
+    max_tramos = st.slider("Máximo de tramos", 2, 6, 4)
+with col3:
+    top_k = st.number_input("Vueltas a mostrar", min_value=1, max_value=50, value=10)
+tipo_inicial = st.selectbox("Primer tramo", ["Cualquiera", "IMPO", "EXPO"])
+
+if st.button("🔎 Buscar mejores vueltas"):
+    with etapa("optimizar vueltas", filas=len(df_rutas)):
+        vueltas, completa = mejores_vueltas(
+            df_rutas, valores, base, max_tramos=max_tramos, top_k=int(top_k), modo=modo,
+            tipo_inicial=None if tipo_inicial == "Cualquiera" else tipo_inicial
+        )
+    if vueltas.empty:
+        st.warning("No se encontraron vueltas cerradas desde esta base.")
+    else:
+        if not completa:
+            st.info("La búsqueda alcanzó el tiempo límite; se muestran las mejores vueltas encontradas.")
+        st.dataframe(vueltas.drop(columns="Posiciones"), use_container_width=True)
+
+cerrar_pagina()
@@ -1,47 +1,38 @@
 import streamlit as st
 import pandas as pd
-import os
 from datetime import datetime
 
-# Rutas
-RUTA_RUTAS = "rutas_guardadas.csv"
-RUTA_PROG = "viajes_programados.csv"
-RUTA_DATOS = "datos_generales.csv"
+from picus.almacen import existe_catalogo
+from picus.asignacion import asignar_regresos
+from picus.bloqueo import ConflictoVersion
+from picus.regresos import sugerir_regresos
+from picus.viajes import CONCLUIDO, PENDIENTE, armar_tramos_vuelta, resumir_concluidos, totales_tramos
+from picus.datos import cargar_estado_viajes, cargar_viajes, cerrar_traficos, existe_viajes, firma_viajes, guardar_programacion, guardar_viajes, ids_por_estado, instantanea_catalogo
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
 
-SUELDO_TEAM = 1300
-BONO_ISR = 462.66
-BONO_RENDIMIENTO = 250.0
-PAGO_KM = 1.50
+iniciar_pagina("Programación de Viajes")
 
 st.title("🚚 Programación de Viajes - PICUS RL")
 
 def safe(x): return 0 if pd.isna(x) or x is None else x
 
 def cargar_rutas():
-    if not os.path.exists(RUTA_RUTAS):
-        st.error("❌ No se encontró rutas_guardadas.csv")
+    if not existe_catalogo():
+        st.error("❌ No se encontró el catálogo de rutas")
         st.stop()
-    df = pd.read_csv(RUTA_RUTAS)
-    df["Utilidad"] = df["Ingreso Total"] - df["Costo_Total_Ruta"]
-    df["% Utilidad"] = (df["Utilidad"] / df["Ingreso Total"] * 100).round(2)
-    df["Ruta"] = df["Origen"] + " → " + df["Destino"]
-    return df
-
-def guardar_programacion(df_nueva):
-    if os.path.exists(RUTA_PROG):
-        df_prog = pd.read_csv(RUTA_PROG)
-        df_total = pd.concat([df_prog, df_nueva], ignore_index=True)
-    else:
-        df_total = df_nueva
-    df_total.to_csv(RUTA_PROG, index=False)
+    return instantanea_catalogo()
 
 # ==============================
 # Bloque 1: Registro de tráfico
 # ==============================
 st.header("🚛 Registro de Tráfico")
-rutas_df = cargar_rutas()
+# Una sola instantánea por ejecución: posiciones e índice de la misma versión
+with etapa("cargar rutas"):
+    catalogo = cargar_rutas()
+rutas_df = catalogo.rutas.copy(deep=False)
 tipo = st.selectbox("Tipo de ruta (ida)", ["IMPO", "EXPO"])
-rutas_tipo = rutas_df[rutas_df["Tipo"] == tipo].copy()
+with etapa("filtrar rutas de ida", filas=len(rutas_df)):
+    rutas_tipo = rutas_df[rutas_df["Tipo"] == tipo].copy()
 
 if rutas_tipo.empty:
     st.info("No hay rutas registradas de este tipo.")
@@ -75,7 +66,8 @@ with st.form("registro_trafico"):
             datos["Modo_Viaje"] = modo_viaje
             datos["Tramo"] = "IDA"
             datos["ID_Programacion"] = f"{trafico}_{fecha_str}"
-            guardar_programacion(pd.DataFrame([datos]))
+            with etapa("guardar tráfico"):
+                guardar_programacion(pd.DataFrame([datos]))
             st.success("✅ Tráfico registrado exitosamente.")
 
 # ==========================
@@ -84,18 +76,22 @@ with st.form("registro_trafico"):
 st.markdown("---")
 st.header("🛠️ Gestión de Tráficos Programados")
 
-if os.path.exists(RUTA_PROG):
-    df_prog = pd.read_csv(RUTA_PROG)
+if existe_viajes():
+    # Versión leída: si otro usuario guarda antes que nosotros no se pisan sus cambios
+    version_prog = firma_viajes()
+    with etapa("cargar viajes"):
+        df_prog = cargar_viajes()
 
-    incompletos = df_prog.groupby("ID_Programacion").size().reset_index(name="Tramos")
-    incompletos = incompletos[incompletos["Tramos"] == 1]["ID_Programacion"]
-    ids = incompletos.tolist()
+    with etapa("armar pendientes"):
+        ids = ids_por_estado(PENDIENTE).tolist()
 
     if ids:
         id_edit = st.selectbox("Selecciona un tráfico para editar", ids)
-        df_filtrado = df_prog[df_prog["ID_Programacion"] == id_edit].reset_index()
+        with etapa("filtrar tráfico", filas=len(df_prog)):
+            df_filtrado = df_prog[df_prog["ID_Programacion"] == id_edit].reset_index()
         st.write("**Vista previa del tráfico seleccionado:**")
-        st.dataframe(df_filtrado)
+        with etapa("mostrar tráfico"):
+            st.dataframe(df_filtrado)
 
         if not df_filtrado[df_filtrado["Tramo"] == "IDA"].empty:
             tramo_ida = df_filtrado[df_filtrado["Tramo"] == "IDA"].iloc[0]
@@ -143,8 +139,12 @@ if os.path.exists(RUTA_PROG):
                     df_prog.loc[(df_prog["ID_Programacion"] == id_edit) & (df_prog["Tramo"] == "IDA"), "Costo_Extras"] = extras
                     df_prog.loc[(df_prog["ID_Programacion"] == id_edit) & (df_prog["Tramo"] == "IDA"), "Costo_Total_Ruta"] = total
 
-                    df_prog.to_csv(RUTA_PROG, index=False)
-                    st.success("✅ Cambios guardados correctamente.")
+                    try:
+                        with etapa("guardar edición"):
+                            guardar_viajes(df_prog, ids=[id_edit], version=version_prog)
+                        st.success("✅ Cambios guardados correctamente.")
+                    except ConflictoVersion:
+                        st.error("⚠️ Otro usuario modificó la programación mientras editabas. Recarga la página y vuelve a intentar.")
 
 # ==============================
 # BLOQUE 3: SIMULAR Y CERRAR TRÁFICO DETALLADO
@@ -152,49 +152,118 @@ if os.path.exists(RUTA_PROG):
 st.markdown("---")
 st.title("🔁 Completar y Simular Tráfico Detallado")
 
-if not os.path.exists(RUTA_PROG) or not os.path.exists(RUTA_RUTAS):
+if not existe_viajes() or not existe_catalogo():
     st.error("❌ Faltan archivos necesarios para continuar.")
     st.stop()
 
-df_prog = pd.read_csv(RUTA_PROG)
-df_rutas = cargar_rutas()
+with etapa("cargar viajes"):
+    df_prog = cargar_viajes()
+df_rutas = catalogo.rutas.copy(deep=False)
+indice = catalogo.indice
+
+with etapa("armar incompletos"):
+    incompletos = ids_por_estado(PENDIENTE)
 
-incompletos = df_prog.groupby("ID_Programacion").size().reset_index(name="count")
-incompletos = incompletos[incompletos["count"] == 1]["ID_Programacion"]
+# Cierre masivo: asignación global de regresos para todos los pendientes
+with st.expander("🧮 Cierre masivo de tráficos pendientes"):
+    st.caption("Asigna un regreso a cada tráfico pendiente maximizando la utilidad total, sin repetir cargas entre unidades.")
+    col1, col2 = st.columns(2)
+    with col1:
+        capacidad = st.number_input("Usos máximos por ruta de regreso", min_value=1, max_value=50, value=1)
+    with col2:
+        solo_rentables = st.checkbox("Sólo regresos con utilidad positiva", value=True)
+
+    # Se guardan IDs (no posiciones): entre el cálculo y el guardado el catálogo puede cambiar
+    posicion_por_id = pd.Series(range(len(df_rutas)), index=df_rutas["ID_Ruta"].astype(object))
+    posicion_por_id = posicion_por_id[~posicion_por_id.index.duplicated()]
+
+    def ruta_por_id(id_ruta):
+        posicion = posicion_por_id.get(id_ruta) if pd.notna(id_ruta) else None
+        return None if posicion is None else df_rutas.iloc[int(posicion)]
+
+    if st.button("🧮 Calcular asignación") and not incompletos.empty:
+        idas_pendientes = df_prog[df_prog["ID_Programacion"].isin(incompletos) & (df_prog["Tramo"] == "IDA")]
+        idas_pendientes = idas_pendientes.drop_duplicates("ID_Programacion").reset_index(drop=True)
+        with etapa("asignación masiva", filas=len(df_rutas)):
+            asignacion = asignar_regresos(idas_pendientes, df_rutas, capacidad, solo_rentables)
+        ids_ruta = df_rutas["ID_Ruta"].astype(object).to_numpy()
+        pos_vacio = asignacion["pos_vacio"].to_numpy(dtype="int64")
+        st.session_state["asignacion_masiva"] = {
+            "version": catalogo.version,
+            "pendientes": len(idas_pendientes),
+            "vueltas": pd.DataFrame({
+                "ID_Programacion": idas_pendientes.loc[asignacion["fila"], "ID_Programacion"].to_numpy(),
+                "ID_Vacio": [ids_ruta[p] if p >= 0 else None for p in pos_vacio],
+                "ID_Regreso": ids_ruta[asignacion["pos_regreso"].to_numpy(dtype="int64")],
+                "Utilidad": asignacion["Utilidad"].to_numpy(dtype="float64")
+            })
+        }
+
+    if "asignacion_masiva" in st.session_state:
+        asignacion = st.session_state["asignacion_masiva"]
+        vueltas = asignacion["vueltas"]
+        if vueltas.empty:
+            st.warning("No se encontraron regresos para los tráficos pendientes.")
+        else:
+            def describir(id_ruta):
+                if pd.isna(id_ruta):
+                    return "—"
+                ruta = ruta_por_id(id_ruta)
+                return "⚠️ Ruta eliminada" if ruta is None else f"{ruta['Cliente']} - {ruta['Ruta']}"
+
+            vista = pd.DataFrame({
+                "ID_Programacion": vueltas["ID_Programacion"],
+                "Vacío": [describir(i) for i in vueltas["ID_Vacio"]],
+                "Regreso": [describir(i) for i in vueltas["ID_Regreso"]],
+                "Utilidad": vueltas["Utilidad"].round(2)
+            })
+            st.dataframe(vista, use_container_width=True)
+            st.markdown(f"**{len(vueltas)} de {asignacion['pendientes']} tráficos asignados** · "
+                        f"Utilidad total: ${vueltas['Utilidad'].sum():,.2f}")
+            if asignacion["version"] != catalogo.version:
+                st.info("ℹ️ El catálogo cambió desde el cálculo: se guardan los datos vigentes de cada ruta "
+                        "y se omiten las que ya no existen. Recalcula para actualizar la utilidad.")
+
+            if st.button("📅 Guardar todas las vueltas"):
+                # Las IDA y las rutas se toman de los datos vigentes en esta ejecución
+                idas = df_prog[df_prog["Tramo"] == "IDA"].drop_duplicates("ID_Programacion").set_index(
+                    "ID_Programacion", drop=False)
+                armadas, omitidas = [], 0
+                for vuelta in vueltas.itertuples(index=False):
+                    tramos = ([ruta_por_id(vuelta.ID_Vacio)] if pd.notna(vuelta.ID_Vacio) else []) + [
+                        ruta_por_id(vuelta.ID_Regreso)]
+                    if vuelta.ID_Programacion not in idas.index or any(t is None for t in tramos):
+                        omitidas += 1
+                        continue
+                    armadas.append(armar_tramos_vuelta(idas.loc[vuelta.ID_Programacion], tramos))
+                # Una sola escritura; los tráficos que otro usuario cerró en medio se omiten
+                cerrados = cerrar_traficos(pd.concat(armadas, ignore_index=True)) if armadas else []
+                omitidas += len(armadas) - len(cerrados)
+                del st.session_state["asignacion_masiva"]
+                st.success(f"✅ {len(cerrados)} tráficos cerrados exitosamente.")
+                if omitidas:
+                    st.warning(f"⚠️ {omitidas} tráficos omitidos: ya estaban cerrados o su ruta asignada ya no existe.")
 
 if not incompletos.empty:
     id_sel = st.selectbox("Selecciona un tráfico pendiente", incompletos)
     ida = df_prog[df_prog["ID_Programacion"] == id_sel].iloc[0]
-    destino_ida = ida["Destino"]
-    tipo_ida = ida["Tipo"]
-
-    tipo_regreso = "EXPO" if tipo_ida == "IMPO" else "IMPO"
-    directas = df_rutas[(df_rutas["Tipo"] == tipo_regreso) & (df_rutas["Origen"] == destino_ida)].copy()
+    with etapa("buscar regresos", filas=len(df_rutas)):
+        directas, combos = sugerir_regresos(ida, df_rutas, indice, top_k=5)
 
     if not directas.empty:
-        directas = directas.sort_values(by="% Utilidad", ascending=False)
         idx = st.selectbox("Cliente sugerido (por utilidad)", directas.index,
             format_func=lambda x: f"{directas.loc[x, 'Cliente']} - {directas.loc[x, 'Ruta']} ({directas.loc[x, '% Utilidad']:.2f}%)")
         rutas = [ida, directas.loc[idx]]
     else:
-        vacios = df_rutas[(df_rutas["Tipo"] == "VACIO") & (df_rutas["Origen"] == destino_ida)].copy()
-        mejor_combo = None
-        mejor_utilidad = -999999
-
-        for _, vacio in vacios.iterrows():
-            origen_expo = vacio["Destino"]
-            expo = df_rutas[(df_rutas["Tipo"] == tipo_regreso) & (df_rutas["Origen"] == origen_expo)]
-            if not expo.empty:
-                expo = expo.sort_values(by="% Utilidad", ascending=False).iloc[0]
-                ingreso_total = safe(ida["Ingreso Total"]) + safe(expo["Ingreso Total"])
-                costo_total = safe(ida["Costo_Total_Ruta"]) + safe(vacio["Costo_Total_Ruta"]) + safe(expo["Costo_Total_Ruta"])
-                utilidad = ingreso_total - costo_total
-                if utilidad > mejor_utilidad:
-                    mejor_utilidad = utilidad
-                    mejor_combo = (vacio, expo)
-
-        if mejor_combo:
-            vacio, expo = mejor_combo
+        if not combos.empty:
+            def describir_combo(x):
+                vacio = df_rutas.iloc[combos.loc[x, "pos_vacio"]]
+                regreso = df_rutas.iloc[combos.loc[x, "pos_regreso"]]
+                return f"{vacio['Ruta']} + {regreso['Cliente']} - {regreso['Ruta']} (${combos.loc[x, 'Utilidad']:,.2f})"
+
+            opcion = st.selectbox("Regreso con vacío sugerido (por utilidad)", combos.index, format_func=describir_combo)
+            vacio = df_rutas.iloc[combos.loc[opcion, "pos_vacio"]]
+            expo = df_rutas.iloc[combos.loc[opcion, "pos_regreso"]]
             rutas = [ida, vacio, expo]
         else:
             st.warning("No se encontraron rutas de regreso disponibles.")
@@ -204,32 +273,20 @@ if not incompletos.empty:
     for tramo in rutas:
         st.markdown(f"**{tramo['Tipo']}** | {tramo['Origen']} → {tramo['Destino']} | Cliente: {tramo.get('Cliente', 'Sin cliente')}")
 
-    ingreso = sum(safe(r["Ingreso Total"]) for r in rutas)
-    costo = sum(safe(r["Costo_Total_Ruta"]) for r in rutas)
-    utilidad = ingreso - costo
-    indirectos = ingreso * 0.35
-    utilidad_neta = utilidad - indirectos
+    totales = totales_tramos(rutas)
 
     st.header("📊 Ingresos y Utilidades")
-    st.metric("Ingreso Total", f"${ingreso:,.2f}")
-    st.metric("Costo Total", f"${costo:,.2f}")
-    st.metric("Utilidad Bruta", f"${utilidad:,.2f} ({(utilidad/ingreso*100):.2f}%)")
-    st.metric("Costos Indirectos (35%)", f"${indirectos:,.2f}")
-    st.metric("Utilidad Neta", f"${utilidad_neta:,.2f} ({(utilidad_neta/ingreso*100):.2f}%)")
+    st.metric("Ingreso Total", f"${totales['Ingreso Total']:,.2f}")
+    st.metric("Costo Total", f"${totales['Costo Total']:,.2f}")
+    st.metric("Utilidad Bruta", f"${totales['Utilidad Bruta']:,.2f} ({totales['% Utilidad Bruta']:.2f}%)")
+    st.metric("Costos Indirectos (35%)", f"${totales['Costos Indirectos']:,.2f}")
+    st.metric("Utilidad Neta", f"${totales['Utilidad Neta']:,.2f} ({totales['% Utilidad Neta']:.2f}%)")
 
     if st.button("📅 Guardar y cerrar tráfico"):
-        nuevos_tramos = []
-        for tramo in rutas[1:]:
-            datos = tramo.copy()
-            datos["Fecha"] = ida["Fecha"]
-            datos["Número_Trafico"] = ida["Número_Trafico"]
-            datos["Unidad"] = ida["Unidad"]
-            datos["Operador"] = ida["Operador"]
-            datos["ID_Programacion"] = ida["ID_Programacion"]
-            datos["Tramo"] = "VUELTA"
-            nuevos_tramos.append(datos)
-        guardar_programacion(pd.DataFrame(nuevos_tramos))
-        st.success("✅ Tráfico cerrado exitosamente.")
+        if cerrar_traficos(armar_tramos_vuelta(ida, rutas[1:])):
+            st.success("✅ Tráfico cerrado exitosamente.")
+        else:
+            st.warning("⚠️ Otro usuario ya cerró este tráfico; no se guardó un segundo regreso.")
 else:
     st.info("No hay tráficos pendientes.")
 
@@ -239,51 +296,48 @@ else:
 st.markdown("---")
 st.title("✅ Tráficos Concluidos con Filtro de Fechas")
 
-if not os.path.exists(RUTA_PROG):
+if not existe_viajes():
     st.error("❌ No se encontró el archivo de viajes programados.")
     st.stop()
 
-df = pd.read_csv(RUTA_PROG)
-programaciones = df.groupby("ID_Programacion").size().reset_index(name="Tramos")
-concluidos = programaciones[programaciones["Tramos"] >= 2]["ID_Programacion"]
+with etapa("cargar estado de tráficos"):
+    estado = cargar_estado_viajes()
+concluidos = estado[estado["Estado"] == CONCLUIDO]
 
 if concluidos.empty:
     st.info("Aún no hay tráficos concluidos.")
 else:
-    df_concluidos = df[df["ID_Programacion"].isin(concluidos)].copy()
-    df_concluidos["Fecha"] = pd.to_datetime(df_concluidos["Fecha"])
+    fechas = pd.to_datetime(concluidos["Fecha"])
 
     st.subheader("📅 Filtro por Fecha")
     col1, col2 = st.columns(2)
     with col1:
-        fecha_inicio = st.date_input("Fecha inicio", value=df_concluidos["Fecha"].min().date())
+        fecha_inicio = st.date_input("Fecha inicio", value=fechas.min().date())
     with col2:
-        fecha_fin = st.date_input("Fecha fin", value=df_concluidos["Fecha"].max().date())
+        fecha_fin = st.date_input("Fecha fin", value=fechas.max().date())
 
-    filtro = (df_concluidos["Fecha"] >= pd.to_datetime(fecha_inicio)) & (df_concluidos["Fecha"] <= pd.to_datetime(fecha_fin))
-    df_filtrado = df_concluidos[filtro]
+    # Sólo se leen las particiones mensuales del rango y las columnas del resumen
+    with etapa("cargar viajes del rango"):
+        df_filtrado = cargar_viajes(desde=fecha_inicio, hasta=fecha_fin,
+                                    columnas=["ID_Programacion", "Número_Trafico", "Fecha", "Ingreso Total", "Costo_Total_Ruta"])
+    with etapa("filtrar concluidos", filas=len(df_filtrado)):
+        df_filtrado = df_filtrado[df_filtrado["ID_Programacion"].isin(concluidos.index)]
 
     if df_filtrado.empty:
         st.warning("No hay tráficos concluidos en ese rango de fechas.")
     else:
-        resumen = df_filtrado.groupby(["ID_Programacion", "Número_Trafico", "Fecha"]).agg({
-            "Ingreso Total": "sum",
-            "Costo_Total_Ruta": "sum"
-        }).reset_index()
-
-        resumen["Utilidad Bruta"] = resumen["Ingreso Total"] - resumen["Costo_Total_Ruta"]
-        resumen["% Utilidad Bruta"] = (resumen["Utilidad Bruta"] / resumen["Ingreso Total"] * 100).round(2)
-        resumen["Costos Indirectos (35%)"] = (resumen["Ingreso Total"] * 0.35).round(2)
-        resumen["Utilidad Neta"] = resumen["Utilidad Bruta"] - resumen["Costos Indirectos (35%)"]
-        resumen["% Utilidad Neta"] = (resumen["Utilidad Neta"] / resumen["Ingreso Total"] * 100).round(2)
+        with etapa("resumir concluidos", filas=len(df_filtrado)):
+            resumen = resumir_concluidos(df_filtrado)
 
         st.subheader("📋 Resumen de Viajes Concluidos")
-        st.dataframe(resumen, use_container_width=True)
+        with etapa("mostrar resumen"):
+            st.dataframe(resumen, use_container_width=True)
 
-        csv = resumen.to_csv(index=False).encode("utf-8")
         st.download_button(
             "📥 Descargar Resumen en CSV",
-            data=csv,
+            data=lambda: resumen.to_csv(index=False).encode("utf-8"),
             file_name="resumen_traficos_concluidos.csv",
             mime="text/csv"
         )
+
+cerrar_pagina()
@@ -1,45 +1,108 @@
 import streamlit as st
 import pandas as pd
-import os
-from datetime import datetime
 
-RUTA_RUTAS = "rutas_guardadas.csv"
-RUTA_DATOS = "datos_generales.csv"
+from picus.almacen import actualizar_ruta, cargar_rutas, eliminar_rutas, existe_catalogo
+from picus.compacto import como_objetos, reporte_memoria
+from picus.costos import costear_ruta
+from picus.datos import cargar_catalogo, cargar_datos_generales
+from picus.explorador import filtrar_rutas, pagina_de_rutas
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
 
-def cargar_datos_generales():
-    if os.path.exists(RUTA_DATOS):
-        return pd.read_csv(RUTA_DATOS).set_index("Parametro").to_dict()["Valor"]
-    else:
-        return {}
+COLUMNAS_VISTA = ["ID_Ruta", "Fecha", "Tipo", "Modo_Viaje", "Cliente", "Origen", "Destino", "KM",
+                  "Ingreso Total", "Costo_Total_Ruta", "Utilidad", "% Utilidad"]
 
-def safe_number(x):
-    return 0 if (x is None or (isinstance(x, float) and pd.isna(x))) else x
+iniciar_pagina("Gestión de Rutas")
 
 st.title("🗂️ Gestión de Rutas Guardadas")
 
-if os.path.exists(RUTA_RUTAS):
-    df = pd.read_csv(RUTA_RUTAS)
+if existe_catalogo():
     valores = cargar_datos_generales()
 
+    # ==============================
+    # Explorador paginado: filtros y orden en el servidor
+    # ==============================
     st.subheader("📋 Rutas Registradas")
-    st.dataframe(df, use_container_width=True)
-    st.markdown(f"**Total de rutas registradas:** {len(df)}")
+    with etapa("cargar rutas"):
+        catalogo = cargar_catalogo()
+
+    def opciones(columna):
+        return sorted(catalogo[columna].dropna().astype(str).unique().tolist())
+
+    with st.expander("🔎 Filtros", expanded=False):
+        col_f1, col_f2 = st.columns(2)
+        with col_f1:
+            f_tipos = st.multiselect("Tipo", ["IMPO", "EXPO", "VACIO"])
+            f_clientes = st.multiselect("Cliente", opciones("Cliente"))
+            f_origenes = st.multiselect("Origen", opciones("Origen"))
+            f_destinos = st.multiselect("Destino", opciones("Destino"))
+        with col_f2:
+            usar_fechas = st.checkbox("Filtrar por fecha")
+            rango_fechas = st.date_input("Rango de fechas", value=(), disabled=not usar_fechas)
+            usar_utilidad = st.checkbox("Filtrar por % utilidad")
+            rango_utilidad = st.slider("% Utilidad", -100.0, 100.0, (-100.0, 100.0), disabled=not usar_utilidad)
+    texto = st.text_input("Buscar cliente, ciudad o ID")
+
+    col_o1, col_o2, col_o3 = st.columns([2, 1, 1])
+    with col_o1:
+        orden = st.selectbox("Ordenar por", ["% Utilidad", "Utilidad", "Fecha", "Cliente", "Origen", "Destino", "KM", "Ingreso Total"])
+    with col_o2:
+        ascendente = st.radio("Sentido", ["Desc", "Asc"], horizontal=True) == "Asc"
+    with col_o3:
+        tamano = st.selectbox("Filas por página", [25, 50, 100, 250], index=1)
+
+    desde, hasta = (rango_fechas + (None, None))[:2] if usar_fechas and isinstance(rango_fechas, tuple) else (None, None)
+    with etapa("filtrar rutas", filas=len(catalogo)):
+        mascara = filtrar_rutas(
+            catalogo, tipos=f_tipos, clientes=f_clientes, origenes=f_origenes, destinos=f_destinos,
+            desde=desde, hasta=hasta,
+            utilidad_min=rango_utilidad[0] if usar_utilidad else None,
+            utilidad_max=rango_utilidad[1] if usar_utilidad else None,
+            texto=texto
+        )
+    paginas = max(1, -(-int(mascara.sum()) // tamano))
+    numero = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1)
+    with etapa("ordenar y paginar", filas=int(mascara.sum())):
+        vista, total, paginas = pagina_de_rutas(catalogo, mascara, orden=orden, ascendente=ascendente, numero=numero, tamano=tamano)
+
+    with etapa("mostrar tabla"):
+        st.dataframe(vista[[c for c in COLUMNAS_VISTA if c in vista.columns]], use_container_width=True, hide_index=True)
+    inicio = (numero - 1) * tamano
+    st.markdown(f"**Mostrando {min(inicio + 1, total)}–{min(inicio + len(vista), total)} de {total:,} rutas filtradas** "
+                f"({len(catalogo):,} registradas)")
+
+    # Las acciones sólo ofrecen las rutas de la página visible, identificadas por ID_Ruta
+    ids_pagina = vista["ID_Ruta"].astype(str).tolist()
+    etiquetas = dict(zip(ids_pagina, (
+        f"{t} - {c} - {o} → {d} ({i})"
+        for i, t, c, o, d in zip(ids_pagina, vista["Tipo"], vista["Cliente"], vista["Origen"], vista["Destino"])
+    )))
+
+    with st.expander("🧠 Memoria del catálogo"):
+        # El reporte recorre todo el catálogo; sólo se calcula a petición. La copia como
+        # objetos se lee sin el caché del proceso y se libera al terminar el reporte
+        if st.checkbox("Calcular reporte de memoria"):
+            with etapa("reporte de memoria", filas=len(catalogo)):
+                compacto = reporte_memoria(catalogo)
+                plano = reporte_memoria(como_objetos(cargar_rutas()))
+            col_a, col_b = st.columns(2)
+            col_a.metric("Catálogo compacto (compartido)", f"{compacto['KB'].sum() / 1024:,.2f} MB")
+            col_b.metric("Mismo catálogo como objetos", f"{plano['KB'].sum() / 1024:,.2f} MB")
+            st.dataframe(compacto, use_container_width=True, hide_index=True)
     st.markdown("---")
 
     st.subheader("🗑️ Eliminar rutas")
-    indices = st.multiselect("Selecciona los índices a eliminar", df.index.tolist())
-    if st.button("Eliminar rutas seleccionadas") and indices:
-        df.drop(index=indices, inplace=True)
-        df.reset_index(drop=True, inplace=True)
-        df.to_csv(RUTA_RUTAS, index=False)
-        st.success("✅ Rutas eliminadas correctamente.")
-        st.experimental_rerun()
+    ids_eliminar = st.multiselect("Selecciona las rutas a eliminar (página actual)", ids_pagina, format_func=etiquetas.get)
+    if st.button("Eliminar rutas seleccionadas") and ids_eliminar:
+        with etapa("eliminar rutas"):
+            eliminadas = eliminar_rutas(ids_eliminar)
+        st.success(f"✅ {eliminadas} rutas eliminadas correctamente.")
+        st.rerun()
 
     st.markdown("---")
     st.subheader("✏️ Editar Ruta Existente")
-    indice_editar = st.selectbox("Selecciona el índice a editar", df.index.tolist())
-    if indice_editar is not None:
-        ruta = df.loc[indice_editar]
+    id_editar = st.selectbox("Selecciona la ruta a editar (página actual)", ids_pagina, format_func=etiquetas.get)
+    if id_editar is not None:
+        ruta = vista[vista["ID_Ruta"].astype(str) == id_editar].iloc[0]
         st.markdown("### Modifica los valores de la ruta:")
         with st.form("editar_ruta"):
             col1, col2 = st.columns(2)
@@ -79,80 +142,57 @@ if os.path.exists(RUTA_RUTAS):
             guardar = st.form_submit_button("📅 Guardar cambios")
 
             if guardar:
-                tc_usd = valores.get("Tipo de cambio USD", 17.5)
-                tc_mxn = valores.get("Tipo de cambio MXN", 1.0)
-                tipo_cambio_flete = tc_usd if moneda_ingreso == "USD" else tc_mxn
-                tipo_cambio_cruce = tc_usd if moneda_cruce == "USD" else tc_mxn
-                tipo_cambio_costo_cruce = tc_usd if moneda_costo_cruce == "USD" else tc_mxn
-
-                ingreso_flete_convertido = ingreso_original * tipo_cambio_flete
-                ingreso_cruce_convertido = ingreso_cruce * tipo_cambio_cruce
-                ingreso_total = ingreso_flete_convertido + ingreso_cruce_convertido
-                costo_cruce_convertido = costo_cruce * tipo_cambio_costo_cruce
-
-                rendimiento_camion = valores.get("Rendimiento Camion", 2.5)
-                costo_diesel = valores.get("Costo Diesel", 24.0)
-                costo_diesel_camion = (km / rendimiento_camion) * costo_diesel
-
-                pago_km = valores.get("Pago x KM (General)", 1.50)
-                bono_isr = valores.get("Bono ISR IMSS", 462.66) if tipo != "VACIO" else 0.0
-                bono_rendimiento = valores.get("Bono Rendimiento", 250.0) if tipo != "VACIO" else 0.0
-
-                if modo_viaje == "Team":
-                    sueldo = 1300
-                    bono = bono_isr * 2
-                else:
-                    sueldo = 100 if tipo == "VACIO" and km < 100 else km * pago_km
-                    bono = 0 if tipo == "VACIO" else bono_isr
-
-                extras = sum(map(safe_number, [
-                    movimiento_local, puntualidad, pension, estancia,
-                    pistas_extra, stop, falso, gatas, accesorios, guias
-                ]))
-
-                costo_total = costo_diesel_camion + sueldo + bono + bono_rendimiento + casetas + extras + costo_cruce_convertido
-
-                # Guardar cambios
-                df.at[indice_editar, "Fecha"] = fecha
-                df.at[indice_editar, "Tipo"] = tipo
-                df.at[indice_editar, "Modo_Viaje"] = modo_viaje
-                df.at[indice_editar, "Cliente"] = cliente
-                df.at[indice_editar, "Origen"] = origen
-                df.at[indice_editar, "Destino"] = destino
-                df.at[indice_editar, "KM"] = km
-                df.at[indice_editar, "Moneda"] = moneda_ingreso
-                df.at[indice_editar, "Ingreso_Original"] = ingreso_original
-                df.at[indice_editar, "Tipo de cambio"] = tipo_cambio_flete
-                df.at[indice_editar, "Ingreso Flete"] = ingreso_flete_convertido
-                df.at[indice_editar, "Moneda_Cruce"] = moneda_cruce
-                df.at[indice_editar, "Cruce_Original"] = ingreso_cruce
-                df.at[indice_editar, "Tipo cambio Cruce"] = tipo_cambio_cruce
-                df.at[indice_editar, "Ingreso Cruce"] = ingreso_cruce_convertido
-                df.at[indice_editar, "Ingreso Total"] = ingreso_total
-                df.at[indice_editar, "Moneda Costo Cruce"] = moneda_costo_cruce
-                df.at[indice_editar, "Costo Cruce"] = costo_cruce
-                df.at[indice_editar, "Costo Cruce Convertido"] = costo_cruce_convertido
-                df.at[indice_editar, "Pago por KM"] = pago_km
-                df.at[indice_editar, "Sueldo_Operador"] = sueldo
-                df.at[indice_editar, "Bono"] = bono
-                df.at[indice_editar, "Bono Rendimiento"] = bono_rendimiento
-                df.at[indice_editar, "Casetas"] = casetas
-                df.at[indice_editar, "Movimiento_Local"] = movimiento_local
-                df.at[indice_editar, "Puntualidad"] = puntualidad
-                df.at[indice_editar, "Pension"] = pension
-                df.at[indice_editar, "Estancia"] = estancia
-                df.at[indice_editar, "Pistas Extra"] = pistas_extra
-                df.at[indice_editar, "Stop"] = stop
-                df.at[indice_editar, "Falso"] = falso
-                df.at[indice_editar, "Gatas"] = gatas
-                df.at[indice_editar, "Accesorios"] = accesorios
-                df.at[indice_editar, "Guías"] = guias
-                df.at[indice_editar, "Costo_Diesel_Camion"] = costo_diesel_camion
-                df.at[indice_editar, "Costo_Extras"] = extras
-                df.at[indice_editar, "Costo_Total_Ruta"] = costo_total
-
-                df.to_csv(RUTA_RUTAS, index=False)
-                st.success("✅ Ruta actualizada exitosamente.")
-                st.stop()
+                costos = costear_ruta({
+                    "Tipo": tipo, "Modo_Viaje": modo_viaje, "KM": km, "Casetas": casetas,
+                    "Moneda": moneda_ingreso, "Ingreso_Original": ingreso_original,
+                    "Moneda_Cruce": moneda_cruce, "Cruce_Original": ingreso_cruce,
+                    "Moneda Costo Cruce": moneda_costo_cruce, "Costo Cruce": costo_cruce,
+                    "Movimiento_Local": movimiento_local, "Puntualidad": puntualidad,
+                    "Pension": pension, "Estancia": estancia,
+                    "Pistas Extra": pistas_extra, "Stop": stop, "Falso": falso,
+                    "Gatas": gatas, "Accesorios": accesorios, "Guías": guias
+                }, valores)
+                tipo_cambio_flete = costos["Tipo de cambio"]
+                ingreso_flete_convertido = costos["Ingreso Flete"]
+                tipo_cambio_cruce = costos["Tipo cambio Cruce"]
+                ingreso_cruce_convertido = costos["Ingreso Cruce"]
+                ingreso_total = costos["Ingreso Total"]
+                costo_cruce_convertido = costos["Costo Cruce Convertido"]
+                pago_km = costos["Pago por KM"]
+                sueldo = costos["Sueldo_Operador"]
+                bono = costos["Bono"]
+                bono_rendimiento = costos["Bono Rendimiento"]
+                costo_diesel_camion = costos["Costo_Diesel_Camion"]
+                extras = costos["Costo_Extras"]
+                costo_total = costos["Costo_Total_Ruta"]
+
+                # Guardar cambios: sólo se registra la edición de esta ruta
+                cambios = {
+                    "Fecha": fecha, "Tipo": tipo, "Modo_Viaje": modo_viaje,
+                    "Cliente": cliente, "Origen": origen, "Destino": destino, "KM": km,
+                    "Moneda": moneda_ingreso, "Ingreso_Original": ingreso_original,
+                    "Tipo de cambio": tipo_cambio_flete, "Ingreso Flete": ingreso_flete_convertido,
+                    "Moneda_Cruce": moneda_cruce, "Cruce_Original": ingreso_cruce,
+                    "Tipo cambio Cruce": tipo_cambio_cruce, "Ingreso Cruce": ingreso_cruce_convertido,
+                    "Ingreso Total": ingreso_total,
+                    "Moneda Costo Cruce": moneda_costo_cruce, "Costo Cruce": costo_cruce,
+                    "Costo Cruce Convertido": costo_cruce_convertido,
+                    "Pago por KM": pago_km, "Sueldo_Operador": sueldo,
+                    "Bono": bono, "Bono Rendimiento": bono_rendimiento,
+                    "Casetas": casetas, "Movimiento_Local": movimiento_local, "Puntualidad": puntualidad,
+                    "Pension": pension, "Estancia": estancia, "Pistas Extra": pistas_extra,
+                    "Stop": stop, "Falso": falso, "Gatas": gatas, "Accesorios": accesorios, "Guías": guias,
+                    "Costo_Diesel_Camion": costo_diesel_camion, "Costo_Extras": extras,
+                    "Costo_Total_Ruta": costo_total
+                }
+                try:
+                    with etapa("guardar edición"):
+                        actualizar_ruta(id_editar, cambios)
+                    st.success("✅ Ruta actualizada exitosamente.")
+                    st.stop()
+                except KeyError:
+                    st.error("⚠️ La ruta fue eliminada por otro usuario.")
 else:
     st.warning("⚠️ No hay rutas guardadas todavía.")
+
+cerrar_pagina()
@@ -2,30 +2,39 @@ import streamlit as st
 import pandas as pd
 import os
 
-st.title("📂 Administración de Archivos PICUS")
+from picus.almacen import ErrorImportacion, existe_catalogo, importar_csv, recalcular_catalogo
+from picus.datos import RUTA_DATOS, cargar_datos_generales, cargar_rutas, guardar_datos_generales
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
+from picus.respaldo import leer_respaldo
+
+iniciar_pagina("Archivos")
 
-# Archivos
-RUTA_RUTAS = "rutas_guardadas.csv"
-RUTA_DATOS = "datos_generales.csv"
+st.title("📂 Administración de Archivos PICUS")
 
 st.subheader("📥 Descargar respaldos")
 
-# Descargar rutas_guardadas.csv
-if os.path.exists(RUTA_RUTAS):
-    rutas = pd.read_csv(RUTA_RUTAS)
+# Respaldo completo: se arma en disco sólo al descargarlo y se reutiliza mientras los datos no cambien
+st.download_button(
+    label="📦 Descargar respaldo completo (.tar.gz)",
+    data=leer_respaldo,
+    file_name="respaldo_picus.tar.gz",
+    mime="application/gzip"
+)
+st.caption("Incluye rutas, datos generales y viajes programados, con un manifiesto de filas y sumas sha256.")
+
+# Descargas individuales: el CSV se genera hasta que se pide
+if existe_catalogo():
     st.download_button(
         label="Descargar rutas_guardadas.csv",
-        data=rutas.to_csv(index=False),
+        data=lambda: cargar_rutas().to_csv(index=False),
         file_name="rutas_guardadas.csv",
         mime="text/csv"
     )
 
-# Descargar datos_generales.csv
 if os.path.exists(RUTA_DATOS):
-    datos = pd.read_csv(RUTA_DATOS)
     st.download_button(
         label="Descargar datos_generales.csv",
-        data=datos.to_csv(index=False),
+        data=lambda: pd.read_csv(RUTA_DATOS).to_csv(index=False),
         file_name="datos_generales.csv",
         mime="text/csv"
     )
@@ -33,24 +42,45 @@ if os.path.exists(RUTA_DATOS):
 st.markdown("---")
 st.subheader("📤 Restaurar desde archivos")
 
-# Subir rutas_guardadas.csv
+# Subir rutas_guardadas.csv: se valida y se importa por bloques
 rutas_file = st.file_uploader("Subir rutas_guardadas.csv", type="csv", key="rutas_upload")
 if rutas_file:
-    try:
-        rutas_df = pd.read_csv(rutas_file)
-        rutas_df.to_csv(RUTA_RUTAS, index=False)
-        st.success("✅ Rutas restauradas correctamente.")
-        st.rerun()
-    except Exception as e:
-        st.error(f"❌ Error al cargar rutas: {e}")
+    modo = st.radio("Modo de importación", ["Combinar con el catálogo actual", "Reemplazar el catálogo"], horizontal=True)
+    if st.button("📥 Importar rutas"):
+        barra = st.progress(0.0, text="Importando rutas…")
+
+        def avance(filas, fraccion):
+            barra.progress(fraccion or 0.0, text=f"Importando rutas… {filas:,} filas")
+
+        try:
+            with etapa("importar rutas"):
+                resumen = importar_csv(rutas_file, reemplazar=modo.startswith("Reemplazar"), progreso=avance)
+            st.success(f"✅ {resumen['importadas']:,} rutas importadas "
+                       f"({resumen['reemplazadas']:,} reemplazadas, {resumen['duplicadas']:,} duplicadas omitidas).")
+            if resumen["columnas_ignoradas"]:
+                st.info(f"Columnas ignoradas: {', '.join(resumen['columnas_ignoradas'])}")
+        except ErrorImportacion as e:
+            st.error("❌ El archivo no es válido; el catálogo no se modificó.")
+            for error in e.errores:
+                st.write(f"- {error}")
+        except Exception as e:
+            st.error(f"❌ Error al cargar rutas: {e}")
 
 # Subir datos_generales.csv
 datos_file = st.file_uploader("Subir datos_generales.csv", type="csv", key="datos_upload")
-if datos_file:
+# Cada archivo subido se restaura una sola vez; el rerun de abajo no debe volver a guardarlo y recalcular
+if datos_file and st.session_state.get("datos_restaurados") != datos_file.file_id:
     try:
         datos_df = pd.read_csv(datos_file)
-        datos_df.to_csv(RUTA_DATOS, index=False)
+        guardar_datos_generales(datos_df.set_index("Parametro")["Valor"].to_dict())
+        # El catálogo guardado se costeó con los datos anteriores: se recalcula con los restaurados
+        if existe_catalogo():
+            with etapa("recalcular catálogo"):
+                recalcular_catalogo(cargar_datos_generales())
+        st.session_state["datos_restaurados"] = datos_file.file_id
         st.success("✅ Datos generales restaurados correctamente.")
         st.rerun()
     except Exception as e:
         st.error(f"❌ Error al cargar datos generales: {e}")
+
+cerrar_pagina()
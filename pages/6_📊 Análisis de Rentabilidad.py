@@ -0,0 +1,95 @@
+import streamlit as st
+import pandas as pd
+
+from picus.analitica import CONTEO, DIMENSIONES, filtrar_cubo, resumir
+from picus.datos import cubo_rutas, cubo_viajes
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
+
+iniciar_pagina("Análisis de Rentabilidad")
+
+st.title("📊 Análisis de Rentabilidad")
+
+# Todo sale de los cubos pre-agregados: ningún filtro vuelve a leer rutas ni viajes
+fuente = st.radio("Fuente", ["Rutas cotizadas", "Viajes programados"], horizontal=True)
+with etapa("cargar cubo"):
+    if fuente == "Rutas cotizadas":
+        cubo, unidad = cubo_rutas(), "Rutas"
+    else:
+        cubo, unidad = cubo_viajes(), "Tramos"
+
+if cubo.empty:
+    st.warning("⚠️ No hay datos para analizar en esta fuente.")
+    st.stop()
+
+ETIQUETAS = {"Mes": "Mes", "Cliente": "Cliente", "Carril": "Carril (Origen → Destino)",
+             "Tipo": "Tipo", "Modo_Viaje": "Modo de viaje"}
+
+def opciones(dimension):
+    return sorted(cubo[dimension].astype(str).unique().tolist())
+
+# ==============================
+# Filtros y agrupación
+# ==============================
+with st.expander("🔎 Filtros", expanded=False):
+    meses = opciones("Mes")
+    col_f1, col_f2 = st.columns(2)
+    with col_f1:
+        if len(meses) > 1:
+            mes_inicio, mes_fin = st.select_slider("Meses", options=meses, value=(meses[0], meses[-1]))
+        else:
+            mes_inicio = mes_fin = meses[0]
+        f_clientes = st.multiselect("Cliente", opciones("Cliente"))
+        f_carriles = st.multiselect("Carril", opciones("Carril"))
+    with col_f2:
+        f_tipos = st.multiselect("Tipo", opciones("Tipo"))
+        f_modos = st.multiselect("Modo de viaje", opciones("Modo_Viaje"))
+
+por = st.multiselect("Agrupar por", DIMENSIONES, default=["Cliente"], format_func=ETIQUETAS.get)
+
+with etapa("filtrar cubo", filas=len(cubo)):
+    seleccion = filtrar_cubo(cubo, Cliente=f_clientes, Carril=f_carriles, Tipo=f_tipos, Modo_Viaje=f_modos)
+    seleccion = seleccion[(seleccion["Mes"] >= mes_inicio) & (seleccion["Mes"] <= mes_fin)]
+if seleccion.empty:
+    st.info("No hay registros con los filtros seleccionados.")
+    st.stop()
+
+# ==============================
+# Totales
+# ==============================
+total = resumir(seleccion).iloc[0]
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Ingreso Total", f"${total['Ingreso Total']:,.2f}")
+col2.metric("Costo Total", f"${total['Costo_Total_Ruta']:,.2f}")
+col3.metric("Utilidad Bruta", f"${total['Utilidad']:,.2f}",
+            f"{total['% Margen']:.2f}%" if pd.notna(total["% Margen"]) else None)
+col4.metric(unidad, f"{int(total[CONTEO]):,}")
+
+# ==============================
+# Tabla por dimensión
+# ==============================
+with etapa("agrupar", filas=len(seleccion)):
+    tabla = resumir(seleccion, por).rename(columns={CONTEO: unidad})
+    if por:
+        tabla = tabla.sort_values("Utilidad", ascending=False)
+st.subheader("📋 Rentabilidad por " + (", ".join(ETIQUETAS[d] for d in por) if por else "total"))
+with etapa("mostrar tabla"):
+    st.dataframe(tabla, use_container_width=True, hide_index=True)
+st.download_button(
+    "📥 Descargar tabla en CSV",
+    data=lambda: tabla.to_csv(index=False).encode("utf-8"),
+    file_name="rentabilidad.csv",
+    mime="text/csv"
+)
+
+if por:
+    st.subheader("🏆 Utilidad por grupo (20 mayores)")
+    grafica = tabla.head(20).copy()
+    grafica["Grupo"] = grafica[por].astype(str).agg(" | ".join, axis=1)
+    st.bar_chart(grafica.set_index("Grupo")["Utilidad"])
+
+if "Mes" not in por or len(por) > 1:
+    st.subheader("📈 Tendencia mensual")
+    mensual = resumir(seleccion, ["Mes"]).set_index("Mes")
+    st.line_chart(mensual[["Ingreso Total", "Costo_Total_Ruta", "Utilidad"]])
+
+cerrar_pagina()
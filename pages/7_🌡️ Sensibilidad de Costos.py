@@ -0,0 +1,115 @@
+import streamlit as st
+import altair as alt
+import numpy as np
+
+from picus.almacen import existe_catalogo
+from picus.costos import PARAMETROS_SENSIBLES, parametro
+from picus.datos import cargar_catalogo, cargar_datos_generales
+from picus.instrumentacion import cerrar_pagina, etapa, iniciar_pagina
+from picus.sensibilidad import RANGOS_SUGERIDOS, barrido
+
+iniciar_pagina("Sensibilidad de Costos")
+
+st.title("🌡️ Sensibilidad de Costos - ¿Qué pasaría si...?")
+
+if not existe_catalogo():
+    st.error("❌ No se encontró el catálogo de rutas")
+    st.stop()
+
+valores = cargar_datos_generales()
+with etapa("cargar rutas"):
+    catalogo = cargar_catalogo()
+
+def opciones(columna):
+    return sorted(catalogo[columna].dropna().astype(str).unique().tolist())
+
+# ==============================
+# Rutas a evaluar
+# ==============================
+st.subheader("🛣️ Rutas a evaluar")
+col_f1, col_f2 = st.columns(2)
+with col_f1:
+    f_tipos = st.multiselect("Tipo", ["IMPO", "EXPO", "VACIO"], default=["IMPO", "EXPO"])
+    f_clientes = st.multiselect("Cliente", opciones("Cliente"))
+with col_f2:
+    f_carriles = st.multiselect("Carril (Origen → Destino)", opciones("Ruta"))
+    modo = st.radio("Modo de viaje", ["El de cada ruta", "Operador", "Team"], horizontal=True)
+
+mascara = np.ones(len(catalogo), dtype=bool)
+for columna, seleccion in (("Tipo", f_tipos), ("Cliente", f_clientes), ("Ruta", f_carriles)):
+    if seleccion:
+        mascara &= catalogo[columna].astype(str).isin(seleccion).to_numpy()
+rutas = catalogo[mascara]
+st.caption(f"{len(rutas):,} rutas seleccionadas de {len(catalogo):,}")
+if rutas.empty:
+    st.warning("⚠️ No hay rutas con los filtros seleccionados.")
+    st.stop()
+
+# ==============================
+# Malla de parámetros
+# ==============================
+st.subheader("🎚️ Parámetros a barrer")
+parametros = st.multiselect("Uno o dos parámetros de Datos Generales", PARAMETROS_SENSIBLES,
+                            default=["Costo Diesel", "Tipo de cambio USD"], max_selections=2)
+if not parametros:
+    st.info("Selecciona al menos un parámetro.")
+    st.stop()
+
+ejes = {}
+columnas = st.columns(len(parametros))
+for col, clave in zip(columnas, parametros):
+    with col:
+        minimo, maximo = RANGOS_SUGERIDOS[clave]
+        st.markdown(f"**{clave}** (actual: {parametro(valores, clave):,.2f})")
+        desde = st.number_input("Desde", value=minimo, key=f"desde_{clave}")
+        hasta = st.number_input("Hasta", value=maximo, key=f"hasta_{clave}")
+        pasos = st.slider("Puntos", 2, 100, 21, key=f"pasos_{clave}")
+        if clave == "Rendimiento Camion" and min(desde, hasta) <= 0:
+            st.error("❌ El rendimiento debe ser mayor a cero")
+            st.stop()
+        ejes[clave] = np.linspace(desde, hasta, pasos)
+
+indirectos = st.checkbox("Descontar costos indirectos (35%) en la utilidad", value=False)
+
+with etapa("barrido", filas=len(rutas) * int(np.prod([len(e) for e in ejes.values()]))):
+    resultado = barrido(rutas, valores, ejes, modo=None if modo == "El de cada ruta" else modo, indirectos=indirectos)
+resultado[parametros] = resultado[parametros].round(4)
+
+# ==============================
+# Resultados
+# ==============================
+peor = resultado.loc[resultado["Utilidad"].idxmin()]
+mejor = resultado.loc[resultado["Utilidad"].idxmax()]
+col1, col2, col3 = st.columns(3)
+col1.metric("Peor utilidad", f"${peor['Utilidad']:,.2f}", f"{peor['% Margen']:.2f}%")
+col2.metric("Mejor utilidad", f"${mejor['Utilidad']:,.2f}", f"{mejor['% Margen']:.2f}%")
+col3.metric("Máximo de rutas que se vuelven no rentables", f"{int(resultado['Se vuelven no rentables'].max()):,}")
+
+METRICAS = ["Utilidad", "% Margen", "No rentables", "Se vuelven no rentables"]
+metrica = st.selectbox("Métrica a graficar", METRICAS)
+
+if len(parametros) == 2:
+    eje_x, eje_y = parametros
+    esquema = "redyellowgreen" if metrica in ("Utilidad", "% Margen") else "reds"
+    mapa = alt.Chart(resultado).mark_rect().encode(
+        # field= explícito: los nombres llevan espacios, paréntesis y %
+        x=alt.X(field=eje_x, type="ordinal", title=eje_x, axis=alt.Axis(labelOverlap=True, format=",.2f")),
+        y=alt.Y(field=eje_y, type="ordinal", title=eje_y, sort="descending", axis=alt.Axis(labelOverlap=True, format=",.2f")),
+        color=alt.Color(field=metrica, type="quantitative", scale=alt.Scale(scheme=esquema)),
+        tooltip=[alt.Tooltip(field=c, type="quantitative") for c in parametros + METRICAS],
+    )
+    with etapa("graficar"):
+        st.altair_chart(mapa, use_container_width=True)
+else:
+    st.line_chart(resultado.set_index(parametros[0])[[metrica]])
+
+with st.expander("📋 Tabla de la malla"):
+    st.dataframe(resultado, use_container_width=True, hide_index=True)
+    st.download_button(
+        "📥 Descargar malla en CSV",
+        data=lambda: resultado.to_csv(index=False).encode("utf-8"),
+        file_name="sensibilidad.csv",
+        mime="text/csv"
+    )
+
+cerrar_pagina()
@@ -0,0 +1 @@
+# Lógica compartida del cotizador PICUS (almacenamiento, costos, simulación)
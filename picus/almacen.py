@@ -0,0 +1,656 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from picus import analitica, instrumentacion
+from picus.bloqueo import bloqueo, escribir_atomico, publicar, verificar_version
+from picus.cache import firma, invalidar
+from picus.costos import COLUMNAS_CALCULADAS, calcular_costos
+
+# ==============================
+# Almacén de rutas: base compacta + log de operaciones
+# ==============================
+# La base es Parquet con esquema tipado (categorías para tipo, cliente y
+# ciudades; float64 para montos), lo que permite leer sólo algunas columnas.
+# La captura ya no reescribe el catálogo completo: cada ruta nueva se agrega
+# como una línea al log (O(1)). Ediciones y eliminaciones también son líneas
+# del log, referidas por ID_Ruta: "cambio" con los campos modificados y
+# "baja" como lápida. Un hilo en segundo plano compacta el log dentro de la
+# base cuando crece por encima del umbral. Cada escritura actualiza además el
+# cubo de rentabilidad (picus.analitica) con sólo las filas que tocó.
+
+RUTA_BASE = "rutas_guardadas.parquet"
+RUTA_CSV = "rutas_guardadas.csv"  # formato anterior, se migra una sola vez
+RUTA_LOG = "rutas_guardadas.log.jsonl"
+UMBRAL_COMPACTACION = 1_000_000  # bytes de log antes de compactar
+
+CLAVE_CACHE = "rutas"
+
+COLUMNA_ID = "ID_Ruta"
+
+COLUMNAS_RUTA = [
+    COLUMNA_ID, "Fecha", "Tipo", "Cliente", "Origen", "Destino",
+    "Modo_Viaje", "KM",
+    "Moneda", "Ingreso_Original", "Tipo de cambio",
+    "Ingreso Flete", "Moneda_Cruce", "Cruce_Original",
+    "Tipo cambio Cruce", "Ingreso Cruce",
+    "Moneda Costo Cruce", "Costo Cruce",
+    "Costo Cruce Convertido", "Ingreso Total",
+    "Pago por KM", "Sueldo_Operador", "Bono",
+    "Bono Rendimiento", "Casetas",
+    "Movimiento_Local", "Puntualidad",
+    "Pension", "Estancia",
+    "Pistas Extra", "Stop", "Falso",
+    "Gatas", "Accesorios", "Guías",
+    "Costo_Diesel_Camion", "Costo_Extras",
+    "Costo_Total_Ruta"
+]
+
+# Esquema declarado de la base en Parquet
+COLUMNAS_CATEGORICAS = [
+    "Tipo", "Cliente", "Origen", "Destino", "Modo_Viaje",
+    "Moneda", "Moneda_Cruce", "Moneda Costo Cruce"
+]
+COLUMNA_FECHA = "Fecha"
+COLUMNAS_NUMERICAS = [
+    c for c in COLUMNAS_RUTA if c not in COLUMNAS_CATEGORICAS + [COLUMNA_ID, COLUMNA_FECHA]
+]
+
+_lock_compactacion = threading.Lock()
+
+
+def nuevo_id():
+    return uuid.uuid4().hex[:12]
+
+
+def _leer_log(ruta_log):
+    registros = []
+    if not os.path.exists(ruta_log):
+        return registros
+    with open(ruta_log, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                registros.append(json.loads(linea))
+            except json.JSONDecodeError:
+                # Línea truncada por un proceso interrumpido: se ignora
+                continue
+    instrumentacion.leido(ruta_log, len(registros))
+    return registros
+
+
+def _asignar_ids(df):
+    if COLUMNA_ID not in df.columns:
+        df.insert(0, COLUMNA_ID, None)
+    faltantes = df[COLUMNA_ID].isna()
+    if faltantes.any():
+        df.loc[faltantes, COLUMNA_ID] = [nuevo_id() for _ in range(int(faltantes.sum()))]
+    return df
+
+
+def _ordenar_columnas(df):
+    conocidas = [c for c in COLUMNAS_RUTA if c in df.columns]
+    otras = [c for c in df.columns if c not in COLUMNAS_RUTA]
+    return df[conocidas + otras]
+
+
+def _como_texto(serie):
+    serie = serie.astype(object)
+    return serie.where(serie.isna(), serie.astype(str))
+
+
+def aplicar_esquema(df):
+    """Tipos declarados: categorías para textos repetidos, float64 para montos y fecha."""
+    df = df.copy()
+    for columna in df.columns:
+        if columna in COLUMNAS_CATEGORICAS:
+            df[columna] = _como_texto(df[columna]).astype("category")
+        elif columna in COLUMNAS_NUMERICAS:
+            df[columna] = pd.to_numeric(df[columna], errors="coerce").astype("float64")
+        elif columna == COLUMNA_FECHA:
+            df[columna] = pd.to_datetime(df[columna], errors="coerce").astype("datetime64[ns]")
+        elif df[columna].dtype == object or pd.api.types.is_string_dtype(df[columna]):
+            df[columna] = _como_texto(df[columna])
+    return df
+
+
+def _ruta_csv(ruta_base):
+    return os.path.splitext(ruta_base)[0] + ".csv"
+
+
+def ruta_cubo(ruta_base=RUTA_BASE):
+    return os.path.splitext(ruta_base)[0] + ".cubo"
+
+
+def _escribir_base(df, ruta_base):
+    df = aplicar_esquema(_ordenar_columnas(df))
+    escribir_atomico(ruta_base, lambda tmp: df.to_parquet(tmp, index=False))
+    invalidar(CLAVE_CACHE)
+
+
+def _migrar_csv(ruta_base):
+    # Importación única del catálogo en CSV (con o sin IDs) a la base Parquet
+    legado = _ruta_csv(ruta_base)
+    if os.path.exists(ruta_base) or not os.path.exists(legado):
+        return
+    with bloqueo(ruta_base):
+        if os.path.exists(ruta_base) or not os.path.exists(legado):
+            return
+        _escribir_base(_asignar_ids(pd.read_csv(legado)), ruta_base)
+        os.replace(legado, legado + ".migrado")
+
+
+def _leer_base(ruta_base, columnas=None, ids=None):
+    # Con `ids` sólo se leen esas filas: el filtro por ID se evalúa al leer el Parquet
+    if not os.path.exists(ruta_base) or (ids is not None and not ids):
+        return aplicar_esquema(pd.DataFrame(columns=columnas or COLUMNAS_RUTA))
+    if columnas is not None:
+        disponibles = set(pq.read_schema(ruta_base).names)
+        columnas = [c for c in columnas if c in disponibles]
+    filtros = [(COLUMNA_ID, "in", list(ids))] if ids is not None else None
+    base = pd.read_parquet(ruta_base, columns=columnas, filters=filtros)
+    instrumentacion.leido(ruta_base, len(base))
+    return base
+
+
+def existe_catalogo(ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    rutas = (ruta_base, _ruta_csv(ruta_base), ruta_log, ruta_log + ".compactando")
+    return any(os.path.exists(ruta) for ruta in rutas)
+
+
+def version_catalogo(ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Versión en disco del catálogo, para detectar escrituras concurrentes."""
+    return firma(ruta_base, ruta_log, ruta_log + ".compactando")
+
+
+def cargar_rutas(columnas=None, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Catálogo completo: base compacta más las altas pendientes del log.
+
+    Con `columnas` sólo se leen esas columnas de la base (ID_Ruta siempre se incluye).
+    """
+    if columnas is not None:
+        columnas = [COLUMNA_ID] + [c for c in columnas if c != COLUMNA_ID]
+    _migrar_csv(ruta_base)
+    # Candado compartido: base y log se leen sin una compactación a medias
+    with bloqueo(ruta_base, compartido=True):
+        base = _leer_base(ruta_base, columnas)
+        registros = _leer_log(ruta_log + ".compactando") + _leer_log(ruta_log)
+    if not registros:
+        return base.reset_index(drop=True)
+    return _aplicar_log(base, registros, columnas)
+
+
+def _id_registro(registro):
+    return registro["datos"].get(COLUMNA_ID) if registro.get("op") == "alta" else registro.get("id")
+
+
+def cargar_rutas_por_id(ids, columnas=None, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Sólo las rutas `ids` que existen, sin leer el catálogo completo.
+
+    De la base se leen sólo esas filas y del log sólo los registros que las tocan.
+    """
+    ids = list(dict.fromkeys(ids))
+    if columnas is not None:
+        columnas = [COLUMNA_ID] + [c for c in columnas if c != COLUMNA_ID]
+    _migrar_csv(ruta_base)
+    buscados = set(ids)
+    with bloqueo(ruta_base, compartido=True):
+        base = _leer_base(ruta_base, columnas, ids=ids)
+        registros = [r for r in _leer_log(ruta_log + ".compactando") + _leer_log(ruta_log)
+                     if _id_registro(r) in buscados]
+    if not registros:
+        return base.reset_index(drop=True)
+    return _aplicar_log(base, registros, columnas)
+
+
+def preparar_catalogo(ruta_base=RUTA_BASE):
+    """Migra el catálogo en CSV a Parquet si hace falta; va antes de tomar candados compartidos."""
+    _migrar_csv(ruta_base)
+
+
+def rutas_por_lotes(tamano=None, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Catálogo vigente en bloques de ~`tamano` filas, sin tenerlo completo en memoria.
+
+    Cada lote de la base sale con sus ediciones y bajas del log ya aplicadas y
+    las altas nuevas van al final, en el mismo orden que cargar_rutas. Todo se
+    lee con el candado compartido; quien ya lo tiene tomado llama antes a
+    preparar_catalogo.
+    """
+    _migrar_csv(ruta_base)
+    with bloqueo(ruta_base, compartido=True):
+        registros = _leer_log(ruta_log + ".compactando") + _leer_log(ruta_log)
+        por_id = {}
+        for registro in registros:
+            por_id.setdefault(_id_registro(registro), []).append(registro)
+        en_base, entregados = set(), 0
+        if os.path.exists(ruta_base):
+            for lote in pq.ParquetFile(ruta_base).iter_batches(batch_size=tamano or TAMANO_BLOQUE):
+                df = lote.to_pandas()
+                instrumentacion.leido(ruta_base, len(df))
+                tocadas = df.loc[df[COLUMNA_ID].isin(list(por_id)), COLUMNA_ID].tolist() if por_id else []
+                if tocadas:
+                    en_base.update(tocadas)
+                    df = _aplicar_log(df, [r for i in tocadas for r in por_id[i]])
+                entregados += 1
+                yield df
+        # Altas que no están en la base; sin ninguna fila sale un lote vacío con las columnas
+        altas = _aplicar_log(_leer_base(ruta_base, ids=[]),
+                             [r for r in registros if _id_registro(r) not in en_base])
+        if not altas.empty or not entregados:
+            yield altas
+
+
+def _aplicar_log(base, registros, columnas=None):
+    """Reproduce el log sobre la base: las ediciones conservan la posición de la ruta."""
+    completos = {}   # ID -> registro completo (altas)
+    parciales = {}   # ID -> campos modificados de rutas de la base
+    bajas = set()
+    for registro in registros:
+        op = registro.get("op")
+        if op == "alta":
+            id_ruta = registro["datos"][COLUMNA_ID]
+            completos[id_ruta] = dict(registro["datos"])
+            parciales.pop(id_ruta, None)
+            bajas.discard(id_ruta)
+        elif op == "cambio":
+            id_ruta = registro["id"]
+            destino = completos[id_ruta] if id_ruta in completos else parciales.setdefault(id_ruta, {})
+            destino.update(registro["datos"])
+        elif op == "baja":
+            id_ruta = registro["id"]
+            completos.pop(id_ruta, None)
+            parciales.pop(id_ruta, None)
+            bajas.add(id_ruta)
+
+    df = base.reset_index(drop=True)
+    posiciones = pd.Index(df[COLUMNA_ID].astype(object))
+    # Una alta cuyo ID ya está en la base (vista a media compactación) es otra edición
+    for id_ruta in [i for i in completos if i in posiciones]:
+        parciales.setdefault(id_ruta, {}).update(completos.pop(id_ruta))
+    parciales = {i: c for i, c in parciales.items() if i in posiciones}
+    if parciales:
+        tocadas = {c for datos in parciales.values() for c in datos if c != COLUMNA_ID}
+        if columnas is not None:
+            tocadas &= set(df.columns)
+        # Las columnas editadas pasan a objeto (categorías y fechas no aceptan cualquier valor)
+        # y aplicar_esquema les devuelve su tipo al final
+        df = df.astype({c: object for c in tocadas if c in df.columns})
+        for c in tocadas - set(df.columns):
+            df[c] = None
+        for fila, datos in zip(posiciones.get_indexer(list(parciales)), parciales.values()):
+            for columna, valor in datos.items():
+                if columna in tocadas:
+                    df.iat[fila, df.columns.get_loc(columna)] = valor
+    if bajas:
+        df = df[~df[COLUMNA_ID].isin(list(bajas))]
+    if completos:
+        df_altas = pd.DataFrame(list(completos.values()))
+        if columnas is not None:
+            df_altas = df_altas.reindex(columns=columnas)
+        df = pd.concat([df, df_altas], ignore_index=True) if not df.empty else df_altas
+    return aplicar_esquema(_ordenar_columnas(df)).reset_index(drop=True)
+
+
+def _a_json(valor):
+    # Las fechas van al log como "AAAA-MM-DD", igual que las captura la app, para que
+    # un Timestamp editado no mezcle formatos ("... 00:00:00") en la columna Fecha
+    if isinstance(valor, pd.Timestamp) and valor == valor.normalize():
+        return valor.strftime("%Y-%m-%d")
+    return str(valor)
+
+
+def _anexar_log(registros, ruta_base, ruta_log, agregar=None, quitar=None):
+    # `agregar` y `quitar`: filas (antes y después) que la operación suma o resta al cubo
+    lineas = "".join(json.dumps(r, ensure_ascii=False, default=_a_json) + "\n" for r in registros)
+    with bloqueo(ruta_base):
+        antes = version_catalogo(ruta_base, ruta_log)
+        with open(ruta_log, "a", encoding="utf-8") as f:
+            f.write(lineas)
+            f.flush()
+            os.fsync(f.fileno())
+            tamano = f.tell()
+        analitica.aplicar_delta(ruta_cubo(ruta_base), antes, version_catalogo(ruta_base, ruta_log),
+                                agregar=agregar, quitar=quitar, reconstruir=lambda: _cubo_completo(ruta_base, ruta_log))
+    invalidar(CLAVE_CACHE)
+    if tamano > UMBRAL_COMPACTACION:
+        compactar_en_segundo_plano(ruta_base, ruta_log)
+
+
+def _cubo_completo(ruta_base, ruta_log):
+    # Sólo cuando el catálogo todavía no tiene cubo: la primera escritura lo crea
+    return analitica.cubo_de(cargar_rutas(analitica.COLUMNAS_FUENTE, ruta_base, ruta_log))
+
+
+def _ids_existentes(ruta_base, ruta_log):
+    return set(cargar_rutas(columnas=[COLUMNA_ID], ruta_base=ruta_base, ruta_log=ruta_log)[COLUMNA_ID])
+
+
+def _filas_vigentes(ids, ruta_base, ruta_log):
+    # Columnas que resume el cubo de las rutas `ids` que todavía existen; se llama con
+    # el candado exclusivo tomado, así que no se lee el catálogo completo
+    return cargar_rutas_por_id(ids, analitica.COLUMNAS_FUENTE, ruta_base, ruta_log)
+
+
+def agregar_ruta(ruta, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Agrega una ruta al catálogo sin reescribirlo. Regresa el ID asignado."""
+    datos = dict(ruta)
+    datos.setdefault(COLUMNA_ID, nuevo_id())
+    _anexar_log([{"op": "alta", "datos": datos}], ruta_base, ruta_log, agregar=pd.DataFrame([datos]))
+    return datos[COLUMNA_ID]
+
+
+def agregar_rutas(df, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Agrega las filas de `df` con una sola escritura al log. Regresa los IDs asignados."""
+    df = _asignar_ids(df.reset_index(drop=True).copy())
+    # Tipos de Python para el JSON del log (NaN como null)
+    filas = df.astype(object).where(df.notna(), None).to_dict("records")
+    _anexar_log([{"op": "alta", "datos": datos} for datos in filas], ruta_base, ruta_log, agregar=df)
+    return df[COLUMNA_ID].tolist()
+
+
+def actualizar_ruta(id_ruta, cambios, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Modifica sólo los campos `cambios` de la ruta `id_ruta` sin reescribir el catálogo.
+
+    Lanza KeyError si la ruta ya no existe (p. ej. otro usuario la eliminó).
+    """
+    datos = {k: v for k, v in dict(cambios).items() if k != COLUMNA_ID}
+    with bloqueo(ruta_base):
+        previa = _filas_vigentes([id_ruta], ruta_base, ruta_log)
+        if previa.empty:
+            raise KeyError(id_ruta)
+        nueva = pd.DataFrame([{**previa.iloc[0].to_dict(), **datos}])
+        _anexar_log([{"op": "cambio", "id": id_ruta, "datos": datos}], ruta_base, ruta_log,
+                    agregar=nueva, quitar=previa)
+
+
+def eliminar_rutas(ids, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Marca las rutas `ids` como eliminadas (lápidas en el log). Regresa cuántas existían."""
+    with bloqueo(ruta_base):
+        previas = _filas_vigentes(dict.fromkeys(ids), ruta_base, ruta_log)
+        existentes = list(dict.fromkeys(previas[COLUMNA_ID]))
+        if existentes:
+            _anexar_log([{"op": "baja", "id": i} for i in existentes], ruta_base, ruta_log, quitar=previas)
+    return len(existentes)
+
+
+def _rotar_y_fusionar(ruta_base, ruta_log, transformar=None):
+    # Se llama con _lock_compactacion y el candado del catálogo tomados. El log
+    # rotado sobrevive a una compactación interrumpida y se retoma en la siguiente.
+    _migrar_csv(ruta_base)
+    antes = version_catalogo(ruta_base, ruta_log)
+    compactando = ruta_log + ".compactando"
+    if not os.path.exists(compactando) and os.path.exists(ruta_log):
+        os.replace(ruta_log, compactando)
+    base = _leer_base(ruta_base)
+    registros = _leer_log(compactando)
+    df = _aplicar_log(base, registros) if registros else base
+    if transformar is not None:
+        df = transformar(df)
+    if registros or transformar is not None:
+        _escribir_base(df, ruta_base)
+    if os.path.exists(compactando):
+        os.remove(compactando)
+        invalidar(CLAVE_CACHE)
+    if transformar is not None:
+        analitica.guardar_cubo(ruta_cubo(ruta_base), analitica.cubo_de(df), version_catalogo(ruta_base, ruta_log))
+    else:
+        # Compactar no cambia el contenido: el cubo sólo se marca con la nueva versión
+        analitica.aplicar_delta(ruta_cubo(ruta_base), antes, version_catalogo(ruta_base, ruta_log),
+                                reconstruir=lambda: _cubo_completo(ruta_base, ruta_log))
+    return df
+
+
+def compactar(ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Integra el log en la base."""
+    with _lock_compactacion, bloqueo(ruta_base):
+        _rotar_y_fusionar(ruta_base, ruta_log)
+
+
+def recalcular_catalogo(valores, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Recostea todo el catálogo con los datos generales vigentes en una sola pasada.
+
+    Regresa (filas, segundos).
+    """
+    def recostear(df):
+        df = df.copy()
+        if not df.empty:
+            df[COLUMNAS_CALCULADAS] = calcular_costos(df, valores)
+        return df
+
+    inicio = time.perf_counter()
+    with _lock_compactacion, bloqueo(ruta_base):
+        df = _rotar_y_fusionar(ruta_base, ruta_log, transformar=recostear)
+    return len(df), time.perf_counter() - inicio
+
+
+def compactar_en_segundo_plano(ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    if _lock_compactacion.locked():
+        return
+    threading.Thread(target=compactar, args=(ruta_base, ruta_log), daemon=True).start()
+
+
+def guardar_catalogo(df, version=None, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG):
+    """Reemplaza el catálogo completo (ediciones y eliminaciones).
+
+    Con `version` (de version_catalogo al leer `df`) falla con ConflictoVersion
+    si el catálogo cambió en medio, en lugar de pisar esos cambios.
+    """
+    with bloqueo(ruta_base):
+        verificar_version(version, version_catalogo(ruta_base, ruta_log))
+        _escribir_base(_asignar_ids(df.copy()), ruta_base)
+        for ruta in (ruta_log, ruta_log + ".compactando"):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        analitica.guardar_cubo(ruta_cubo(ruta_base), analitica.cubo_de(df), version_catalogo(ruta_base, ruta_log))
+        invalidar(CLAVE_CACHE)
+
+
+# ==============================
+# Importación por bloques de respaldos CSV
+# ==============================
+# El archivo se lee en bloques de TAMANO_BLOQUE filas; cada bloque se valida
+# contra el esquema y se escribe a un Parquet temporal, así la memoria no
+# depende del tamaño del respaldo. Sólo si todo el archivo es válido se
+# publica con un os.replace bajo el candado del catálogo.
+
+TIPOS_VALIDOS = ("IMPO", "EXPO", "VACIO")
+COLUMNAS_REQUERIDAS = ["Tipo", "Origen", "Destino"]
+TAMANO_BLOQUE = 50_000
+MAX_ERRORES = 20
+
+
+class ErrorImportacion(ValueError):
+    """El respaldo no cumple con el esquema; `errores` trae los primeros problemas por fila."""
+
+    def __init__(self, errores):
+        self.errores = errores
+        super().__init__("; ".join(errores))
+
+
+def _esquema_arrow():
+    campos = []
+    for columna in COLUMNAS_RUTA:
+        if columna in COLUMNAS_CATEGORICAS:
+            tipo = pa.dictionary(pa.int32(), pa.string())
+        elif columna == COLUMNA_FECHA:
+            tipo = pa.timestamp("ns")
+        elif columna == COLUMNA_ID:
+            tipo = pa.string()
+        else:
+            tipo = pa.float64()
+        campos.append(pa.field(columna, tipo))
+    return pa.schema(campos)
+
+
+def validar_bloque(df, fila_inicial=2):
+    """Errores de esquema del bloque, con el número de fila del archivo (lista vacía si es válido)."""
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in df.columns]
+    if faltantes:
+        return [f"Faltan columnas requeridas: {', '.join(faltantes)}"]
+    errores = []
+
+    def reportar(mascara, mensaje):
+        for fila in np.flatnonzero(mascara)[:MAX_ERRORES]:
+            errores.append(f"Fila {fila_inicial + int(fila)}: {mensaje}")
+
+    reportar(~df["Tipo"].astype(object).isin(TIPOS_VALIDOS).to_numpy(), "Tipo debe ser IMPO, EXPO o VACIO")
+    for columna in ("Origen", "Destino"):
+        reportar(df[columna].isna().to_numpy(), f"{columna} vacío")
+    for columna in COLUMNAS_NUMERICAS:
+        if columna in df.columns:
+            convertida = pd.to_numeric(df[columna], errors="coerce")
+            reportar((convertida.isna() & df[columna].notna()).to_numpy(), f"{columna} no es numérico")
+    if COLUMNA_FECHA in df.columns:
+        convertida = pd.to_datetime(df[COLUMNA_FECHA], errors="coerce")
+        reportar((convertida.isna() & df[COLUMNA_FECHA].notna()).to_numpy(), "Fecha inválida")
+    return errores[:MAX_ERRORES]
+
+
+def _a_tabla(df, esquema):
+    return pa.Table.from_pandas(aplicar_esquema(df.reindex(columns=COLUMNAS_RUTA)), schema=esquema, preserve_index=False)
+
+
+def _tamano_archivo(archivo):
+    try:
+        posicion = archivo.tell()
+        archivo.seek(0, os.SEEK_END)
+        tamano = archivo.tell()
+        archivo.seek(posicion)
+        return tamano
+    except (AttributeError, OSError):
+        return None
+
+
+def importar_csv(archivo, reemplazar=True, ruta_base=RUTA_BASE, ruta_log=RUTA_LOG,
+                 tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """Importa un respaldo CSV (ruta o buffer) por bloques.
+
+    Con `reemplazar` el respaldo sustituye al catálogo; si no, se combina y las
+    rutas con el mismo ID_Ruta toman los valores del respaldo. Dentro del
+    respaldo se conserva la primera aparición de cada ID. `progreso(filas,
+    fracción)` se llama después de cada bloque. Lanza ErrorImportacion sin
+    tocar el catálogo si algún bloque no es válido.
+
+    Regresa un resumen con importadas, reemplazadas, duplicadas y columnas_ignoradas.
+    """
+    esquema = _esquema_arrow()
+    propio = isinstance(archivo, (str, os.PathLike))
+    if propio:
+        archivo = open(archivo, "rb")
+    total_bytes = _tamano_archivo(archivo)
+    ids_vistos = set()
+    resumen = {"importadas": 0, "reemplazadas": 0, "duplicadas": 0, "columnas_ignoradas": []}
+    directorio = os.path.dirname(os.path.abspath(ruta_base))
+    fd, subida = tempfile.mkstemp(prefix=os.path.basename(ruta_base) + ".", suffix=".importando", dir=directorio)
+    os.close(fd)
+    try:
+        fila = 2  # la fila 1 del archivo es el encabezado
+        with pq.ParquetWriter(subida, esquema) as escritor:
+            try:
+                lector = pd.read_csv(archivo, chunksize=tamano_bloque)
+                for numero, bloque in enumerate(lector):
+                    if numero == 0:
+                        resumen["columnas_ignoradas"] = [c for c in bloque.columns if c not in COLUMNAS_RUTA]
+                    errores = validar_bloque(bloque, fila)
+                    if errores:
+                        raise ErrorImportacion(errores)
+                    fila += len(bloque)
+                    bloque = _asignar_ids(bloque.copy())
+                    ids = bloque[COLUMNA_ID].astype(str).to_numpy(dtype=object)
+                    # Pertenencia al conjunto fila por fila: O(bloque), no O(IDs ya vistos)
+                    repetidas = pd.Series(ids).duplicated().to_numpy() | np.fromiter(
+                        (i in ids_vistos for i in ids), dtype=bool, count=len(ids))
+                    resumen["duplicadas"] += int(repetidas.sum())
+                    bloque = bloque[~repetidas]
+                    ids_vistos.update(ids[~repetidas])
+                    escritor.write_table(_a_tabla(bloque, esquema))
+                    resumen["importadas"] += len(bloque)
+                    if progreso is not None:
+                        # Fracción aproximada: el lector de pandas lee por adelantado
+                        fraccion = min(archivo.tell() / total_bytes, 1.0) if total_bytes else None
+                        progreso(resumen["importadas"], fraccion)
+            except pd.errors.EmptyDataError:
+                raise ErrorImportacion(["El archivo está vacío"])
+        if not resumen["importadas"]:
+            raise ErrorImportacion(["El archivo no tiene rutas"])
+
+        with bloqueo(ruta_base):
+            if reemplazar:
+                publicar(subida, ruta_base)
+            else:
+                resumen["reemplazadas"] = _combinar_con_base(subida, ids_vistos, esquema, ruta_base, ruta_log)
+            for ruta in (ruta_log, ruta_log + ".compactando"):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            analitica.guardar_cubo(ruta_cubo(ruta_base), cubo_de_base(ruta_base), version_catalogo(ruta_base, ruta_log))
+            invalidar(CLAVE_CACHE)
+    finally:
+        if propio:
+            archivo.close()
+        if os.path.exists(subida):
+            os.remove(subida)
+    if progreso is not None:
+        progreso(resumen["importadas"], 1.0)
+    return resumen
+
+
+def _combinar_con_base(subida, ids_subida, esquema, ruta_base, ruta_log):
+    # Se llama con el candado del catálogo tomado. Primero se integra el log
+    # para que la base tenga todas las altas, ediciones y bajas vigentes.
+    _rotar_y_fusionar(ruta_base, ruta_log)
+    reemplazadas = [0]
+    ids = pa.array(list(ids_subida), type=pa.string())
+
+    def escribir(destino):
+        with pq.ParquetWriter(destino, esquema) as escritor:
+            if os.path.exists(ruta_base):
+                for lote in pq.ParquetFile(ruta_base).iter_batches(batch_size=TAMANO_BLOQUE):
+                    tabla = pa.Table.from_batches([lote])
+                    repetidas = pc.is_in(tabla.column(COLUMNA_ID).cast(pa.string()), value_set=ids)
+                    reemplazadas[0] += pc.sum(repetidas).as_py() or 0
+                    tabla = tabla.filter(pc.invert(repetidas))
+                    escritor.write_table(_a_tabla(tabla.to_pandas(), esquema))
+            for lote in pq.ParquetFile(subida).iter_batches(batch_size=TAMANO_BLOQUE):
+                escritor.write_table(pa.Table.from_batches([lote]).cast(esquema))
+
+    escribir_atomico(ruta_base, escribir)
+    return reemplazadas[0]
+
+
+def cubo_de_base(ruta_base=RUTA_BASE):
+    """Cubo de rentabilidad de la base Parquet, leído por lotes (sin el log)."""
+    cubo = analitica.cubo_vacio()
+    if not os.path.exists(ruta_base):
+        return cubo
+    archivo = pq.ParquetFile(ruta_base)
+    columnas = [c for c in analitica.COLUMNAS_FUENTE if c in archivo.schema_arrow.names]
+    for lote in archivo.iter_batches(batch_size=TAMANO_BLOQUE, columns=columnas):
+        cubo = analitica.combinar(cubo, analitica.cubo_de(lote.to_pandas()))
+    return cubo
+
+
+if __name__ == "__main__":
+    # Uso: python -m picus.almacen importar archivo.csv [--agregar]
+    #      python -m picus.almacen compactar
+    if len(sys.argv) >= 3 and sys.argv[1] == "importar":
+        resumen = importar_csv(sys.argv[2], reemplazar="--agregar" not in sys.argv,
+                               progreso=lambda filas, _: print(f"  {filas:,} filas…"))
+        print(f"✅ {resumen['importadas']:,} rutas importadas desde {sys.argv[2]} "
+              f"({resumen['reemplazadas']:,} reemplazadas, {resumen['duplicadas']:,} duplicadas omitidas)")
+    elif len(sys.argv) == 2 and sys.argv[1] == "compactar":
+        compactar()
+        print("✅ Log de rutas compactado")
+    else:
+        print("Uso: python -m picus.almacen importar archivo.csv [--agregar] | compactar")
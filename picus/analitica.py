@@ -0,0 +1,204 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from picus import instrumentacion
+from picus.bloqueo import escribir_atomico
+from picus.compacto import codigo_ruta
+
+# ==============================
+# Cubos de rentabilidad pre-agregados
+# ==============================
+# Sumas de ingreso, costos y KM por mes, cliente, carril (Origen → Destino),
+# tipo y modo de viaje, en un directorio con un Parquet por mes. Los
+# escritores del catálogo y de los viajes suman o restan sólo las filas que
+# escriben (y sólo reescriben sus meses); version.json guarda la versión de
+# los archivos que resume. Si todavía no existe, la primera escritura lo crea
+# completo; si algún escritor lo encontró desfasado no lo toca y el siguiente
+# lector lo reconstruye completo una vez.
+
+DIMENSIONES = ["Mes", "Cliente", "Carril", "Tipo", "Modo_Viaje"]
+SUMAS = ["Ingreso Total", "Costo_Total_Ruta", "Costo_Diesel_Camion", "Sueldo_Operador",
+         "Casetas", "Costo_Extras", "KM"]
+CONTEO = "Registros"
+MEDIDAS = SUMAS + [CONTEO]
+COLUMNAS_FUENTE = ["Fecha", "Cliente", "Origen", "Destino", "Tipo", "Modo_Viaje"] + SUMAS
+SIN_DATO = "(sin dato)"
+
+
+def _texto(serie):
+    return serie.astype(object).fillna(SIN_DATO).astype(str).to_numpy(dtype=object)
+
+
+def mes_de(fechas):
+    # ISO8601 acepta en la misma serie fechas con y sin hora; sin formato, pandas
+    # deduce uno del primer valor y los demás quedan como NaT
+    return pd.to_datetime(pd.Series(fechas), format="ISO8601", errors="coerce").dt.strftime("%Y-%m").fillna(SIN_DATO).to_numpy(dtype=object)
+
+
+def cubo_vacio():
+    tipos = {**{c: object for c in DIMENSIONES}, **{c: "float64" for c in SUMAS}, CONTEO: "int64"}
+    return pd.DataFrame({c: pd.Series(dtype=t) for c, t in tipos.items()})
+
+
+def cubo_de(df):
+    """Cubo (sumas por DIMENSIONES) de las filas de rutas o tramos en `df`."""
+    if df.empty:
+        return cubo_vacio()
+    df = df.reindex(columns=COLUMNAS_FUENTE)
+    # Los pares de ciudades se resuelven sobre los códigos, no fila por fila
+    carril = codigo_ruta(df).astype(object).to_numpy(dtype=object)
+    claves = pd.DataFrame({
+        "Mes": mes_de(df["Fecha"]),
+        "Cliente": _texto(df["Cliente"]),
+        "Carril": carril,
+        "Tipo": _texto(df["Tipo"]),
+        "Modo_Viaje": _texto(df["Modo_Viaje"]),
+    })
+    for columna in SUMAS:
+        claves[columna] = pd.to_numeric(df[columna], errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+    claves[CONTEO] = np.ones(len(df), dtype="int64")
+    return claves.groupby(DIMENSIONES, as_index=False, sort=False).sum()
+
+
+def combinar(cubo, delta, signo=1):
+    """Suma (o resta, con signo=-1) el cubo `delta` a `cubo`."""
+    if delta.empty:
+        return cubo
+    if cubo.empty and signo == 1:
+        return delta
+    delta = delta.copy()
+    delta[MEDIDAS] = delta[MEDIDAS] * signo
+    total = pd.concat([cubo, delta], ignore_index=True).groupby(DIMENSIONES, as_index=False, sort=False).sum()
+    # Sumas y restas sucesivas dejan residuos de punto flotante en los grupos vaciados
+    total[SUMAS] = total[SUMAS].round(6)
+    return total[total[CONTEO] != 0].reset_index(drop=True)
+
+
+def _clave(version):
+    return json.dumps(version, default=str)
+
+
+def _archivo_mes(directorio, mes):
+    return os.path.join(directorio, f"{mes}.parquet")
+
+
+def archivo_version(directorio):
+    """Archivo que cambia con cada actualización del cubo (se escribe al final)."""
+    return os.path.join(directorio, "version.json")
+
+
+def _leer_version(directorio):
+    try:
+        with open(archivo_version(directorio), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _escribir_version(directorio, version):
+    def escribir(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_clave(version))
+    escribir_atomico(archivo_version(directorio), escribir)
+
+
+def _leer_mes(directorio, mes):
+    ruta = _archivo_mes(directorio, mes)
+    if not os.path.exists(ruta):
+        return cubo_vacio()
+    cubo = pd.read_parquet(ruta)
+    instrumentacion.leido(ruta, len(cubo))
+    return cubo
+
+
+def _escribir_mes(directorio, mes, cubo):
+    ruta = _archivo_mes(directorio, mes)
+    if cubo.empty:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        return
+    cubo = cubo.reset_index(drop=True)
+    escribir_atomico(ruta, lambda tmp: cubo.to_parquet(tmp, index=False))
+
+
+def _meses_guardados(directorio):
+    return [n[:-len(".parquet")] for n in sorted(os.listdir(directorio)) if n.endswith(".parquet")]
+
+
+def leer_cubo(directorio):
+    """(cubo, versión) guardados en `directorio`, o (None, None) si no existe."""
+    # La versión se lee primero: se escribe al final, así que nunca es más nueva que los meses
+    version = _leer_version(directorio)
+    if version is None:
+        return None, None
+    partes = [_leer_mes(directorio, mes) for mes in _meses_guardados(directorio)]
+    partes = [p for p in partes if not p.empty]
+    cubo = pd.concat(partes, ignore_index=True) if partes else cubo_vacio()
+    return cubo, version
+
+
+def vigente(version_guardada, version):
+    return version_guardada == _clave(version)
+
+
+def guardar_cubo(directorio, cubo, version):
+    """Reemplaza el cubo completo (un archivo por mes)."""
+    os.makedirs(directorio, exist_ok=True)
+    grupos = dict(tuple(cubo.groupby("Mes", sort=False)))
+    for mes in set(_meses_guardados(directorio)) - set(grupos):
+        os.remove(_archivo_mes(directorio, mes))
+    for mes, grupo in grupos.items():
+        _escribir_mes(directorio, mes, grupo)
+    _escribir_version(directorio, version)
+
+
+def aplicar_delta(directorio, antes, despues, agregar=None, quitar=None, meses=None, reconstruir=None):
+    """Actualiza el cubo con una escritura que llevó los datos de `antes` a `despues`.
+
+    Suma las filas `agregar`, resta las filas `quitar` y descarta los `meses`
+    reescritos completos; sólo se reescriben los archivos de los meses
+    tocados. Se llama con el candado del almacén tomado. Regresa False (y no
+    toca el cubo) si no correspondía a la versión `antes`. Si el cubo todavía
+    no existe (almacén nuevo o migrado) lo crea completo con `reconstruir()`.
+    """
+    guardada = _leer_version(directorio)
+    if guardada is None and reconstruir is not None:
+        guardar_cubo(directorio, reconstruir(), despues)
+        return True
+    if antes == despues and agregar is None and quitar is None and not meses:
+        return True
+    if not vigente(guardada, antes):
+        return False
+    meses = set(meses or ())
+    deltas = [(cubo_de(filas), signo) for filas, signo in ((quitar, -1), (agregar, 1)) if filas is not None]
+    for mes in meses.union(*(set(delta["Mes"]) for delta, _ in deltas)):
+        cubo = cubo_vacio() if mes in meses else _leer_mes(directorio, mes)
+        for delta, signo in deltas:
+            cubo = combinar(cubo, delta[delta["Mes"] == mes], signo)
+        _escribir_mes(directorio, mes, cubo)
+    _escribir_version(directorio, despues)
+    return True
+
+
+def filtrar_cubo(cubo, **filtros):
+    """Filas del cubo cuyas dimensiones están en los valores indicados (p. ej. Cliente=[...])."""
+    mascara = np.ones(len(cubo), dtype=bool)
+    for dimension, valores in filtros.items():
+        if valores:
+            mascara &= cubo[dimension].isin(valores).to_numpy()
+    return cubo[mascara]
+
+
+def resumir(cubo, por=None):
+    """Totales del cubo agrupados por las dimensiones `por`, con utilidad y % de margen."""
+    if por:
+        tabla = cubo.groupby(list(por), as_index=False, sort=True)[MEDIDAS].sum()
+    else:
+        tabla = cubo[MEDIDAS].sum().to_frame().T
+    tabla["Utilidad"] = tabla["Ingreso Total"] - tabla["Costo_Total_Ruta"]
+    ingreso = tabla["Ingreso Total"].where(tabla["Ingreso Total"] != 0)
+    tabla["% Margen"] = (tabla["Utilidad"] / ingreso * 100).round(2)
+    return tabla
@@ -0,0 +1,46 @@
+import logging
+import os
+import threading
+
+# ==============================
+# Precarga de cachés compartidos al arrancar
+# ==============================
+# Home se pinta sin importar pandas ni leer datos. La primera vez que corre en
+# el proceso lanza este hilo, que importa la capa de datos y deja listos en la
+# caché compartida los datos generales, la instantánea del catálogo, el estado
+# de viajes y los cubos, mientras el usuario todavía está en la portada.
+# PICUS_PRECARGA=0 lo desactiva.
+
+_hilo = None
+_lock = threading.Lock()
+
+
+def precargar():
+    from picus import almacen, datos
+
+    datos.cargar_datos_generales()
+    if almacen.existe_catalogo():
+        datos.instantanea_catalogo()
+        datos.cubo_rutas()
+    if datos.existe_viajes():
+        datos.cargar_estado_viajes()
+        datos.cubo_viajes()
+
+
+def _precargar_sin_fallar():
+    try:
+        precargar()
+    except Exception:  # noqa: BLE001 - la página que lo necesite volverá a intentar y mostrará el error
+        logging.getLogger(__name__).exception("No se pudo precargar la caché")
+
+
+def precargar_en_segundo_plano():
+    """Inicia la precarga una sola vez por proceso; regresa el hilo (o None si está desactivada)."""
+    global _hilo
+    if os.environ.get("PICUS_PRECARGA", "1") == "0":
+        return None
+    with _lock:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_precargar_sin_fallar, name="picus-precarga", daemon=True)
+            _hilo.start()
+    return _hilo
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# Asignación masiva de regresos
+# ==============================
+# Empareja todos los tráficos con sólo tramo de IDA con cargas de regreso a la
+# vez, maximizando la utilidad total. Cada ruta de regreso se puede usar hasta
+# `capacidad` veces; los vacíos de reposicionamiento no tienen límite.
+
+INFACTIBLE = -1e15
+SIN_ASIGNAR = -1e12
+
+
+def hungaro(beneficio):
+    """Asignación de máximo beneficio (filas <= columnas). Regresa la columna de cada fila.
+
+    Algoritmo húngaro con potenciales y caminos aumentantes más cortos,
+    O(filas² · columnas) con el ciclo interno vectorizado.
+    """
+    costo = -np.asarray(beneficio, dtype="float64")
+    n, m = costo.shape
+    if n > m:
+        raise ValueError("Se requieren al menos tantas columnas como filas")
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    fila_de = np.zeros(m + 1, dtype=int)  # columna j (1..m) -> fila (1..n), 0 = libre
+    previa = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        fila_de[0] = i
+        j0 = 0
+        minimo = np.full(m + 1, np.inf)
+        usada = np.zeros(m + 1, dtype=bool)
+        while True:
+            usada[j0] = True
+            i0 = fila_de[j0]
+            libres = ~usada[1:]
+            reducido = costo[i0 - 1] - u[i0] - v[1:]
+            mejora = libres & (reducido < minimo[1:])
+            minimo[1:][mejora] = reducido[mejora]
+            previa[1:][mejora] = j0
+            candidatos = np.where(libres, minimo[1:], np.inf)
+            j1 = int(np.argmin(candidatos)) + 1
+            delta = candidatos[j1 - 1]
+            u[fila_de[usada]] += delta
+            v[usada] -= delta
+            minimo[1:][libres] -= delta
+            j0 = j1
+            if fila_de[j0] == 0:
+                break
+        while j0:
+            j1 = previa[j0]
+            fila_de[j0] = fila_de[j1]
+            j0 = j1
+    asignacion = np.full(n, -1)
+    for j in range(1, m + 1):
+        if fila_de[j]:
+            asignacion[fila_de[j] - 1] = j - 1
+    return asignacion
+
+
+def _num(serie):
+    return pd.to_numeric(serie, errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+
+def opciones_de_regreso(idas, df_rutas):
+    """Todas las formas de cerrar cada IDA: directo o con el vacío más barato al origen del regreso.
+
+    Regresa un DataFrame con fila (posición en `idas`), pos_regreso, pos_vacio (-1 si es
+    directo) y Utilidad del tráfico completo.
+    """
+    ingreso = _num(df_rutas["Ingreso Total"])
+    costo = _num(df_rutas["Costo_Total_Ruta"])
+    tipos = df_rutas["Tipo"].to_numpy(dtype=object)
+    posiciones = np.arange(len(df_rutas))
+
+    # Vacío más rentable (menor costo neto) por par origen → destino
+    es_vacio = tipos == "VACIO"
+    vacios = pd.DataFrame({
+        "Origen": df_rutas["Origen"].to_numpy()[es_vacio],
+        "Destino": df_rutas["Destino"].to_numpy()[es_vacio],
+        "pos_vacio": posiciones[es_vacio],
+        "neto_vacio": (ingreso - costo)[es_vacio]
+    }).sort_values("neto_vacio", ascending=False, kind="stable").drop_duplicates(["Origen", "Destino"])
+
+    regresos = pd.DataFrame({
+        "Tipo": tipos,
+        "Origen": df_rutas["Origen"].to_numpy(),
+        "pos_regreso": posiciones,
+        "neto_regreso": ingreso - costo
+    })[~es_vacio]
+
+    base = pd.DataFrame({
+        "fila": np.arange(len(idas)),
+        "Destino_ida": idas["Destino"].to_numpy(),
+        "Tipo_regreso": np.where(idas["Tipo"].to_numpy() == "IMPO", "EXPO", "IMPO"),
+        "neto_ida": _num(idas["Ingreso Total"]) - _num(idas["Costo_Total_Ruta"])
+    })
+
+    directas = base.merge(regresos, left_on=["Destino_ida", "Tipo_regreso"], right_on=["Origen", "Tipo"])
+    directas["pos_vacio"] = -1
+    directas["Utilidad"] = directas["neto_ida"] + directas["neto_regreso"]
+
+    con_vacio = base.merge(vacios, left_on="Destino_ida", right_on="Origen")
+    con_vacio = con_vacio.drop(columns="Origen").merge(
+        regresos, left_on=["Destino", "Tipo_regreso"], right_on=["Origen", "Tipo"]
+    )
+    con_vacio["Utilidad"] = con_vacio["neto_ida"] + con_vacio["neto_vacio"] + con_vacio["neto_regreso"]
+
+    columnas = ["fila", "pos_regreso", "pos_vacio", "Utilidad"]
+    opciones = pd.concat([directas[columnas], con_vacio[columnas]], ignore_index=True)
+    # Por cada (IDA, regreso) basta la mejor manera de llegar
+    opciones = opciones.sort_values("Utilidad", ascending=False, kind="stable")
+    return opciones.drop_duplicates(["fila", "pos_regreso"]).reset_index(drop=True)
+
+
+def asignar_regresos(idas, df_rutas, capacidad=1, solo_rentables=False):
+    """Asignación global de regresos para `idas` (un tramo IDA por fila).
+
+    Regresa un DataFrame con una fila por IDA asignada: fila, pos_vacio,
+    pos_regreso y Utilidad. Las IDA sin regreso factible (o sin uno rentable
+    si `solo_rentables`) quedan fuera.
+    """
+    columnas = ["fila", "pos_vacio", "pos_regreso", "Utilidad"]
+    n = len(idas)
+    if n == 0:
+        return pd.DataFrame(columns=columnas)
+    opciones = opciones_de_regreso(idas, df_rutas)
+    if solo_rentables:
+        opciones = opciones[opciones["Utilidad"] > 0]
+    if opciones.empty:
+        return pd.DataFrame(columns=columnas)
+
+    # Con n filas, cada fila sólo necesita sus n mejores opciones para que la
+    # asignación siga siendo óptima; esto mantiene la matriz pequeña.
+    opciones = opciones.groupby("fila", sort=False).head(n)
+    rutas = np.unique(opciones["pos_regreso"].to_numpy())
+    copias = min(int(capacidad), n)
+    columna_de_ruta = {ruta: k for k, ruta in enumerate(rutas)}
+
+    beneficio = np.full((n, len(rutas) * copias + n), INFACTIBLE)
+    # Una columna "sin asignar" por fila para que siempre exista solución
+    beneficio[np.arange(n), len(rutas) * copias + np.arange(n)] = SIN_ASIGNAR
+    filas = opciones["fila"].to_numpy()
+    cols = np.array([columna_de_ruta[r] for r in opciones["pos_regreso"].to_numpy()])
+    for copia in range(copias):
+        beneficio[filas, cols * copias + copia] = opciones["Utilidad"].to_numpy()
+
+    asignacion = hungaro(beneficio)
+    elegidas = asignacion < len(rutas) * copias
+    resultado = pd.DataFrame({
+        "fila": np.flatnonzero(elegidas),
+        "pos_regreso": rutas[asignacion[elegidas] // copias]
+    })
+    resultado = resultado.merge(opciones, on=["fila", "pos_regreso"], how="left")
+    return resultado[columnas].sort_values("fila").reset_index(drop=True)
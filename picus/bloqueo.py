@@ -0,0 +1,103 @@
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ==============================
+# Escrituras seguras entre procesos
+# ==============================
+# Cada almacén (catálogo, viajes, datos generales) tiene un candado consultivo
+# en un archivo `.lock` junto a sus datos. Los escritores lo toman exclusivo,
+# escriben a un temporal del mismo directorio y lo publican con os.replace, así
+# un lector nunca ve un archivo a medias. Los escritores que parten de datos
+# leídos antes (ediciones) pasan la versión que leyeron y fallan con
+# ConflictoVersion si alguien más escribió en medio.
+
+
+class ConflictoVersion(RuntimeError):
+    """Los datos cambiaron desde que se leyeron; hay que recargar y repetir la operación."""
+
+
+_tomados = threading.local()
+
+
+def _bloquear(f, compartido):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if compartido else fcntl.LOCK_EX)
+        return
+    # msvcrt sólo tiene candados exclusivos y LK_LOCK se rinde tras 10 intentos
+    while True:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(0.05)
+
+
+def _liberar(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def bloqueo(ruta, compartido=False):
+    """Candado entre procesos (y entre hilos) sobre `ruta`.lock.
+
+    Es reentrante dentro del mismo hilo: un escritor que ya tiene el candado
+    exclusivo puede llamar funciones que lo piden otra vez.
+    """
+    tomados = getattr(_tomados, "modos", None)
+    if tomados is None:
+        tomados = _tomados.modos = {}
+    clave = os.path.abspath(ruta)
+    if clave in tomados:
+        if tomados[clave] and not compartido:
+            raise RuntimeError(f"No se puede pasar de candado compartido a exclusivo en {ruta}")
+        yield
+        return
+    with open(ruta + ".lock", "a+b") as f:
+        _bloquear(f, compartido)
+        tomados[clave] = compartido
+        try:
+            yield
+        finally:
+            del tomados[clave]
+            _liberar(f)
+
+
+def escribir_atomico(ruta, escribir):
+    """Llama `escribir(tmp)` sobre un temporal junto a `ruta` y lo publica con os.replace."""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(ruta) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(ruta)))
+    os.close(fd)
+    try:
+        escribir(tmp)
+        publicar(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def publicar(tmp, ruta):
+    """Lleva a disco un temporal ya escrito y lo coloca en `ruta` de forma atómica."""
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, ruta)
+
+
+def verificar_version(esperada, actual):
+    if esperada is not None and esperada != actual:
+        raise ConflictoVersion("Los datos fueron modificados por otro usuario")
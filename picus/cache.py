@@ -0,0 +1,68 @@
+import os
+import threading
+
+import pandas as pd
+
+from picus import instrumentacion
+
+# ==============================
+# Caché de archivos por ruta + mtime/tamaño
+# ==============================
+# Vive a nivel de proceso: todas las sesiones de Streamlit comparten las
+# entradas. Un archivo sólo se vuelve a leer cuando cambia su firma en disco
+# o cuando un escritor lo invalida explícitamente.
+
+# Con copy-on-write las copias superficiales que se entregan a las páginas no
+# pueden modificar el DataFrame guardado en caché (pandas 3 ya lo trae activo).
+try:
+    pd.set_option("mode.copy_on_write", True)
+except (KeyError, ValueError):
+    pass
+
+_entradas = {}
+_lock = threading.Lock()
+
+
+def firma(*rutas):
+    resultado = []
+    for ruta in rutas:
+        try:
+            info = os.stat(ruta)
+            resultado.append((info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            resultado.append(None)
+    return tuple(resultado)
+
+
+def leer_cacheado(clave, rutas, lector):
+    """Regresa el valor cacheado bajo `clave` mientras ninguno de `rutas` cambie en disco."""
+    actual = firma(*rutas)
+    with _lock:
+        entrada = _entradas.get(clave)
+    if entrada is not None and entrada[0] == actual:
+        instrumentacion.cache(acierto=True)
+        return _solo_lectura(entrada[1])
+    instrumentacion.cache(acierto=False)
+    valor = lector()
+    with _lock:
+        _entradas[clave] = (actual, valor)
+    return _solo_lectura(valor)
+
+
+def _solo_lectura(valor):
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy(deep=False)
+    if isinstance(valor, dict):
+        return dict(valor)
+    return valor
+
+
+def invalidar(clave=None):
+    with _lock:
+        if clave is None:
+            _entradas.clear()
+        else:
+            # Una clave simple también invalida las entradas compuestas (clave, ...)
+            for existente in list(_entradas):
+                if existente == clave or (isinstance(existente, tuple) and existente[0] == clave):
+                    del _entradas[existente]
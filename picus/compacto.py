@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from picus.costos import calcular_utilidad
+
+# ==============================
+# Catálogo compacto en memoria
+# ==============================
+# Una sola copia por proceso que comparten todas las sesiones: ciudades y
+# clientes como categorías, la ruta "Origen → Destino" como código derivado
+# (una etiqueta por par distinto, no un string por fila), IDs en un buffer
+# Arrow y montos en float32 cuando el cambio no altera ningún valor.
+
+SEPARADOR_RUTA = " → "
+
+
+def codigo_ruta(df):
+    """Categoría "Origen → Destino" construida a partir de los códigos de ciudad."""
+    origen = df["Origen"].astype("category")
+    destino = df["Destino"].astype("category")
+    n_destinos = len(destino.cat.categories) + 1
+    # +1 para que los nulos (código -1) queden en su propio par
+    pares = (origen.cat.codes.to_numpy(dtype="int64") + 1) * n_destinos + destino.cat.codes.to_numpy(dtype="int64") + 1
+    unicos, codigos = np.unique(pares, return_inverse=True)
+    nombres_origen = np.concatenate([["nan"], origen.cat.categories.astype(str)])
+    nombres_destino = np.concatenate([["nan"], destino.cat.categories.astype(str)])
+    etiquetas = [
+        f"{nombres_origen[p // n_destinos]}{SEPARADOR_RUTA}{nombres_destino[p % n_destinos]}"
+        for p in unicos
+    ]
+    if len(set(etiquetas)) < len(etiquetas):
+        # Ciudades cuyo nombre ya contiene el separador: se agrupan por etiqueta
+        return pd.Series(pd.Categorical(np.asarray(etiquetas, dtype=object)[codigos]), index=df.index)
+    return pd.Series(pd.Categorical.from_codes(codigos, etiquetas), index=df.index)
+
+
+def reducir_numericos(df):
+    """Pasa a float32 las columnas float64 que se representan sin pérdida."""
+    df = df.copy()
+    for columna in df.columns:
+        if df[columna].dtype != "float64":
+            continue
+        valores = df[columna].to_numpy()
+        reducidos = valores.astype("float32")
+        if np.array_equal(reducidos.astype("float64"), valores, equal_nan=True):
+            df[columna] = reducidos
+    return df
+
+
+def textos_compactos(df):
+    """Textos sin repetición (ID_Ruta, notas) en un solo buffer Arrow en vez de un objeto por fila."""
+    df = df.copy()
+    for columna in df.columns:
+        if isinstance(df[columna].dtype, pd.CategoricalDtype):
+            continue
+        if df[columna].dtype == object or pd.api.types.is_string_dtype(df[columna]):
+            df[columna] = df[columna].astype("string[pyarrow]")
+    return df
+
+
+def compactar_catalogo(df):
+    """Catálogo listo para las páginas: utilidad, código de ruta y tipos reducidos."""
+    df = calcular_utilidad(df)
+    if "Origen" in df.columns and "Destino" in df.columns:
+        df["Ruta"] = codigo_ruta(df)
+    return textos_compactos(reducir_numericos(df))
+
+
+def como_objetos(df):
+    """Representación anterior (referencia para el reporte): textos y fechas como object, montos en float64."""
+    return df.astype({
+        c: object if not pd.api.types.is_numeric_dtype(df[c]) else "float64"
+        for c in df.columns
+    })
+
+
+def reporte_memoria(df):
+    """Bytes por columna (incluye los strings referenciados) ordenados de mayor a menor."""
+    uso = df.memory_usage(deep=True, index=False)
+    reporte = pd.DataFrame({
+        "Columna": uso.index,
+        "Tipo": [str(df[c].dtype) for c in uso.index],
+        "KB": (uso.to_numpy() / 1024).round(1)
+    })
+    return reporte.sort_values("KB", ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# Motor de costos por ruta (vectorizado)
+# ==============================
+# Única implementación de la fórmula diesel/sueldo/bono/extras/cruce.
+# Opera sobre un DataFrame completo con operaciones de columna de NumPy,
+# así que costear una ruta o todo el catálogo es la misma llamada.
+
+VALORES_POR_DEFECTO = {
+    "Rendimiento Camion": 2.5,
+    "Costo Diesel": 24.0,
+    "Pago x KM (General)": 1.50,
+    "Bono ISR IMSS": 462.66,
+    "Bono Rendimiento": 250.0,
+    "Tipo de cambio USD": 17.5,
+    "Tipo de cambio MXN": 1.0
+}
+
+SUELDO_TEAM = 1300
+SUELDO_MINIMO_VACIO = 100
+KM_MINIMO_VACIO = 100
+COSTOS_INDIRECTOS = 0.35
+
+COLUMNAS_EXTRAS = [
+    "Movimiento_Local", "Puntualidad", "Pension", "Estancia",
+    "Pistas Extra", "Stop", "Falso", "Gatas", "Accesorios", "Guías"
+]
+
+# Columnas que produce el motor (el resto de la ruta son datos capturados)
+COLUMNAS_CALCULADAS = [
+    "Tipo de cambio", "Ingreso Flete", "Tipo cambio Cruce", "Ingreso Cruce",
+    "Costo Cruce Convertido", "Ingreso Total", "Pago por KM",
+    "Sueldo_Operador", "Bono", "Bono Rendimiento",
+    "Costo_Diesel_Camion", "Costo_Extras", "Costo_Total_Ruta"
+]
+
+
+def parametro(valores, clave):
+    valor = valores.get(clave) if valores else None
+    if valor is None or pd.isna(valor):
+        return VALORES_POR_DEFECTO[clave]
+    return float(valor)
+
+
+def _numerica(df, columna):
+    if columna not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[columna], errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+
+def _texto(df, columna, por_defecto):
+    if columna not in df.columns:
+        return np.full(len(df), por_defecto, dtype=object)
+    return df[columna].astype(object).fillna(por_defecto).to_numpy(dtype=object)
+
+
+def _tipo_cambio(monedas, tc_usd, tc_mxn):
+    return np.where(monedas == "USD", tc_usd, tc_mxn)
+
+
+def calcular_costos(df, valores, modo=None):
+    """Costea todas las filas de `df` con los parámetros de `valores`.
+
+    Regresa un DataFrame con el mismo índice y las columnas de COLUMNAS_CALCULADAS.
+    `modo` ("Operador" o "Team") sustituye el Modo_Viaje de cada ruta.
+    """
+    tc_usd = parametro(valores, "Tipo de cambio USD")
+    tc_mxn = parametro(valores, "Tipo de cambio MXN")
+    pago_km = parametro(valores, "Pago x KM (General)")
+    bono_isr = parametro(valores, "Bono ISR IMSS")
+    bono_rendimiento = parametro(valores, "Bono Rendimiento")
+
+    tipo = _texto(df, "Tipo", "IMPO")
+    modos = np.full(len(df), modo, dtype=object) if modo else _texto(df, "Modo_Viaje", "Operador")
+    km = _numerica(df, "KM")
+    vacio = tipo == "VACIO"
+    team = modos == "Team"
+
+    tc_flete = _tipo_cambio(_texto(df, "Moneda", "MXN"), tc_usd, tc_mxn)
+    tc_cruce = _tipo_cambio(_texto(df, "Moneda_Cruce", "MXN"), tc_usd, tc_mxn)
+    tc_costo_cruce = _tipo_cambio(_texto(df, "Moneda Costo Cruce", "MXN"), tc_usd, tc_mxn)
+
+    ingreso_flete = _numerica(df, "Ingreso_Original") * tc_flete
+    ingreso_cruce = _numerica(df, "Cruce_Original") * tc_cruce
+    costo_cruce = _numerica(df, "Costo Cruce") * tc_costo_cruce
+
+    diesel = km / parametro(valores, "Rendimiento Camion") * parametro(valores, "Costo Diesel")
+
+    sueldo_operador = np.where(vacio & (km < KM_MINIMO_VACIO), SUELDO_MINIMO_VACIO, km * pago_km)
+    sueldo = np.where(team, SUELDO_TEAM, sueldo_operador)
+    bono = np.where(vacio, 0.0, np.where(team, bono_isr * 2, bono_isr))
+    rendimiento = np.where(vacio, 0.0, bono_rendimiento)
+
+    extras = np.zeros(len(df))
+    for columna in COLUMNAS_EXTRAS:
+        extras += _numerica(df, columna)
+
+    casetas = _numerica(df, "Casetas")
+    total = diesel + sueldo + bono + rendimiento + casetas + extras + costo_cruce
+
+    return pd.DataFrame({
+        "Tipo de cambio": tc_flete,
+        "Ingreso Flete": ingreso_flete,
+        "Tipo cambio Cruce": tc_cruce,
+        "Ingreso Cruce": ingreso_cruce,
+        "Costo Cruce Convertido": costo_cruce,
+        "Ingreso Total": ingreso_flete + ingreso_cruce,
+        "Pago por KM": np.full(len(df), pago_km),
+        "Sueldo_Operador": sueldo,
+        "Bono": bono,
+        "Bono Rendimiento": rendimiento,
+        "Costo_Diesel_Camion": diesel,
+        "Costo_Extras": extras,
+        "Costo_Total_Ruta": total
+    }, index=df.index)
+
+
+# Parámetros de datos_generales que el análisis de sensibilidad puede barrer
+PARAMETROS_SENSIBLES = ["Costo Diesel", "Tipo de cambio USD", "Rendimiento Camion", "Pago x KM (General)"]
+
+
+def descomponer_utilidad(df, valores, modo=None, indirectos=False):
+    """Utilidad de cada fila como función de PARAMETROS_SENSIBLES.
+
+    Regresa un dict de arrays tal que, con los demás parámetros fijos en `valores`:
+        ingreso  = ingreso_fijo + ingreso_usd * tc_usd
+        utilidad = fijo + por_usd * tc_usd - km_diesel * diesel / rendimiento - km_pagados * pago_km
+    Con `indirectos` la utilidad es neta del COSTOS_INDIRECTOS sobre el ingreso.
+    Es la misma fórmula de calcular_costos, separada por parámetro.
+    """
+    tc_mxn = parametro(valores, "Tipo de cambio MXN")
+    bono_isr = parametro(valores, "Bono ISR IMSS")
+    bono_rendimiento = parametro(valores, "Bono Rendimiento")
+
+    tipo = _texto(df, "Tipo", "IMPO")
+    modos = np.full(len(df), modo, dtype=object) if modo else _texto(df, "Modo_Viaje", "Operador")
+    km = _numerica(df, "KM")
+    vacio = tipo == "VACIO"
+    team = modos == "Team"
+
+    def por_moneda(columna_monto, columna_moneda):
+        # (parte que se multiplica por el tipo de cambio USD, parte ya en pesos)
+        monto = _numerica(df, columna_monto)
+        usd = _texto(df, columna_moneda, "MXN") == "USD"
+        return np.where(usd, monto, 0.0), np.where(usd, 0.0, monto * tc_mxn)
+
+    flete_usd, flete_mxn = por_moneda("Ingreso_Original", "Moneda")
+    cruce_usd, cruce_mxn = por_moneda("Cruce_Original", "Moneda_Cruce")
+    costo_cruce_usd, costo_cruce_mxn = por_moneda("Costo Cruce", "Moneda Costo Cruce")
+
+    por_km = ~team & ~(vacio & (km < KM_MINIMO_VACIO))
+    sueldo_fijo = np.where(team, SUELDO_TEAM, np.where(por_km, 0.0, SUELDO_MINIMO_VACIO))
+    bono = np.where(vacio, 0.0, np.where(team, bono_isr * 2, bono_isr))
+    rendimiento = np.where(vacio, 0.0, bono_rendimiento)
+    extras = np.zeros(len(df))
+    for columna in COLUMNAS_EXTRAS:
+        extras += _numerica(df, columna)
+
+    ingreso_fijo = flete_mxn + cruce_mxn
+    ingreso_usd = flete_usd + cruce_usd
+    fijo = ingreso_fijo - costo_cruce_mxn - sueldo_fijo - bono - rendimiento - _numerica(df, "Casetas") - extras
+    por_usd = ingreso_usd - costo_cruce_usd
+    if indirectos:
+        fijo = fijo - ingreso_fijo * COSTOS_INDIRECTOS
+        por_usd = por_usd - ingreso_usd * COSTOS_INDIRECTOS
+    return {
+        "ingreso_fijo": ingreso_fijo,
+        "ingreso_usd": ingreso_usd,
+        "fijo": fijo,
+        "por_usd": por_usd,
+        "km_diesel": km,
+        "km_pagados": np.where(por_km, km, 0.0),
+    }
+
+
+def costear_ruta(ruta, valores, modo=None):
+    """Costea una sola ruta (dict o Series). Regresa un dict con las columnas calculadas."""
+    df = pd.DataFrame([dict(ruta)])
+    return calcular_costos(df, valores, modo=modo).iloc[0].to_dict()
+
+
+def cotizar_ruta(captura, valores, modo=None):
+    """Ruta capturada más sus columnas calculadas, tal como se guarda en el catálogo."""
+    ruta = dict(captura)
+    ruta.update(costear_ruta(ruta, valores, modo=modo))
+    return ruta
+
+
+def detalle_vuelta(tramos, valores, modo=None):
+    """Desglose de costos por tramo de una vuelta, recosteada con el modo de viaje `modo`."""
+    tramos = pd.DataFrame(tramos).reset_index(drop=True)
+    costos = calcular_costos(tramos, valores, modo=modo)
+    return pd.DataFrame({
+        "Tipo": tramos["Tipo"],
+        "Cliente": tramos["Cliente"],
+        "Ruta": tramos["Origen"].astype(str) + " → " + tramos["Destino"].astype(str),
+        "Ingreso": costos["Ingreso Total"],
+        "Diesel": costos["Costo_Diesel_Camion"],
+        "Sueldo": costos["Sueldo_Operador"],
+        "Bono": costos["Bono"],
+        "Rendimiento": costos["Bono Rendimiento"],
+        "Casetas": _numerica(tramos, "Casetas"),
+        "Extras": costos["Costo_Extras"],
+        "Cruce": costos["Costo Cruce Convertido"],
+        "Total Ruta": costos["Costo_Total_Ruta"]
+    })
+
+
+def resumen_utilidad(ingreso, costo):
+    """Utilidad bruta, indirectos y utilidad neta de un ingreso y costo totales."""
+    bruta = ingreso - costo
+    indirectos = ingreso * COSTOS_INDIRECTOS
+    neta = bruta - indirectos
+    return {
+        "Ingreso Total": ingreso,
+        "Costo Total": costo,
+        "Utilidad Bruta": bruta,
+        "% Utilidad Bruta": bruta / ingreso * 100 if ingreso else float("nan"),
+        "Costos Indirectos": indirectos,
+        "Utilidad Neta": neta,
+        "% Utilidad Neta": neta / ingreso * 100 if ingreso else float("nan"),
+    }
+
+
+def calcular_utilidad(df, ingreso="Ingreso Total", costo="Costo_Total_Ruta"):
+    """Agrega Utilidad y % Utilidad (bruta) a una copia de `df`."""
+    df = df.copy()
+    df["Utilidad"] = df[ingreso] - df[costo]
+    df["% Utilidad"] = (df["Utilidad"] / df[ingreso] * 100).round(2)
+    return df
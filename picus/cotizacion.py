@@ -0,0 +1,162 @@
+import importlib.util
+import io
+import unicodedata
+import zipfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from picus.almacen import COLUMNAS_RUTA, ErrorImportacion, validar_bloque
+from picus.costos import COLUMNAS_EXTRAS, COSTOS_INDIRECTOS, calcular_costos, calcular_utilidad
+
+# ==============================
+# Cotización por lote (RFQ)
+# ==============================
+# Un cliente manda sus carriles en CSV o Excel. Los encabezados se normalizan
+# (mayúsculas, acentos, sinónimos comunes), se validan con las mismas reglas
+# que la importación del catálogo y todos los carriles se costean con una sola
+# llamada a calcular_costos con los datos generales vigentes. Excel es
+# opcional: requiere openpyxl.
+
+COLUMNAS_CARRIL = [
+    "Fecha", "Tipo", "Cliente", "Origen", "Destino", "Modo_Viaje", "KM", "Casetas",
+    "Moneda", "Ingreso_Original", "Moneda_Cruce", "Cruce_Original",
+    "Moneda Costo Cruce", "Costo Cruce"
+] + COLUMNAS_EXTRAS
+
+# Encabezados que suelen traer las solicitudes de cotización
+SINONIMOS = {
+    "kilometros": "KM",
+    "distancia": "KM",
+    "modo": "Modo_Viaje",
+    "modo de viaje": "Modo_Viaje",
+    "moneda flete": "Moneda",
+    "moneda ingreso": "Moneda",
+    "moneda ingreso flete": "Moneda",
+    "ingreso": "Ingreso_Original",
+    "flete": "Ingreso_Original",
+    "ingreso flete": "Ingreso_Original",
+    "tarifa": "Ingreso_Original",
+    "moneda ingreso cruce": "Moneda_Cruce",
+    "cruce": "Cruce_Original",
+    "ingreso cruce": "Cruce_Original",
+}
+
+MONEDAS = ("MXN", "USD")
+MODOS = ("Operador", "Team")
+
+# Mismos umbrales que colorean la Consulta Individual de Ruta
+MARGEN_BRUTO_MINIMO = 50.0
+MARGEN_NETO_MINIMO = 15.0
+
+PERDIDA = "🔴 Pérdida"
+BAJO_NETO = "🟠 Margen neto bajo"
+BAJO_BRUTO = "🟡 Margen bruto bajo"
+RENTABLE = "🟢 Rentable"
+VACIO = "⚪ Vacío (sólo costo)"
+
+
+def _clave(encabezado):
+    texto = unicodedata.normalize("NFKD", str(encabezado)).encode("ascii", "ignore").decode()
+    return " ".join(texto.replace("_", " ").lower().split())
+
+
+_COLUMNAS_POR_CLAVE = {**SINONIMOS, **{_clave(c): c for c in COLUMNAS_CARRIL}}
+
+
+def excel_disponible():
+    return importlib.util.find_spec("openpyxl") is not None
+
+
+def normalizar_carriles(df, fila_inicial=2):
+    """(carriles con las columnas de COLUMNAS_CARRIL, encabezados ignorados).
+
+    Lanza ErrorImportacion con los primeros errores por fila si el archivo no es válido;
+    `fila_inicial` es el número con que se reporta el primer carril (2 en un CSV con encabezado).
+    """
+    nombres = {c: _COLUMNAS_POR_CLAVE.get(_clave(c)) for c in df.columns}
+    ignoradas = [str(c) for c, nombre in nombres.items() if nombre is None]
+    df = df[[c for c, nombre in nombres.items() if nombre is not None]].rename(columns=nombres)
+    df = df.loc[:, ~df.columns.duplicated()]
+    # Filas totalmente vacías (p. ej. al final de una hoja de Excel)
+    df = df.dropna(how="all").reset_index(drop=True)
+    if df.empty:
+        raise ErrorImportacion(["El archivo no tiene carriles"])
+
+    for columna in ("Tipo", "Moneda", "Moneda_Cruce", "Moneda Costo Cruce"):
+        if columna in df.columns:
+            df[columna] = df[columna].astype(object).where(df[columna].isna(), df[columna].astype(str).str.strip().str.upper())
+    if "Modo_Viaje" in df.columns:
+        df["Modo_Viaje"] = df["Modo_Viaje"].astype(object).where(
+            df["Modo_Viaje"].isna(), df["Modo_Viaje"].astype(str).str.strip().str.capitalize())
+
+    errores = validar_bloque(df, fila_inicial=fila_inicial)
+    for columna, validos in (("Moneda", MONEDAS), ("Moneda_Cruce", MONEDAS), ("Moneda Costo Cruce", MONEDAS),
+                             ("Modo_Viaje", MODOS)):
+        if columna in df.columns:
+            invalidas = (df[columna].notna() & ~df[columna].isin(validos)).to_numpy()
+            errores += [f"Fila {fila + fila_inicial}: {columna} debe ser {' o '.join(validos)}" for fila in np.flatnonzero(invalidas)]
+    if errores:
+        raise ErrorImportacion(errores[:20])
+
+    for columna in ("Moneda", "Moneda_Cruce", "Moneda Costo Cruce"):
+        df[columna] = df[columna].fillna("MXN") if columna in df.columns else "MXN"
+    df["Modo_Viaje"] = df["Modo_Viaje"].fillna("Operador") if "Modo_Viaje" in df.columns else "Operador"
+    return df.reindex(columns=[c for c in COLUMNAS_CARRIL if c in df.columns]), ignoradas
+
+
+def leer_carriles(archivo, nombre=None):
+    """Lee un CSV o Excel (ruta o buffer) de carriles; ver normalizar_carriles."""
+    nombre = str(nombre or getattr(archivo, "name", "") or archivo).lower()
+    if nombre.endswith((".xlsx", ".xlsm")):
+        if not excel_disponible():
+            raise ErrorImportacion(["Para leer Excel hace falta instalar openpyxl; también puedes subir el archivo en CSV"])
+        try:
+            df = pd.read_excel(archivo, engine="openpyxl")
+        except (ValueError, OSError, zipfile.BadZipFile):
+            raise ErrorImportacion(["No se pudo leer el archivo de Excel"])
+    else:
+        try:
+            df = pd.read_csv(archivo)
+        except pd.errors.EmptyDataError:
+            raise ErrorImportacion(["El archivo está vacío"])
+    return normalizar_carriles(df)
+
+
+def cotizar_lote(carriles, valores, margen_bruto=MARGEN_BRUTO_MINIMO, margen_neto=MARGEN_NETO_MINIMO):
+    """Carriles con sus columnas calculadas, utilidad bruta y neta y una Bandera de rentabilidad."""
+    cotizadas = calcular_utilidad(pd.concat([carriles, calcular_costos(carriles, valores)], axis=1))
+    ingreso = cotizadas["Ingreso Total"]
+    cotizadas["Utilidad Neta"] = cotizadas["Utilidad"] - ingreso * COSTOS_INDIRECTOS
+    cotizadas["% Utilidad Neta"] = (cotizadas["Utilidad Neta"] / ingreso * 100).round(2)
+    # Sin ingreso (vacíos) el porcentaje no está definido
+    sin_ingreso = (ingreso <= 0).to_numpy()
+    cotizadas.loc[sin_ingreso, ["% Utilidad", "% Utilidad Neta"]] = np.nan
+
+    vacio = (cotizadas["Tipo"] == "VACIO").to_numpy()
+    cotizadas.insert(0, "Bandera", np.select(
+        [vacio, (cotizadas["Utilidad"] < 0).to_numpy() | sin_ingreso,
+         (cotizadas["% Utilidad Neta"] < margen_neto).to_numpy(),
+         (cotizadas["% Utilidad"] < margen_bruto).to_numpy()],
+        [VACIO, PERDIDA, BAJO_NETO, BAJO_BRUTO], default=RENTABLE
+    ))
+    return cotizadas
+
+
+def rutas_para_catalogo(cotizadas, fecha=None):
+    """Columnas del catálogo de los carriles cotizados; sin Fecha se usa `fecha` (hoy)."""
+    rutas = cotizadas.reindex(columns=COLUMNAS_RUTA[1:])
+    fecha = pd.Timestamp(fecha or date.today())
+    rutas["Fecha"] = pd.to_datetime(rutas["Fecha"], errors="coerce").fillna(fecha)
+    return rutas
+
+
+def exportar_cotizacion(cotizadas, formato="csv"):
+    """Bytes del lote cotizado en CSV o, si openpyxl está instalado, en Excel."""
+    if formato == "xlsx":
+        salida = io.BytesIO()
+        with pd.ExcelWriter(salida, engine="openpyxl") as escritor:
+            cotizadas.to_excel(escritor, index=False, sheet_name="Cotización")
+        return salida.getvalue()
+    return cotizadas.to_csv(index=False).encode("utf-8")
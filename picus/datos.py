@@ -0,0 +1,381 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from picus import almacen, analitica, instrumentacion
+from picus.compacto import compactar_catalogo
+from picus.bloqueo import bloqueo, escribir_atomico, verificar_version
+from picus.cache import firma, invalidar, leer_cacheado
+from picus.indice import IndiceRutas
+from picus.viajes import PENDIENTE, combinar_estado, resumir_tramos
+
+# ==============================
+# Acceso a datos compartido por todas las páginas
+# ==============================
+
+RUTA_DATOS = "datos_generales.csv"
+RUTA_PROG_CSV = "viajes_programados.csv"
+DIR_VIAJES = "viajes_programados"
+CLAVE_VIAJES = "viajes"
+SIN_FECHA = "sin_fecha"
+RUTA_ESTADO = "viajes_estado.csv"
+RUTA_ESTADO_META = "viajes_estado.json"
+DIR_CUBO_VIAJES = "viajes_cubo"
+CLAVE_CUBOS = "cubos"
+
+
+def cargar_datos_generales():
+    def leer():
+        if os.path.exists(RUTA_DATOS):
+            df = pd.read_csv(RUTA_DATOS)
+            instrumentacion.leido(RUTA_DATOS, len(df))
+            return df.set_index("Parametro").to_dict()["Valor"]
+        return {}
+    return leer_cacheado(RUTA_DATOS, [RUTA_DATOS], leer)
+
+
+def guardar_datos_generales(valores):
+    df = pd.DataFrame(valores.items(), columns=["Parametro", "Valor"])
+    with bloqueo(RUTA_DATOS):
+        escribir_atomico(RUTA_DATOS, lambda tmp: df.to_csv(tmp, index=False))
+    invalidar(RUTA_DATOS)
+
+
+def _archivos_catalogo():
+    return [almacen.RUTA_BASE, almacen.RUTA_CSV, almacen.RUTA_LOG, almacen.RUTA_LOG + ".compactando"]
+
+
+def cargar_rutas(columnas=None):
+    """Catálogo de rutas con tipos declarados; `columnas` limita lo que se lee de la base."""
+    clave = (almacen.CLAVE_CACHE, tuple(columnas) if columnas is not None else None)
+    return leer_cacheado(clave, _archivos_catalogo(), lambda: almacen.cargar_rutas(columnas))
+
+
+# ==============================
+# Catálogo compartido: instantáneas versionadas
+# ==============================
+# Todas las sesiones del proceso leen la misma instantánea (catálogo compacto
+# + su índice). Nunca se modifica: cuando los archivos cambian se arma una
+# nueva a partir de la anterior y se publica cambiando una sola referencia,
+# así una sesión a media ejecución sigue viendo posiciones e índice coherentes.
+
+class Instantanea:
+    def __init__(self, version, firma, rutas, indice):
+        self.version = version
+        self.firma = firma
+        self.rutas = rutas
+        self.indice = indice
+
+
+_publicada = None
+_lock_publicacion = threading.Lock()
+
+
+def instantanea_catalogo():
+    """Instantánea vigente del catálogo; sólo un hilo arma la siguiente versión."""
+    global _publicada
+    publicada = _publicada
+    if publicada is not None and publicada.firma == firma(*_archivos_catalogo()):
+        return publicada
+    with _lock_publicacion:
+        # La firma se toma antes de leer: una escritura concurrente obliga a otra versión
+        actual = firma(*_archivos_catalogo())
+        publicada = _publicada
+        if publicada is not None and publicada.firma == actual:
+            return publicada
+        rutas = compactar_catalogo(almacen.cargar_rutas())
+        indice = publicada.indice.copia() if publicada is not None else IndiceRutas()
+        indice.sincronizar(rutas)
+        version = publicada.version + 1 if publicada is not None else 1
+        _publicada = Instantanea(version, actual, rutas, indice)
+        return _publicada
+
+
+def cargar_catalogo():
+    """Catálogo compacto (Utilidad, % Utilidad y código Ruta) de la instantánea vigente."""
+    return instantanea_catalogo().rutas.copy(deep=False)
+
+
+# ==============================
+# Viajes programados: una partición Parquet por mes
+# ==============================
+# Las consultas por rango de fechas sólo abren los meses que se traslapan con
+# el rango y sólo las columnas pedidas.
+
+def _mes(fechas):
+    return pd.to_datetime(pd.Series(fechas), errors="coerce").dt.strftime("%Y-%m").fillna(SIN_FECHA).to_numpy()
+
+
+def _ruta_particion(mes):
+    return os.path.join(DIR_VIAJES, f"{mes}.parquet")
+
+
+def _particiones():
+    if not os.path.isdir(DIR_VIAJES):
+        return {}
+    return {
+        nombre[:-len(".parquet")]: os.path.join(DIR_VIAJES, nombre)
+        for nombre in sorted(os.listdir(DIR_VIAJES)) if nombre.endswith(".parquet")
+    }
+
+
+def _normalizar(df):
+    # Columnas de texto como str para que todas las particiones tengan el mismo esquema
+    df = df.copy()
+    for columna in df.columns:
+        if df[columna].dtype == object or pd.api.types.is_string_dtype(df[columna]):
+            df[columna] = df[columna].where(df[columna].isna(), df[columna].astype(str))
+    if "Fecha" in df.columns:
+        df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce").dt.strftime("%Y-%m-%d")
+    return df
+
+
+def _escribir_particion(mes, df):
+    os.makedirs(DIR_VIAJES, exist_ok=True)
+    df = _normalizar(df)
+    escribir_atomico(_ruta_particion(mes), lambda tmp: df.to_parquet(tmp, index=False))
+
+
+def _migrar_csv():
+    # Importación única del historial en CSV a particiones mensuales
+    if os.path.isdir(DIR_VIAJES) or not os.path.exists(RUTA_PROG_CSV):
+        return
+    with bloqueo(DIR_VIAJES):
+        if os.path.isdir(DIR_VIAJES) or not os.path.exists(RUTA_PROG_CSV):
+            return
+        df = pd.read_csv(RUTA_PROG_CSV)
+        for mes, grupo in df.groupby(_mes(df["Fecha"]), sort=True):
+            _escribir_particion(mes, grupo)
+        os.makedirs(DIR_VIAJES, exist_ok=True)
+        os.replace(RUTA_PROG_CSV, RUTA_PROG_CSV + ".migrado")
+    invalidar(CLAVE_VIAJES)
+
+
+def firma_viajes():
+    particiones = _particiones()
+    return tuple(particiones), firma(*particiones.values())
+
+
+def existe_viajes():
+    _migrar_csv()
+    return bool(_particiones())
+
+
+def _leer_particion(mes, ruta, columnas=None):
+    clave = (CLAVE_VIAJES, mes, tuple(columnas) if columnas else None)
+
+    def leer():
+        df = pd.read_parquet(ruta, columns=columnas)
+        instrumentacion.leido(ruta, len(df))
+        return df
+    return leer_cacheado(clave, [ruta], leer)
+
+
+def meses_viajes():
+    """Meses (AAAA-MM, o SIN_FECHA) que tienen tramos programados."""
+    _migrar_csv()
+    return list(_particiones())
+
+
+def cargar_viajes_mes(mes):
+    """Tramos de una sola partición mensual."""
+    _migrar_csv()
+    ruta = _ruta_particion(mes)
+    if not os.path.exists(ruta):
+        return pd.DataFrame()
+    return _leer_particion(mes, ruta)
+
+
+def cargar_viajes(desde=None, hasta=None, columnas=None):
+    """Tramos programados, opcionalmente sólo entre `desde` y `hasta` (inclusive) y de `columnas`."""
+    _migrar_csv()
+    particiones = _particiones()
+    if desde is not None or hasta is not None:
+        inicio = pd.Timestamp(desde).strftime("%Y-%m") if desde is not None else "0000-00"
+        fin = pd.Timestamp(hasta).strftime("%Y-%m") if hasta is not None else "9999-99"
+        particiones = {mes: ruta for mes, ruta in particiones.items() if inicio <= mes <= fin}
+    columnas = list(columnas) if columnas is not None else None
+
+    partes = []
+    # Compartido: no se mezclan meses de antes y después de una escritura
+    with bloqueo(DIR_VIAJES, compartido=True):
+        for mes, ruta in particiones.items():
+            if os.path.exists(ruta):
+                partes.append(_leer_particion(mes, ruta, columnas))
+    if not partes:
+        return pd.DataFrame(columns=columnas or [])
+    df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0].reset_index(drop=True)
+    if desde is not None:
+        df = df[df["Fecha"] >= pd.Timestamp(desde).strftime("%Y-%m-%d")]
+    if hasta is not None:
+        df = df[df["Fecha"] <= pd.Timestamp(hasta).strftime("%Y-%m-%d")]
+    return df.reset_index(drop=True)
+
+
+def _tupla(valor):
+    return tuple(_tupla(v) for v in valor) if isinstance(valor, list) else valor
+
+
+def _guardar_estado(estado):
+    escribir_atomico(RUTA_ESTADO, lambda tmp: estado.to_csv(tmp))
+
+    def escribir_meta(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"firma_viajes": firma_viajes()}, f)
+    escribir_atomico(RUTA_ESTADO_META, escribir_meta)
+    invalidar(RUTA_ESTADO)
+
+
+def cargar_estado_viajes():
+    """Estado por ID_Programacion (tramos, estado, fecha, totales)."""
+    _migrar_csv()
+
+    def leer():
+        # Con el candado compartido ningún escritor cambia los tramos a media reconstrucción
+        with bloqueo(DIR_VIAJES, compartido=True):
+            meta = {}
+            if os.path.exists(RUTA_ESTADO_META):
+                with open(RUTA_ESTADO_META, encoding="utf-8") as f:
+                    meta = json.load(f)
+            # Si el historial cambió por fuera (restauración, edición manual) se reconstruye una vez
+            if os.path.exists(RUTA_ESTADO) and _tupla(meta.get("firma_viajes")) == firma_viajes():
+                estado = pd.read_csv(RUTA_ESTADO, index_col="ID_Programacion")
+                instrumentacion.leido(RUTA_ESTADO, len(estado))
+                return estado
+            estado = resumir_tramos(cargar_viajes())
+            if _particiones():
+                _guardar_estado(estado)
+            return estado
+    rutas = [RUTA_ESTADO, RUTA_ESTADO_META] + list(_particiones().values())
+    return leer_cacheado(RUTA_ESTADO, rutas, leer)
+
+
+def ids_por_estado(estado_trafico):
+    estado = cargar_estado_viajes()
+    return estado.index[estado["Estado"] == estado_trafico]
+
+
+def guardar_viajes(df, ids=None, version=None):
+    """Guarda el historial completo `df`.
+
+    Con `ids` sólo se reescriben las particiones de los meses de esos tráficos
+    y sólo se recalcula su estado. Con `version` (firma_viajes al leer `df`)
+    falla con ConflictoVersion si otro usuario guardó en medio.
+    """
+    _migrar_csv()
+    with bloqueo(DIR_VIAJES):
+        verificar_version(version, firma_viajes())
+        _guardar_viajes(df, ids)
+
+
+def _guardar_viajes(df, ids):
+    # El estado previo se lee antes de tocar las particiones para no reconstruirlo
+    estado = cargar_estado_viajes() if ids is not None else None
+    antes = firma_viajes()
+    meses_df = _mes(df["Fecha"]) if not df.empty else np.array([], dtype=object)
+    if ids is not None:
+        afectados = df["ID_Programacion"].isin(ids).to_numpy()
+        reescribir = set(meses_df[afectados])
+    else:
+        reescribir = set(meses_df) | set(_particiones())
+    for mes in reescribir:
+        grupo = df[meses_df == mes]
+        if grupo.empty:
+            os.remove(_ruta_particion(mes))
+        else:
+            _escribir_particion(mes, grupo)
+    invalidar(CLAVE_VIAJES)
+    if ids is not None:
+        estado = estado.drop(index=ids, errors="ignore")
+        _guardar_estado(combinar_estado(estado, df[afectados]))
+        # Los meses reescritos se vuelven a agregar completos
+        meses = {analitica.SIN_DATO if mes == SIN_FECHA else mes for mes in reescribir}
+        analitica.aplicar_delta(DIR_CUBO_VIAJES, antes, firma_viajes(),
+                                agregar=df[np.isin(meses_df, list(reescribir))], meses=meses,
+                                reconstruir=lambda: analitica.cubo_de(cargar_viajes()))
+    else:
+        _guardar_estado(resumir_tramos(df))
+        analitica.guardar_cubo(DIR_CUBO_VIAJES, analitica.cubo_de(df), firma_viajes())
+
+
+def guardar_programacion(df_nueva):
+    """Agrega tramos: sólo se reescriben las particiones de los meses afectados."""
+    _migrar_csv()
+    with bloqueo(DIR_VIAJES):
+        _agregar_tramos(df_nueva)
+
+
+def cerrar_traficos(vueltas):
+    """Agrega los tramos VUELTA de `vueltas` sólo a los tráficos que siguen pendientes.
+
+    La revisión y la escritura ocurren con el candado tomado: un tráfico que
+    otro usuario cerró mientras tanto se omite en lugar de recibir un segundo
+    regreso. Regresa los ID_Programacion cerrados.
+    """
+    _migrar_csv()
+    with bloqueo(DIR_VIAJES):
+        vueltas = vueltas[vueltas["ID_Programacion"].isin(ids_por_estado(PENDIENTE))]
+        if not vueltas.empty:
+            _agregar_tramos(vueltas)
+    return list(dict.fromkeys(vueltas["ID_Programacion"]))
+
+
+def _agregar_tramos(df_nueva):
+    estado = cargar_estado_viajes()
+    antes = firma_viajes()
+    for mes, grupo in df_nueva.groupby(_mes(df_nueva["Fecha"]), sort=False):
+        ruta = _ruta_particion(mes)
+        if os.path.exists(ruta):
+            grupo = pd.concat([pd.read_parquet(ruta), _normalizar(grupo)], ignore_index=True)
+        _escribir_particion(mes, grupo)
+    invalidar(CLAVE_VIAJES)
+    _guardar_estado(combinar_estado(estado, df_nueva))
+    analitica.aplicar_delta(DIR_CUBO_VIAJES, antes, firma_viajes(), agregar=df_nueva,
+                            reconstruir=lambda: analitica.cubo_de(cargar_viajes()))
+
+
+# ==============================
+# Cubos de rentabilidad
+# ==============================
+# Los escritores los mantienen al día; aquí sólo se reconstruyen si quedaron
+# desfasados (archivos restaurados a mano, migración, escritura interrumpida).
+
+def _cubo_vigente(directorio, candado, version, reconstruir):
+    cubo, guardada = analitica.leer_cubo(directorio)
+    if cubo is not None and analitica.vigente(guardada, version()):
+        return cubo
+    with bloqueo(candado):
+        # Otro proceso pudo haberlo reconstruido mientras se esperaba el candado
+        cubo, guardada = analitica.leer_cubo(directorio)
+        actual = version()
+        if cubo is None or not analitica.vigente(guardada, actual):
+            cubo = reconstruir()
+            analitica.guardar_cubo(directorio, cubo, actual)
+        return cubo
+
+
+def cubo_rutas():
+    """Cubo de rentabilidad de las rutas cotizadas (vacío si no hay catálogo)."""
+    if not almacen.existe_catalogo():
+        return analitica.cubo_vacio()
+    directorio = almacen.ruta_cubo()
+
+    def leer():
+        return _cubo_vigente(directorio, almacen.RUTA_BASE, almacen.version_catalogo,
+                             lambda: analitica.cubo_de(almacen.cargar_rutas(columnas=analitica.COLUMNAS_FUENTE)))
+    return leer_cacheado((CLAVE_CUBOS, "rutas"), [analitica.archivo_version(directorio)] + _archivos_catalogo(), leer)
+
+
+def cubo_viajes():
+    """Cubo de rentabilidad de los tramos programados (vacío si no hay viajes)."""
+    if not existe_viajes():
+        return analitica.cubo_vacio()
+
+    def leer():
+        return _cubo_vigente(DIR_CUBO_VIAJES, DIR_VIAJES, firma_viajes,
+                             lambda: analitica.cubo_de(cargar_viajes()))
+    rutas = [analitica.archivo_version(DIR_CUBO_VIAJES)] + list(_particiones().values())
+    return leer_cacheado((CLAVE_CUBOS, "viajes"), rutas, leer)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# Explorador paginado del catálogo
+# ==============================
+# Filtros, búsqueda y orden se resuelven en el servidor con máscaras
+# vectorizadas; al navegador sólo viaja la página visible.
+
+COLUMNAS_BUSQUEDA = ["Cliente", "Origen", "Destino"]
+
+
+def _coincide(serie, patron):
+    # En columnas categóricas basta buscar en las categorías y comparar códigos
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories.astype(str)
+        encontradas = np.flatnonzero(categorias.str.contains(patron, case=False, regex=False))
+        return np.isin(serie.cat.codes.to_numpy(), encontradas)
+    return serie.astype(str).str.contains(patron, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+
+
+def filtrar_rutas(df, tipos=None, clientes=None, origenes=None, destinos=None,
+                  desde=None, hasta=None, utilidad_min=None, utilidad_max=None, texto=None):
+    """Máscara booleana de las rutas que cumplen todos los filtros indicados."""
+    mascara = np.ones(len(df), dtype=bool)
+    for columna, valores in (("Tipo", tipos), ("Cliente", clientes), ("Origen", origenes), ("Destino", destinos)):
+        if valores:
+            mascara &= df[columna].isin(valores).to_numpy()
+    if desde is not None or hasta is not None:
+        fechas = pd.to_datetime(df["Fecha"], errors="coerce")
+        if desde is not None:
+            mascara &= (fechas >= pd.Timestamp(desde)).to_numpy()
+        if hasta is not None:
+            mascara &= (fechas < pd.Timestamp(hasta) + pd.Timedelta(days=1)).to_numpy()
+    if utilidad_min is not None or utilidad_max is not None:
+        utilidad = pd.to_numeric(df["% Utilidad"], errors="coerce").to_numpy(dtype="float64")
+        if utilidad_min is not None:
+            mascara &= utilidad >= utilidad_min
+        if utilidad_max is not None:
+            mascara &= utilidad <= utilidad_max
+    if texto:
+        encontrada = np.zeros(len(df), dtype=bool)
+        for columna in COLUMNAS_BUSQUEDA + ["ID_Ruta"]:
+            if columna in df.columns:
+                encontrada |= _coincide(df[columna], texto.strip())
+        mascara &= encontrada
+    return mascara
+
+
+def pagina_de_rutas(df, mascara, orden=None, ascendente=True, numero=1, tamano=50):
+    """Página `numero` (desde 1) de las rutas filtradas. Regresa (página, total_filtradas, total_páginas)."""
+    posiciones = np.flatnonzero(mascara)
+    total = len(posiciones)
+    if orden is not None and total:
+        valores = df[orden].iloc[posiciones]
+        if isinstance(valores.dtype, pd.CategoricalDtype):
+            valores = valores.astype(str)
+        orden_local = valores.reset_index(drop=True).sort_values(
+            ascending=ascendente, na_position="last", kind="stable"
+        ).index.to_numpy()
+        posiciones = posiciones[orden_local]
+    paginas = max(1, -(-total // tamano))
+    numero = min(max(1, int(numero)), paginas)
+    inicio = (numero - 1) * tamano
+    return df.iloc[posiciones[inicio:inicio + tamano]], total, paginas
@@ -0,0 +1,118 @@
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ==============================
+# Índice (Tipo, Origen) para sugerencias de regreso
+# ==============================
+# Cada cubeta guarda las posiciones del catálogo ya ordenadas por % Utilidad
+# (mayor a menor), así una sugerencia es una búsqueda en diccionario más el
+# tamaño del resultado, sin recorrer ni ordenar el catálogo completo.
+
+
+def _clave_orden(utilidad, posicion):
+    # Las rutas sin % Utilidad (ingreso 0) van al final, como en sort_values
+    return (np.inf if pd.isna(utilidad) else -float(utilidad), posicion)
+
+
+class IndiceRutas:
+    def __init__(self):
+        self._cubetas = {}
+        self._filas = {}
+        self._ids = None
+        self._tipos = None
+        self._origenes = None
+        self._utilidades = None
+        self._lock = threading.Lock()
+
+    def reconstruir(self, df):
+        """Construye todas las cubetas con un solo ordenamiento del catálogo."""
+        self._cubetas = {}
+        self._filas = {}
+        tipos, origenes, utilidades = self._columnas(df)
+        orden_utilidad = np.where(np.isnan(utilidades), np.inf, -utilidades)
+        orden = np.lexsort((np.arange(len(df)), orden_utilidad))
+        for posicion in orden:
+            clave = (tipos[posicion], origenes[posicion])
+            entrada = _clave_orden(utilidades[posicion], int(posicion))
+            self._cubetas.setdefault(clave, []).append(entrada)
+            self._filas[int(posicion)] = (clave, entrada)
+        self._guardar_columnas(df, tipos, origenes, utilidades)
+
+    def copia(self):
+        """Índice independiente con el mismo contenido, para sincronizarlo sin tocar el original."""
+        nuevo = IndiceRutas()
+        with self._lock:
+            nuevo._cubetas = {clave: list(cubeta) for clave, cubeta in self._cubetas.items()}
+            nuevo._filas = dict(self._filas)
+            nuevo._ids = self._ids
+            nuevo._tipos = self._tipos
+            nuevo._origenes = self._origenes
+            nuevo._utilidades = self._utilidades
+        return nuevo
+
+    def agregar(self, posicion, tipo, origen, utilidad):
+        clave = (tipo, origen)
+        entrada = _clave_orden(utilidad, posicion)
+        bisect.insort(self._cubetas.setdefault(clave, []), entrada)
+        self._filas[posicion] = (clave, entrada)
+
+    def quitar(self, posicion):
+        clave, entrada = self._filas.pop(posicion)
+        cubeta = self._cubetas[clave]
+        del cubeta[bisect.bisect_left(cubeta, entrada)]
+        if not cubeta:
+            del self._cubetas[clave]
+
+    def actualizar(self, posicion, tipo, origen, utilidad):
+        self.quitar(posicion)
+        self.agregar(posicion, tipo, origen, utilidad)
+
+    def sincronizar(self, df):
+        """Pone el índice al día con `df` tocando sólo las filas nuevas o modificadas.
+
+        El catálogo sólo crece por el final (altas en el log), así que si los
+        IDs ya indexados siguen en la misma posición basta con comparar las
+        columnas vectorialmente y reinsertar lo que cambió.
+        """
+        with self._lock:
+            ids = df["ID_Ruta"].to_numpy() if "ID_Ruta" in df.columns else None
+            n = 0 if self._ids is None else len(self._ids)
+            if (ids is None or self._ids is None or len(ids) < n
+                    or not np.array_equal(ids[:n], self._ids)):
+                self.reconstruir(df)
+                return self
+            tipos, origenes, utilidades = self._columnas(df)
+            previa = self._utilidades
+            cambio_utilidad = ~((utilidades[:n] == previa) | (np.isnan(utilidades[:n]) & np.isnan(previa)))
+            cambiadas = np.flatnonzero(
+                (tipos[:n] != self._tipos) | (origenes[:n] != self._origenes) | cambio_utilidad
+            )
+            for posicion in cambiadas:
+                self.actualizar(int(posicion), tipos[posicion], origenes[posicion], utilidades[posicion])
+            for posicion in range(n, len(df)):
+                self.agregar(posicion, tipos[posicion], origenes[posicion], utilidades[posicion])
+            self._guardar_columnas(df, tipos, origenes, utilidades)
+            return self
+
+    def buscar(self, tipo, origen, limite=None):
+        """Posiciones del catálogo con ese Tipo y Origen, de mayor a menor % Utilidad."""
+        with self._lock:
+            cubeta = self._cubetas.get((tipo, origen), [])
+            if limite is not None:
+                cubeta = cubeta[:limite]
+            return [posicion for _, posicion in cubeta]
+
+    def _columnas(self, df):
+        tipos = df["Tipo"].astype(object).fillna("").to_numpy(dtype=object)
+        origenes = df["Origen"].astype(object).fillna("").to_numpy(dtype=object)
+        utilidades = pd.to_numeric(df["% Utilidad"], errors="coerce").to_numpy(dtype="float64")
+        return tipos, origenes, utilidades
+
+    def _guardar_columnas(self, df, tipos, origenes, utilidades):
+        self._ids = df["ID_Ruta"].to_numpy().copy() if "ID_Ruta" in df.columns else None
+        self._tipos = tipos.copy()
+        self._origenes = origenes.copy()
+        self._utilidades = utilidades.copy()
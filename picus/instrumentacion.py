@@ -0,0 +1,286 @@
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from datetime import datetime
+
+# ==============================
+# Tiempos por etapa de cada ejecución de página
+# ==============================
+# Cada página abre una medición con iniciar_pagina, envuelve sus etapas
+# (cargar rutas, buscar regresos, mostrar tabla...) en `etapa` y la cierra con
+# cerrar_pagina. La capa de datos reporta con `leido` los bytes y filas que
+# realmente lee de disco (las lecturas servidas desde caché no cuentan). Cada
+# ejecución se anexa como una línea JSON a una bitácora rotativa; con la
+# depuración activa (PICUS_DEBUG=1 o ?debug=1 en la URL) además se muestra el
+# panel de tiempos al final de la página. pandas sólo se importa para el
+# panel y el resumen, así medir no agrega importaciones a páginas ligeras.
+
+RUTA_BITACORA = "bitacora_tiempos.jsonl"
+TAMANO_BITACORA = 5 * 2**20
+RESPALDOS_BITACORA = 3
+# Una medición sin cerrar (sesión que se fue tras un st.stop) se registra y se suelta pasado este tiempo
+PENDIENTE_MAXIMO_S = 30 * 60
+
+
+class Medicion:
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.fecha = datetime.now().isoformat(timespec="seconds")
+        self.inicio = time.perf_counter()
+        # Último momento con trabajo medido: fin de la ejecución si se detuvo antes de cerrar
+        self.ultimo = self.inicio
+        self.etapas = []
+        self.abiertas = []
+        self.bytes = 0
+        self.filas = 0
+        self.cache = [0, 0]  # aciertos, fallos
+
+    def registro(self, completa):
+        # Una ejecución detenida (st.stop) termina en su última etapa, no cuando la sesión vuelve a correr
+        total = (time.perf_counter() if completa else self.ultimo) - self.inicio
+        return {
+            "fecha": self.fecha,
+            "pagina": self.pagina,
+            "completa": completa,
+            "total_s": round(total, 6),
+            "bytes": self.bytes,
+            "filas": self.filas,
+            "cache_aciertos": self.cache[0],
+            "cache_fallos": self.cache[1],
+            "etapas": self.etapas,
+        }
+
+
+_local = threading.local()
+# Mediciones sin cerrar por sesión: si la página se detuvo antes del final
+# (st.stop) se registran como incompletas en la siguiente ejecución de la
+# sesión o, si no vuelve, pasado PENDIENTE_MAXIMO_S
+_pendientes = {}
+_lock = threading.Lock()
+_bitacora = None
+
+
+def _actual():
+    return getattr(_local, "medicion", None)
+
+
+def _sesion():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        contexto = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        contexto = None
+    return contexto.session_id if contexto is not None else threading.get_ident()
+
+
+def _logger():
+    global _bitacora
+    with _lock:
+        if _bitacora is None:
+            logger = logging.getLogger("picus.tiempos")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            manejador = logging.handlers.RotatingFileHandler(
+                RUTA_BITACORA, maxBytes=TAMANO_BITACORA, backupCount=RESPALDOS_BITACORA, encoding="utf-8")
+            manejador.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(manejador)
+            _bitacora = logger
+        return _bitacora
+
+
+def _escribir(registro):
+    try:
+        _logger().info(json.dumps(registro, ensure_ascii=False))
+    except OSError:
+        # La bitácora nunca debe tumbar una página
+        pass
+
+
+def iniciar_pagina(pagina):
+    """Abre la medición de esta ejecución de `pagina`."""
+    sesion = _sesion()
+    medicion = Medicion(pagina)
+    with _lock:
+        previas = [_pendientes.pop(sesion)] if sesion in _pendientes else []
+        vencidas = [s for s, m in _pendientes.items() if medicion.inicio - m.inicio > PENDIENTE_MAXIMO_S]
+        previas += [_pendientes.pop(s) for s in vencidas]
+        _pendientes[sesion] = medicion
+    for previa in previas:
+        _escribir(previa.registro(completa=False))
+    _local.medicion = medicion
+    return medicion
+
+
+def cerrar_pagina():
+    """Cierra la medición, la anexa a la bitácora y muestra el panel si hay depuración."""
+    medicion = _actual()
+    if medicion is None:
+        return None
+    _local.medicion = None
+    sesion = _sesion()
+    with _lock:
+        if _pendientes.get(sesion) is medicion:
+            del _pendientes[sesion]
+    registro = medicion.registro(completa=True)
+    _escribir(registro)
+    if depuracion_activa():
+        mostrar_panel(registro)
+    return registro
+
+
+@contextlib.contextmanager
+def etapa(nombre, filas=None):
+    """Mide el bloque como la etapa `nombre`; `filas` son las que recorre en memoria."""
+    medicion = _actual()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    datos = {"etapa": " › ".join([e["etapa"] for e in medicion.abiertas] + [nombre]),
+             "nivel": len(medicion.abiertas), "inicio_s": round(inicio - medicion.inicio, 6),
+             "s": 0.0, "bytes": 0, "filas": filas or 0}
+    medicion.abiertas.append(datos)
+    try:
+        yield
+    finally:
+        medicion.ultimo = time.perf_counter()
+        datos["s"] = round(medicion.ultimo - inicio, 6)
+        medicion.abiertas.remove(datos)
+        medicion.etapas.append(datos)
+        if filas:
+            medicion.filas += filas
+
+
+def leido(ruta=None, filas=0, bytes_leidos=None):
+    """La capa de datos leyó `ruta` (o `bytes_leidos`) con `filas` filas."""
+    medicion = _actual()
+    if medicion is None:
+        return
+    if bytes_leidos is None:
+        try:
+            bytes_leidos = os.path.getsize(ruta) if ruta is not None else 0
+        except OSError:
+            bytes_leidos = 0
+    medicion.bytes += bytes_leidos
+    medicion.filas += filas
+    # Se suma a todas las etapas abiertas, igual que su tiempo
+    for abierta in medicion.abiertas:
+        abierta["bytes"] += bytes_leidos
+        abierta["filas"] += filas
+
+
+def cache(acierto):
+    medicion = _actual()
+    if medicion is not None:
+        medicion.cache[0 if acierto else 1] += 1
+
+
+# ==============================
+# Panel de depuración y bitácora
+# ==============================
+
+def depuracion_activa():
+    if os.environ.get("PICUS_DEBUG", "").lower() in ("1", "true", "si", "sí"):
+        return True
+    try:
+        import streamlit as st
+        return st.query_params.get("debug") in ("1", "true")
+    except Exception:
+        return False
+
+
+def tabla_etapas(registro):
+    """Etapas de un registro, en orden de inicio, con su parte del total."""
+    import pandas as pd
+
+    if not registro["etapas"]:
+        return pd.DataFrame(columns=["Etapa", "ms", "% del total", "KB leídos", "Filas"])
+    etapas = pd.DataFrame(registro["etapas"])
+    total = registro["total_s"] or 1e-9
+    tabla = pd.DataFrame({
+        "Etapa": ["    " * n + e for n, e in zip(etapas["nivel"], etapas["etapa"].str.split(" › ").str[-1])],
+        "ms": (etapas["s"] * 1000).round(2),
+        "% del total": (etapas["s"] / total * 100).round(1),
+        "KB leídos": (etapas["bytes"] / 1024).round(1),
+        "Filas": etapas["filas"],
+    })
+    # Las etapas anidadas terminan antes que su padre: se ordenan por inicio para verlas debajo
+    orden = etapas["inicio_s"].argsort(kind="stable")
+    return tabla.iloc[orden].reset_index(drop=True)
+
+
+def mostrar_panel(registro):
+    import streamlit as st
+
+    total_ms = registro["total_s"] * 1000
+    with st.expander(f"⏱️ Tiempos de esta ejecución: {total_ms:,.0f} ms", expanded=False):
+        principales = sum(e["s"] for e in registro["etapas"] if e["nivel"] == 0)
+        st.caption(
+            f"{registro['bytes'] / 2**20:,.2f} MB leídos de disco · {registro['filas']:,} filas · "
+            f"caché {registro['cache_aciertos']} aciertos / {registro['cache_fallos']} lecturas · "
+            f"{(registro['total_s'] - principales) * 1000:,.0f} ms fuera de etapas (widgets y render)"
+        )
+        st.dataframe(tabla_etapas(registro), use_container_width=True, hide_index=True)
+        peores = resumir_bitacora()
+        if not peores.empty:
+            st.markdown("**🐢 Páginas más lentas según la bitácora**")
+            st.dataframe(peores, use_container_width=True, hide_index=True)
+
+
+def leer_bitacora(ruta=RUTA_BITACORA):
+    """Registros de la bitácora y sus archivos rotados, del más viejo al más nuevo."""
+    archivos = [f"{ruta}.{n}" for n in range(RESPALDOS_BITACORA, 0, -1)] + [ruta]
+    registros = []
+    for archivo in archivos:
+        if not os.path.exists(archivo):
+            continue
+        with open(archivo, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registros.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    continue
+    return registros
+
+
+def resumir_bitacora(ruta=RUTA_BITACORA, por="pagina"):
+    """Ejecuciones, mediana, p95 y máximo en ms por página (o por página y etapa con por="etapa").
+
+    Por página los tiempos son de las ejecuciones completas; las detenidas
+    antes del final (st.stop) sólo se cuentan aparte.
+    """
+    import pandas as pd
+
+    registros = leer_bitacora(ruta)
+    if not registros:
+        return pd.DataFrame()
+    if por == "etapa":
+        df = pd.DataFrame([{"pagina": r["pagina"], "etapa": e["etapa"], "s": e["s"], "bytes": e["bytes"]}
+                           for r in registros for e in r["etapas"]])
+        claves = ["pagina", "etapa"]
+    else:
+        df = pd.DataFrame([{"pagina": r["pagina"], "s": r["total_s"], "bytes": r["bytes"],
+                            "incompleta": not r.get("completa", True)} for r in registros])
+        claves = ["pagina"]
+    if df.empty:
+        return df
+    detenidas = df.groupby(claves)["incompleta"].sum() if por != "etapa" else None
+    if por != "etapa":
+        df = df[~df["incompleta"]]
+    grupos = df.groupby(claves)
+    resumen = pd.DataFrame({
+        "Ejecuciones": grupos.size(),
+        "Mediana ms": grupos["s"].median() * 1000,
+        "p95 ms": grupos["s"].quantile(0.95) * 1000,
+        "Máximo ms": grupos["s"].max() * 1000,
+        "MB leídos (prom.)": grupos["bytes"].mean() / 2**20,
+    }).round(2)
+    if detenidas is not None:
+        resumen = resumen.reindex(detenidas.index)
+        resumen["Ejecuciones"] = resumen["Ejecuciones"].fillna(0).astype(int)
+        resumen["Detenidas antes del final"] = detenidas.astype(int)
+    return resumen.sort_values("p95 ms", ascending=False).reset_index()
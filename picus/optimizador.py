@@ -0,0 +1,132 @@
+import heapq
+import time
+
+import numpy as np
+import pandas as pd
+
+from picus.costos import COSTOS_INDIRECTOS, calcular_costos
+
+# ==============================
+# Optimizador de vueltas multi-tramo
+# ==============================
+# El catálogo se trata como grafo dirigido: ciudades = nodos, rutas = aristas
+# con peso igual a su utilidad neta (ingreso - costo - 35% indirectos) con el
+# sueldo/bono del modo elegido. Se buscan las mejores vueltas cerradas que
+# salen y regresan a la base con búsqueda en profundidad acotada: una cota
+# superior exacta por programación dinámica poda todo lo que no puede entrar
+# al top-k.
+
+
+def utilidad_neta_tramos(df_rutas, valores, modo=None):
+    """Ingreso, costo y utilidad neta de cada ruta, recosteada con `modo` si se indica."""
+    costos = calcular_costos(df_rutas, valores, modo=modo)
+    ingreso = costos["Ingreso Total"].to_numpy()
+    costo = costos["Costo_Total_Ruta"].to_numpy()
+    return ingreso, costo, ingreso - costo - ingreso * COSTOS_INDIRECTOS
+
+
+def _cotas(origen, destino, peso, n_nodos, base, max_tramos):
+    # cota[h][v] = mayor utilidad posible de v a la base en a lo más h tramos
+    cota = np.full((max_tramos + 1, n_nodos), -np.inf)
+    cota[0, base] = 0.0
+    for h in range(1, max_tramos + 1):
+        cota[h] = cota[0]
+        candidatos = peso + cota[h - 1][destino]
+        np.maximum.at(cota[h], origen, candidatos)
+    return cota
+
+
+def mejores_vueltas(df_rutas, valores, base, max_tramos=4, top_k=10, modo=None,
+                    tipo_inicial=None, limite_segundos=5.0):
+    """Top-k vueltas cerradas desde `base` de hasta `max_tramos` tramos.
+
+    Regresa (DataFrame de vueltas ordenado por utilidad neta, búsqueda_completa).
+    Cada ruta se usa a lo más una vez por vuelta.
+    """
+    columnas = ["Vuelta", "Tramos", "Ingreso", "Costo", "Utilidad Neta", "% Utilidad Neta", "Posiciones"]
+    if df_rutas.empty:
+        return pd.DataFrame(columns=columnas), True
+
+    codigos, ciudades = pd.factorize(pd.concat([df_rutas["Origen"], df_rutas["Destino"]], ignore_index=True))
+    n = len(df_rutas)
+    origen, destino = codigos[:n], codigos[n:]
+    validas = (origen >= 0) & (destino >= 0)
+    origen, destino = np.where(validas, origen, 0), np.where(validas, destino, 0)
+    if base not in set(ciudades):
+        return pd.DataFrame(columns=columnas), True
+    nodo_base = int(np.flatnonzero(ciudades == base)[0])
+
+    ingreso, costo, peso = utilidad_neta_tramos(df_rutas, valores, modo=modo)
+    peso = np.where(validas, np.nan_to_num(peso, nan=-np.inf), -np.inf)
+    tipos = df_rutas["Tipo"].to_numpy(dtype=object)
+    cota = _cotas(origen, destino, peso, len(ciudades), nodo_base, max_tramos)
+
+    por_origen = np.argsort(origen, kind="stable")
+    cortes = np.searchsorted(origen[por_origen], np.arange(len(ciudades) + 1))
+    ordenes = {}
+
+    def aristas(nodo, restantes):
+        # Aristas de salida ordenadas por la mejor utilidad alcanzable a través de ellas
+        clave = (nodo, restantes)
+        if clave not in ordenes:
+            ids = por_origen[cortes[nodo]:cortes[nodo + 1]]
+            potencial = peso[ids] + cota[restantes - 1][destino[ids]]
+            orden = np.argsort(-potencial, kind="stable")
+            ordenes[clave] = (ids[orden], potencial[orden])
+        return ordenes[clave]
+
+    mejores = []  # min-heap de (utilidad, contador, posiciones)
+    contador = [0]
+    limite = time.perf_counter() + limite_segundos
+    completa = [True]
+
+    def umbral():
+        return mejores[0][0] if len(mejores) >= top_k else -np.inf
+
+    def buscar(nodo, utilidad, camino, usados):
+        if time.perf_counter() > limite:
+            completa[0] = False
+            return
+        restantes = max_tramos - len(camino)
+        if restantes == 0:
+            return
+        ids, potencial = aristas(nodo, restantes)
+        for arista, mejor_posible in zip(ids, potencial):
+            if utilidad + mejor_posible <= umbral():
+                break
+            if arista in usados or (not camino and tipo_inicial and tipos[arista] != tipo_inicial):
+                continue
+            nueva = utilidad + peso[arista]
+            camino.append(int(arista))
+            if destino[arista] == nodo_base:
+                contador[0] += 1
+                entrada = (nueva, contador[0], tuple(camino))
+                if len(mejores) < top_k:
+                    heapq.heappush(mejores, entrada)
+                else:
+                    heapq.heappushpop(mejores, entrada)
+            else:
+                usados.add(int(arista))
+                buscar(destino[arista], nueva, camino, usados)
+                usados.discard(int(arista))
+            camino.pop()
+
+    buscar(nodo_base, 0.0, [], set())
+
+    filas = []
+    for utilidad, _, posiciones in sorted(mejores, key=lambda x: (-x[0], x[1])):
+        pos = list(posiciones)
+        ingreso_vuelta = float(ingreso[pos].sum())
+        filas.append({
+            "Vuelta": " | ".join(
+                f"{tipos[p]} {df_rutas['Origen'].iat[p]} → {df_rutas['Destino'].iat[p]} ({df_rutas['Cliente'].iat[p]})"
+                for p in pos
+            ),
+            "Tramos": len(pos),
+            "Ingreso": ingreso_vuelta,
+            "Costo": float(costo[pos].sum()),
+            "Utilidad Neta": utilidad,
+            "% Utilidad Neta": round(utilidad / ingreso_vuelta * 100, 2) if ingreso_vuelta > 0 else 0.0,
+            "Posiciones": pos
+        })
+    return pd.DataFrame(filas, columns=columnas), completa[0]
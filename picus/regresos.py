@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# Búsqueda de regreso con vacío intermedio
+# ==============================
+# Sustituye el ciclo iterrows de "Completar y Simular Tráfico": en lugar de
+# filtrar y ordenar el catálogo por cada vacío, se obtiene el mejor regreso por
+# origen una sola vez y se cruza contra los destinos de los vacíos.
+
+# Umbral inicial del ciclo original: combinaciones con utilidad menor se descartan
+UTILIDAD_MINIMA = -999999
+
+
+def _num(serie):
+    return pd.to_numeric(serie, errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+
+def _valor(ruta, columna):
+    valor = ruta.get(columna, 0)
+    return 0.0 if valor is None or pd.isna(valor) else float(valor)
+
+
+def mejores_regresos_por_origen(df_rutas, tipo_regreso, por_origen=1):
+    """Las `por_origen` rutas de `tipo_regreso` con mayor % Utilidad para cada Origen.
+
+    Los empates se resuelven por orden en el catálogo.
+    """
+    regresos = df_rutas[df_rutas["Tipo"] == tipo_regreso]
+    regresos = regresos.assign(_posicion=np.flatnonzero((df_rutas["Tipo"] == tipo_regreso).to_numpy()))
+    regresos = regresos.sort_values("% Utilidad", ascending=False, na_position="last", kind="stable")
+    return regresos.groupby("Origen", sort=False).head(por_origen)
+
+
+def mejores_regresos_con_vacio(ida, df_rutas, tipo_regreso, top_k=1):
+    """Mejores combinaciones (vacío, regreso) para cerrar el tráfico `ida`.
+
+    Regresa un DataFrame ordenado por utilidad del tráfico completo con las
+    posiciones en `df_rutas` de cada tramo (`pos_vacio`, `pos_regreso`) y la
+    `Utilidad`. Con top_k=1 coincide con el resultado del ciclo original.
+    """
+    es_vacio = ((df_rutas["Tipo"] == "VACIO") & (df_rutas["Origen"] == ida["Destino"])).to_numpy()
+    vacios = pd.DataFrame({
+        "pos_vacio": np.flatnonzero(es_vacio),
+        "Destino": df_rutas["Destino"].to_numpy()[es_vacio],
+        "costo_vacio": _num(df_rutas["Costo_Total_Ruta"])[es_vacio]
+    })
+    columnas = ["_posicion", "Origen", "Ingreso Total", "Costo_Total_Ruta"]
+    regresos = mejores_regresos_por_origen(df_rutas, tipo_regreso, por_origen=top_k)[columnas]
+    regresos = regresos.rename(columns={"_posicion": "pos_regreso"})
+
+    combos = vacios.merge(regresos, left_on="Destino", right_on="Origen", how="inner", sort=False)
+    combos["Utilidad"] = (
+        _valor(ida, "Ingreso Total") + _num(combos["Ingreso Total"])
+        - _valor(ida, "Costo_Total_Ruta") - combos["costo_vacio"] - _num(combos["Costo_Total_Ruta"])
+    )
+    combos = combos[combos["Utilidad"] > UTILIDAD_MINIMA]
+    # A igual utilidad gana el vacío que aparece primero en el catálogo, como en el ciclo
+    combos = combos.sort_values(["Utilidad", "pos_vacio"], ascending=[False, True], kind="stable")
+    return combos[["pos_vacio", "pos_regreso", "Utilidad"]].head(top_k).reset_index(drop=True)
+
+
+def tipo_de_regreso(tipo_ida):
+    return "EXPO" if tipo_ida == "IMPO" else "IMPO"
+
+
+def sugerir_regresos(ida, df_rutas, indice, top_k=5):
+    """Opciones para cerrar el tráfico `ida`, como las ofrece Programación de Viajes.
+
+    Regresa (directas, combos): las rutas de regreso que salen del destino de
+    la ida, ordenadas por % Utilidad, o, sólo si no hay ninguna, las `top_k`
+    mejores combinaciones con vacío de mejores_regresos_con_vacio.
+    """
+    tipo_regreso = tipo_de_regreso(ida["Tipo"])
+    directas = df_rutas.iloc[indice.buscar(tipo_regreso, ida["Destino"])]
+    if not directas.empty:
+        return directas, pd.DataFrame(columns=["pos_vacio", "pos_regreso", "Utilidad"])
+    return directas, mejores_regresos_con_vacio(ida, df_rutas, tipo_regreso, top_k=top_k)
@@ -0,0 +1,106 @@
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from picus import almacen, datos
+from picus.bloqueo import bloqueo, escribir_atomico
+from picus.cache import firma
+
+# ==============================
+# Respaldo comprimido del conjunto de datos
+# ==============================
+# Un .tar.gz con rutas, datos generales y viajes programados en CSV más un
+# manifiesto con filas y sha256 de cada archivo. Se genera sólo cuando
+# alguien lo pide, escribiendo cada CSV por bloques a disco, y se guarda
+# con la versión de los datos en el nombre: mientras nada cambie, las
+# descargas siguientes reutilizan el mismo archivo.
+
+DIR_RESPALDOS = "respaldos"
+FILAS_POR_BLOQUE = 50_000
+
+
+def version_datos():
+    """Huella de los tres almacenes en disco (cambia con cualquier escritura)."""
+    rutas = [almacen.RUTA_BASE, almacen.RUTA_LOG, almacen.RUTA_LOG + ".compactando", datos.RUTA_DATOS]
+    huella = repr((firma(*rutas), datos.firma_viajes()))
+    return hashlib.sha256(huella.encode("utf-8")).hexdigest()[:16]
+
+
+def _escribir_csv(partes, ruta):
+    # Escribe los DataFrames de `partes` como un solo CSV; regresa (filas, sha256)
+    suma = hashlib.sha256()
+    filas = 0
+    with open(ruta, "wb") as f:
+        for df in partes:
+            texto = df.to_csv(index=False, header=filas == 0).encode("utf-8")
+            f.write(texto)
+            suma.update(texto)
+            filas += len(df)
+    return filas, suma.hexdigest()
+
+
+def _bloques(df):
+    for inicio in range(0, max(len(df), 1), FILAS_POR_BLOQUE):
+        yield df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+
+
+def _partes_viajes():
+    for mes in sorted(datos.meses_viajes()):
+        yield datos.cargar_viajes_mes(mes)
+
+
+def _tabla_datos_generales():
+    return pd.DataFrame(datos.cargar_datos_generales().items(), columns=["Parametro", "Valor"])
+
+
+def _armar(destino, version):
+    contenido = {
+        # El catálogo se lee por lotes de la base con el log aplicado, sin pasar por el caché
+        "rutas_guardadas.csv": lambda: almacen.rutas_por_lotes(FILAS_POR_BLOQUE),
+        "datos_generales.csv": lambda: _bloques(_tabla_datos_generales()),
+        "viajes_programados.csv": _partes_viajes,
+    }
+    manifiesto = {"version": version, "generado": datetime.now().isoformat(timespec="seconds"), "archivos": {}}
+    with tempfile.TemporaryDirectory(dir=DIR_RESPALDOS) as trabajo, tarfile.open(destino, "w:gz") as tar:
+        for nombre, partes in contenido.items():
+            ruta = os.path.join(trabajo, nombre)
+            filas, suma = _escribir_csv(partes(), ruta)
+            manifiesto["archivos"][nombre] = {"filas": filas, "bytes": os.path.getsize(ruta), "sha256": suma}
+            tar.add(ruta, arcname=nombre)
+        texto = json.dumps(manifiesto, ensure_ascii=False, indent=2).encode("utf-8")
+        info = tarfile.TarInfo("manifiesto.json")
+        info.size = len(texto)
+        info.mtime = int(datetime.now().timestamp())
+        tar.addfile(info, io.BytesIO(texto))
+
+
+def generar_respaldo():
+    """Ruta del respaldo de la versión vigente; sólo lo arma si no existe ya."""
+    os.makedirs(DIR_RESPALDOS, exist_ok=True)
+    # Las migraciones de formato (si faltan) necesitan candado exclusivo: se hacen antes
+    almacen.preparar_catalogo()
+    datos.meses_viajes()
+    # Con los candados compartidos los tres archivos corresponden a la misma versión
+    with bloqueo(os.path.join(DIR_RESPALDOS, "respaldo")), \
+            bloqueo(almacen.RUTA_BASE, compartido=True), bloqueo(datos.DIR_VIAJES, compartido=True):
+        version = version_datos()
+        ruta = os.path.join(DIR_RESPALDOS, f"respaldo_{version}.tar.gz")
+        if not os.path.exists(ruta):
+            escribir_atomico(ruta, lambda tmp: _armar(tmp, version))
+            # Sólo se conserva el respaldo de la versión vigente
+            for nombre in os.listdir(DIR_RESPALDOS):
+                if nombre.startswith("respaldo_") and nombre.endswith(".tar.gz") and nombre != os.path.basename(ruta):
+                    os.remove(os.path.join(DIR_RESPALDOS, nombre))
+    return ruta
+
+
+def leer_respaldo():
+    """Bytes del respaldo vigente (para st.download_button); el archivo se cierra al leerlo."""
+    with open(generar_respaldo(), "rb") as archivo:
+        return archivo.read()
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from picus.costos import PARAMETROS_SENSIBLES, descomponer_utilidad, parametro
+
+# ==============================
+# Análisis de sensibilidad (qué pasaría si...)
+# ==============================
+# La utilidad de cada ruta es lineal en el tipo de cambio, el pago por KM y
+# el costo del diesel por KM (diesel / rendimiento), así que basta descomponerla
+# una vez y evaluar la malla completa con broadcasting rutas × puntos. Las
+# rutas se procesan por bloques para acotar la memoria de la matriz.
+
+RANGOS_SUGERIDOS = {
+    "Costo Diesel": (20.0, 30.0),
+    "Tipo de cambio USD": (16.0, 20.0),
+    "Rendimiento Camion": (2.0, 3.5),
+    "Pago x KM (General)": (1.0, 2.5),
+}
+CELDAS_POR_BLOQUE = 4_000_000  # rutas × puntos evaluados a la vez (~32 MB por matriz)
+
+
+def malla(ejes, valores):
+    """Puntos de la malla: un array por parámetro sensible, todos con la misma forma.
+
+    `ejes` es {parámetro: valores} con uno o dos parámetros; los demás quedan
+    en su valor de `valores`.
+    """
+    desconocidos = set(ejes) - set(PARAMETROS_SENSIBLES)
+    if desconocidos:
+        raise ValueError(f"Parámetros no soportados: {', '.join(sorted(desconocidos))}")
+    mallas = np.meshgrid(*[np.asarray(v, dtype="float64") for v in ejes.values()], indexing="ij")
+    forma = mallas[0].shape
+    puntos = {clave: np.full(forma, parametro(valores, clave)) for clave in PARAMETROS_SENSIBLES}
+    puntos.update(zip(ejes, mallas))
+    return puntos
+
+
+def barrido(df, valores, ejes, modo=None, indirectos=False):
+    """Evalúa la utilidad de todas las rutas de `df` en cada punto de la malla de `ejes`.
+
+    Regresa un DataFrame con una fila por punto: los parámetros barridos,
+    Ingreso, Utilidad, % Margen, No rentables (utilidad < 0) y Se vuelven no
+    rentables (las que hoy tienen utilidad >= 0 y en ese punto ya no).
+    """
+    puntos = malla(ejes, valores)
+    usd = puntos["Tipo de cambio USD"].ravel()
+    diesel_km = (puntos["Costo Diesel"] / puntos["Rendimiento Camion"]).ravel()
+    pago_km = puntos["Pago x KM (General)"].ravel()
+
+    c = descomponer_utilidad(df, valores, modo=modo, indirectos=indirectos)
+    actual = (c["fijo"] + c["por_usd"] * parametro(valores, "Tipo de cambio USD")
+              - c["km_diesel"] * parametro(valores, "Costo Diesel") / parametro(valores, "Rendimiento Camion")
+              - c["km_pagados"] * parametro(valores, "Pago x KM (General)"))
+    rentable_hoy = actual >= 0
+
+    utilidad = np.zeros(usd.size)
+    no_rentables = np.zeros(usd.size, dtype="int64")
+    nuevas = np.zeros(usd.size, dtype="int64")
+    bloque = max(1, CELDAS_POR_BLOQUE // max(usd.size, 1))
+    for inicio in range(0, len(df), bloque):
+        s = slice(inicio, inicio + bloque)
+        # (rutas del bloque, 1) contra (1, puntos): una matriz por bloque
+        u = (c["fijo"][s, None] + c["por_usd"][s, None] * usd
+             - c["km_diesel"][s, None] * diesel_km - c["km_pagados"][s, None] * pago_km)
+        utilidad += u.sum(axis=0)
+        perdida = u < 0
+        no_rentables += perdida.sum(axis=0)
+        nuevas += perdida[rentable_hoy[s]].sum(axis=0)
+
+    ingreso = c["ingreso_fijo"].sum() + c["ingreso_usd"].sum() * usd
+    resultado = pd.DataFrame({clave: puntos[clave].ravel() for clave in ejes})
+    resultado["Ingreso"] = ingreso
+    resultado["Utilidad"] = utilidad
+    resultado["% Margen"] = np.round(np.divide(utilidad * 100, ingreso, out=np.full(usd.size, np.nan), where=ingreso != 0), 2)
+    resultado["No rentables"] = no_rentables
+    resultado["Se vuelven no rentables"] = nuevas
+    return resultado
@@ -0,0 +1,384 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from picus import almacen, datos
+from picus.almacen import ErrorImportacion
+from picus.costos import detalle_vuelta, resumen_utilidad
+from picus.cotizacion import MARGEN_BRUTO_MINIMO, MARGEN_NETO_MINIMO, MODOS, cotizar_lote, normalizar_carriles
+from picus.regresos import sugerir_regresos
+from picus.viajes import totales_tramos
+
+# ==============================
+# Servicio HTTP de cotización (ASGI)
+# ==============================
+# La misma lógica de costos de las páginas, para que el TMS pregunte por
+# HTTP cuánto cuesta un carril, cómo queda una vuelta o con qué regresar.
+# Lee los mismos archivos que la app (directorio de trabajo o --datos): el
+# catálogo se queda en memoria como la instantánea compartida de datos y se
+# vuelve a armar sola cuando los archivos cambian.
+#
+# Cada endpoint recibe un objeto o una lista de objetos (lote) y responde
+# igual. El cálculo con pandas corre en el pool de hilos para no bloquear
+# el ciclo de eventos, y los /cotizar concurrentes se costean juntos.
+# Requiere starlette y uvicorn (vienen con streamlit).
+#
+#   GET  /salud      versión y tamaño del catálogo en memoria
+#   POST /cotizar    carriles (mismas columnas que la cotización por lote)
+#   POST /vuelta     {"tramos": [ID_Ruta o carril, ...], "modo": "Operador"|"Team"}
+#   POST /regresos   {"ida": ID_Ruta o carril, "top_k": 5}
+#
+# Uso: python -m picus.servicio [--datos DIR] [--host H] [--port P] [--workers N]
+
+MAX_LOTE = 5_000
+TOP_K_MAXIMO = 50
+
+COLUMNAS_RESPUESTA = [
+    "ID_Ruta", "Tipo", "Cliente", "Origen", "Destino", "Modo_Viaje", "KM",
+    "Ingreso Total", "Costo_Total_Ruta", "Utilidad", "% Utilidad"
+]
+
+
+class SolicitudInvalida(ValueError):
+    """El cuerpo de la solicitud no tiene la forma esperada."""
+
+
+class RutaNoEncontrada(LookupError):
+    pass
+
+
+def _registros(df):
+    # to_json ya convierte NaN en null, fechas a ISO y tipos de numpy/Arrow a JSON
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+def _numeros(resumen):
+    return {clave: None if pd.isna(valor) else round(float(valor), 2) for clave, valor in resumen.items()}
+
+
+# ==============================
+# Búsqueda por ID_Ruta en la instantánea vigente
+# ==============================
+
+_posiciones = (None, {})
+_lock_posiciones = threading.Lock()
+
+
+def _posiciones_por_id(instantanea):
+    global _posiciones
+    version, posiciones = _posiciones
+    if version == instantanea.version:
+        return posiciones
+    with _lock_posiciones:
+        version, posiciones = _posiciones
+        if version != instantanea.version:
+            ids = instantanea.rutas["ID_Ruta"].astype(object).to_numpy()
+            # Si un ID se repite gana su primera aparición, como en el buscador de la consulta
+            posiciones = {ids[i]: i for i in range(len(ids) - 1, -1, -1)}
+            _posiciones = (instantanea.version, posiciones)
+    return posiciones
+
+
+def _ruta_del_catalogo(instantanea, id_ruta):
+    posicion = _posiciones_por_id(instantanea).get(id_ruta)
+    if posicion is None:
+        raise RutaNoEncontrada(f"La ruta {id_ruta} no existe en el catálogo")
+    return instantanea.rutas.iloc[posicion].to_dict()
+
+
+def _validar_carriles(objetos):
+    if not objetos or not all(isinstance(o, dict) for o in objetos):
+        raise SolicitudInvalida("Se esperaba un carril (objeto) o una lista de carriles")
+    if len(objetos) > MAX_LOTE:
+        raise SolicitudInvalida(f"El lote admite hasta {MAX_LOTE:,} carriles")
+
+
+def _carriles(objetos, valores, margen_bruto=MARGEN_BRUTO_MINIMO, margen_neto=MARGEN_NETO_MINIMO):
+    """Carriles cotizados (DataFrame) de una lista de dicts; los errores numeran los carriles desde 1."""
+    _validar_carriles(objetos)
+    carriles, _ = normalizar_carriles(pd.DataFrame(objetos), fila_inicial=1)
+    return cotizar_lote(carriles, valores, margen_bruto, margen_neto)
+
+
+def _tramo(instantanea, valores, referencia):
+    """Ruta del catálogo (por ID_Ruta) o carril capturado en la solicitud, ya costeado."""
+    if isinstance(referencia, str):
+        return _ruta_del_catalogo(instantanea, referencia)
+    if isinstance(referencia, dict):
+        tramo = _carriles([referencia], valores).iloc[0].to_dict()
+        tramo.setdefault("Cliente", None)
+        return tramo
+    raise SolicitudInvalida("Cada tramo es un ID_Ruta o un carril (objeto)")
+
+
+def _lote(cuerpo, llave):
+    """(lista de solicitudes, si venía como lote); admite un objeto suelto o una lista."""
+    if isinstance(cuerpo, list):
+        if len(cuerpo) > MAX_LOTE:
+            raise SolicitudInvalida(f"El lote admite hasta {MAX_LOTE:,} elementos")
+        if not all(isinstance(s, dict) and llave in s for s in cuerpo):
+            raise SolicitudInvalida(f"Cada elemento del lote necesita '{llave}'")
+        return cuerpo, True
+    if isinstance(cuerpo, dict) and llave in cuerpo:
+        return [cuerpo], False
+    raise SolicitudInvalida(f"Se esperaba un objeto con '{llave}' o una lista de ellos")
+
+
+# ==============================
+# Cálculos (corren en el pool de hilos)
+# ==============================
+
+def cotizar(carriles, margen_bruto=MARGEN_BRUTO_MINIMO, margen_neto=MARGEN_NETO_MINIMO):
+    """Todos los carriles con una sola llamada a cotizar_lote, con los datos generales vigentes."""
+    return _registros(_carriles(carriles, datos.cargar_datos_generales(), margen_bruto, margen_neto))
+
+
+def cotizar_agrupado(solicitudes):
+    """Resultado (o excepción) por solicitud de varias (carriles, márgenes) costeadas juntas.
+
+    Las de los mismos márgenes van en una sola llamada a cotizar; si alguna trae
+    un carril inválido ese grupo se repite por solicitud, para que cada una
+    reciba sus propios errores con la numeración de su cuerpo.
+    """
+    resultados = [None] * len(solicitudes)
+    grupos = {}
+    for i, (_, margenes) in enumerate(solicitudes):
+        grupos.setdefault(margenes, []).append(i)
+    for margenes, indices in grupos.items():
+        try:
+            registros = iter(cotizar([c for i in indices for c in solicitudes[i][0]], *margenes))
+            for i in indices:
+                resultados[i] = [next(registros) for _ in solicitudes[i][0]]
+        except (SolicitudInvalida, ErrorImportacion):
+            for i in indices:
+                try:
+                    resultados[i] = cotizar(solicitudes[i][0], *margenes)
+                except (SolicitudInvalida, ErrorImportacion) as exc:
+                    resultados[i] = exc
+    return resultados
+
+
+class AgrupadorCotizaciones:
+    """Junta en una sola llamada los /cotizar que llegan mientras se calcula el anterior.
+
+    Con un carril por solicitud casi todo el tiempo es costo fijo de pandas;
+    costeados juntos, cada solicitud concurrente paga una fracción. No hay
+    espera artificial: con una sola solicitud en curso se calcula de inmediato.
+    """
+
+    def __init__(self):
+        self._pendientes = []
+        self._corriendo = False
+
+    async def cotizar(self, carriles, margenes):
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.append((carriles, margenes, futuro))
+        if not self._corriendo:
+            self._corriendo = True
+            asyncio.get_running_loop().create_task(self._vaciar())
+        return await futuro
+
+    async def _vaciar(self):
+        try:
+            while self._pendientes:
+                pendientes, self._pendientes = self._pendientes, []
+                try:
+                    resultados = await run_in_threadpool(cotizar_agrupado, [(c, m) for c, m, _ in pendientes])
+                except Exception as exc:  # noqa: BLE001 - se entrega a cada solicitud en lugar de perderse en la tarea
+                    resultados = [exc] * len(pendientes)
+                for (_, _, futuro), resultado in zip(pendientes, resultados):
+                    if futuro.done():
+                        continue
+                    if isinstance(resultado, Exception):
+                        futuro.set_exception(resultado)
+                    else:
+                        futuro.set_result(resultado)
+        finally:
+            self._corriendo = False
+
+
+def simular_vuelta(solicitud, instantanea, valores):
+    """Desglose por tramo y utilidad de una vuelta, como el Simulador Vuelta Redonda."""
+    tramos = solicitud["tramos"]
+    if not isinstance(tramos, list) or not tramos:
+        raise SolicitudInvalida("'tramos' debe ser una lista con al menos un tramo")
+    modo = solicitud.get("modo", "Operador")
+    if modo not in MODOS:
+        raise SolicitudInvalida(f"'modo' debe ser {' o '.join(MODOS)}")
+    detalle = detalle_vuelta([_tramo(instantanea, valores, t) for t in tramos], valores, modo=modo)
+    return {
+        "modo": modo,
+        "tramos": _registros(detalle),
+        "totales": _numeros(resumen_utilidad(detalle["Ingreso"].sum(), detalle["Total Ruta"].sum())),
+    }
+
+
+def _escalar(valor):
+    if isinstance(valor, pd.Timestamp):
+        return valor.isoformat()
+    if valor is None or pd.isna(valor):
+        return None
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def sugerir(solicitud, instantanea, valores):
+    """Regresos directos o con vacío para una ida, como los ofrece Programación de Viajes."""
+    top_k = solicitud.get("top_k", 5)
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= TOP_K_MAXIMO:
+        raise SolicitudInvalida(f"'top_k' debe ser un entero entre 1 y {TOP_K_MAXIMO}")
+    ida = _tramo(instantanea, valores, solicitud["ida"])
+    rutas = instantanea.rutas
+    directas, combos = sugerir_regresos(ida, rutas, instantanea.indice, top_k=top_k)
+
+    # Cada opción son posiciones del catálogo: [regreso] o [vacío, regreso]
+    if combos.empty:
+        opciones = [[p] for p in rutas.index.get_indexer(directas.index[:top_k])]
+    else:
+        opciones = combos[["pos_vacio", "pos_regreso"]].astype(int).to_numpy().tolist()
+    # Una sola conversión a JSON para todas las rutas de la respuesta
+    posiciones = [p for opcion in opciones for p in opcion]
+    registros = iter(_registros(rutas.iloc[posiciones].reindex(columns=COLUMNAS_RESPUESTA)))
+    ida = {columna: _escalar(ida.get(columna)) for columna in COLUMNAS_RESPUESTA}
+    respuesta = []
+    for opcion in opciones:
+        tramos = [next(registros) for _ in opcion]
+        respuesta.append({"tramos": tramos, "totales": _numeros(totales_tramos([ida] + tramos))})
+    return {"ida": ida, "con_vacio": not combos.empty, "opciones": respuesta}
+
+
+def _en_lote(funcion, solicitudes):
+    # Una sola lectura de la instantánea y los datos generales para todo el lote
+    instantanea = datos.instantanea_catalogo()
+    valores = datos.cargar_datos_generales()
+    return [funcion(solicitud, instantanea, valores) for solicitud in solicitudes]
+
+
+# ==============================
+# Endpoints
+# ==============================
+
+async def _cuerpo(request):
+    try:
+        return await request.json()
+    except (ValueError, UnicodeDecodeError):
+        raise SolicitudInvalida("El cuerpo debe ser JSON")
+
+
+def _margen(request, nombre, por_defecto):
+    valor = request.query_params.get(nombre)
+    try:
+        return por_defecto if valor is None else float(valor)
+    except ValueError:
+        raise SolicitudInvalida(f"'{nombre}' debe ser numérico")
+
+
+async def salud(request):
+    def leer():
+        if not almacen.existe_catalogo():
+            return {"ok": True, "rutas": 0, "version_catalogo": None}
+        instantanea = datos.instantanea_catalogo()
+        return {"ok": True, "rutas": len(instantanea.rutas), "version_catalogo": instantanea.version}
+    return JSONResponse(await run_in_threadpool(leer))
+
+
+async def endpoint_cotizar(request):
+    cuerpo = await _cuerpo(request)
+    es_lote = isinstance(cuerpo, list)
+    carriles = cuerpo if es_lote else [cuerpo]
+    _validar_carriles(carriles)
+    margenes = (_margen(request, "margen_bruto", MARGEN_BRUTO_MINIMO),
+                _margen(request, "margen_neto", MARGEN_NETO_MINIMO))
+    resultado = await request.app.state.agrupador.cotizar(carriles, margenes)
+    return JSONResponse(resultado if es_lote else resultado[0])
+
+
+async def endpoint_vuelta(request):
+    solicitudes, es_lote = _lote(await _cuerpo(request), "tramos")
+    resultado = await run_in_threadpool(_en_lote, simular_vuelta, solicitudes)
+    return JSONResponse(resultado if es_lote else resultado[0])
+
+
+async def endpoint_regresos(request):
+    solicitudes, es_lote = _lote(await _cuerpo(request), "ida")
+    resultado = await run_in_threadpool(_en_lote, sugerir, solicitudes)
+    return JSONResponse(resultado if es_lote else resultado[0])
+
+
+def _error(estado, errores):
+    return JSONResponse({"errores": errores}, status_code=estado)
+
+
+async def _solicitud_invalida(request, exc):
+    # ErrorImportacion trae los errores por carril; SolicitudInvalida, uno solo
+    return _error(400 if isinstance(exc, SolicitudInvalida) else 422, getattr(exc, "errores", [str(exc)]))
+
+
+async def _no_encontrada(request, exc):
+    return _error(404, [str(exc)])
+
+
+def _precargar():
+    datos.cargar_datos_generales()
+    if almacen.existe_catalogo():
+        datos.instantanea_catalogo()
+
+
+@contextlib.asynccontextmanager
+async def _ciclo_de_vida(app):
+    # Arma la instantánea y lee los datos generales antes de la primera solicitud
+    app.state.agrupador = AgrupadorCotizaciones()
+    await run_in_threadpool(_precargar)
+    yield
+
+
+def crear_app():
+    return Starlette(
+        routes=[
+            Route("/salud", salud, methods=["GET"]),
+            Route("/cotizar", endpoint_cotizar, methods=["POST"]),
+            Route("/vuelta", endpoint_vuelta, methods=["POST"]),
+            Route("/regresos", endpoint_regresos, methods=["POST"]),
+        ],
+        exception_handlers={
+            SolicitudInvalida: _solicitud_invalida,
+            ErrorImportacion: _solicitud_invalida,
+            RutaNoEncontrada: _no_encontrada,
+        },
+        lifespan=_ciclo_de_vida,
+    )
+
+
+app = crear_app()
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servicio HTTP de cotización PICUS")
+    parser.add_argument("--datos", default=".", help="carpeta con los archivos de la app (catálogo, datos generales)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=1, help="procesos; cada uno guarda su copia del catálogo")
+    args = parser.parse_args(argv)
+
+    # Los procesos de uvicorn importan picus.servicio:app después del cambio de carpeta
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if raiz not in sys.path:
+        sys.path.insert(0, raiz)
+    os.chdir(args.datos)
+    uvicorn.run("picus.servicio:app", host=args.host, port=args.port, workers=args.workers,
+                log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from picus.costos import COLUMNAS_EXTRAS, VALORES_POR_DEFECTO, calcular_costos
+from picus.viajes import CAMPOS_DE_IDA
+
+# ==============================
+# Catálogos sintéticos para benchmarks
+# ==============================
+
+
+def ciudades(n):
+    return np.array([f"CIUDAD_{i:03d}" for i in range(n)], dtype=object)
+
+
+def generar_rutas(n, n_ciudades=50, n_clientes=200, semilla=0, valores=None):
+    """Catálogo de `n` rutas con las mismas columnas que captura la página de rutas."""
+    rng = np.random.default_rng(semilla)
+    nombres = ciudades(n_ciudades)
+    origen = rng.integers(0, n_ciudades, n)
+    destino = (origen + rng.integers(1, n_ciudades, n)) % n_ciudades
+    tipo = rng.choice(np.array(["IMPO", "EXPO", "VACIO"], dtype=object), n, p=[0.4, 0.4, 0.2])
+    vacio = tipo == "VACIO"
+    km = rng.uniform(30, 1500, n).round(1)
+    moneda = rng.choice(np.array(["MXN", "USD"], dtype=object), n)
+    ingreso = np.where(vacio, 0.0, km * rng.uniform(20, 45, n) / np.where(moneda == "USD", 17.5, 1.0)).round(2)
+    df = pd.DataFrame({
+        "ID_Ruta": [f"s{i:09d}" for i in range(n)],
+        "Fecha": (pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 900, n), unit="D")).strftime("%Y-%m-%d"),
+        "Tipo": tipo,
+        "Cliente": np.array([f"CLIENTE_{i:04d}" for i in range(n_clientes)], dtype=object)[rng.integers(0, n_clientes, n)],
+        "Origen": nombres[origen],
+        "Destino": nombres[destino],
+        "Modo_Viaje": rng.choice(np.array(["Operador", "Team"], dtype=object), n, p=[0.85, 0.15]),
+        "KM": km,
+        "Moneda": moneda,
+        "Ingreso_Original": ingreso,
+        "Moneda_Cruce": "MXN",
+        "Cruce_Original": np.where(vacio, 0.0, rng.choice([0.0, 1500.0, 2500.0], n)),
+        "Moneda Costo Cruce": "MXN",
+        "Costo Cruce": np.where(vacio, 0.0, rng.choice([0.0, 800.0, 1200.0], n)),
+        "Casetas": (km * rng.uniform(0.5, 2.0, n)).round(2),
+    })
+    for columna in COLUMNAS_EXTRAS:
+        df[columna] = np.where(rng.random(n) < 0.1, rng.uniform(100, 1500, n).round(2), 0.0)
+    costos = calcular_costos(df, valores or VALORES_POR_DEFECTO)
+    return pd.concat([df, costos], axis=1)
+
+
+def generar_ida(df_rutas, semilla=0):
+    """Una ruta IMPO/EXPO del catálogo para usar como tramo de ida."""
+    cargadas = df_rutas[df_rutas["Tipo"] != "VACIO"]
+    return cargadas.iloc[int(np.random.default_rng(semilla).integers(0, len(cargadas)))]
+
+
+def generar_viajes(df_rutas, n, semilla=0, concluidos=0.6):
+    """Unos `n` tramos programados: idas IMPO/EXPO y, en la fracción `concluidos`, su vuelta."""
+    rng = np.random.default_rng(semilla)
+    cargadas = df_rutas[df_rutas["Tipo"] != "VACIO"].reset_index(drop=True)
+    n_traficos = max(1, int(round(n / (1 + concluidos))))
+    fechas = (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 540, n_traficos), unit="D")).strftime("%Y-%m-%d")
+    traficos = np.array([f"T{i:08d}" for i in range(n_traficos)], dtype=object)
+    ida = cargadas.iloc[rng.integers(0, len(cargadas), n_traficos)].reset_index(drop=True)
+    ida["Fecha"] = fechas
+    ida["Número_Trafico"] = traficos
+    ida["Unidad"] = np.array([f"U{i:03d}" for i in range(300)], dtype=object)[rng.integers(0, 300, n_traficos)]
+    ida["Operador"] = np.array([f"OPERADOR_{i:03d}" for i in range(300)], dtype=object)[rng.integers(0, 300, n_traficos)]
+    ida["Tramo"] = "IDA"
+    ida["ID_Programacion"] = traficos + "_" + np.asarray(fechas, dtype=object)
+    cerrados = np.flatnonzero(rng.random(n_traficos) < concluidos)[:max(0, n - n_traficos)]
+    vuelta = cargadas.iloc[rng.integers(0, len(cargadas), len(cerrados))].reset_index(drop=True)
+    for campo in CAMPOS_DE_IDA:
+        vuelta[campo] = ida[campo].to_numpy()[cerrados]
+    vuelta["Tramo"] = "VUELTA"
+    return pd.concat([ida, vuelta], ignore_index=True)
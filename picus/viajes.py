@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from picus.costos import COSTOS_INDIRECTOS, resumen_utilidad
+
+# ==============================
+# Tramos de viajes programados
+# ==============================
+
+CAMPOS_DE_IDA = ["Fecha", "Número_Trafico", "Unidad", "Operador", "ID_Programacion"]
+
+
+def armar_tramos_vuelta(ida, tramos):
+    """Filas VUELTA para cerrar el tráfico `ida` con las rutas de `tramos`."""
+    nuevos_tramos = []
+    for tramo in tramos:
+        datos = tramo.copy()
+        for campo in CAMPOS_DE_IDA:
+            datos[campo] = ida[campo]
+        datos["Tramo"] = "VUELTA"
+        nuevos_tramos.append(datos)
+    return pd.DataFrame(nuevos_tramos)
+
+
+# ==============================
+# Estado por tráfico (ID_Programacion)
+# ==============================
+# Tabla mantenida en cada escritura con el número de tramos, estado, fecha y
+# totales de cada tráfico, para no agrupar todo el historial en cada rerun.
+
+PENDIENTE = "PENDIENTE"
+CONCLUIDO = "CONCLUIDO"
+COLUMNAS_ESTADO = ["Tramos", "Estado", "Fecha", "Número_Trafico", "Ingreso Total", "Costo_Total_Ruta"]
+_SUMAS = ["Tramos", "Ingreso Total", "Costo_Total_Ruta"]
+
+
+def _clasificar(estado):
+    estado["Estado"] = np.where(estado["Tramos"] >= 2, CONCLUIDO, PENDIENTE)
+    return estado[COLUMNAS_ESTADO]
+
+
+def resumir_tramos(df):
+    """Estado por ID_Programacion a partir de filas de tramos."""
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS_ESTADO, index=pd.Index([], name="ID_Programacion"))
+    grupos = df.groupby("ID_Programacion", sort=False)
+    estado = pd.DataFrame({
+        "Tramos": grupos.size(),
+        "Fecha": grupos["Fecha"].first(),
+        "Número_Trafico": grupos["Número_Trafico"].first(),
+        "Ingreso Total": grupos["Ingreso Total"].sum(),
+        "Costo_Total_Ruta": grupos["Costo_Total_Ruta"].sum()
+    })
+    return _clasificar(estado)
+
+
+def combinar_estado(estado, df_nueva):
+    """Incorpora tramos recién agregados al estado sin volver a agrupar el historial."""
+    delta = resumir_tramos(df_nueva)
+    if estado.empty:
+        return delta
+    existentes = delta.index.intersection(estado.index)
+    estado = estado.copy()
+    estado.loc[existentes, _SUMAS] = estado.loc[existentes, _SUMAS].to_numpy() + delta.loc[existentes, _SUMAS].to_numpy()
+    estado = pd.concat([estado, delta.drop(existentes)])
+    return _clasificar(estado)
+
+
+# ==============================
+# Totales de tráficos
+# ==============================
+
+def _valor(tramo, columna):
+    valor = tramo.get(columna, 0)
+    return 0.0 if valor is None or pd.isna(valor) else float(valor)
+
+
+def totales_tramos(tramos):
+    """Resumen de utilidad (bruta, indirectos, neta) de un tráfico armado con `tramos`."""
+    ingreso = sum(_valor(t, "Ingreso Total") for t in tramos)
+    costo = sum(_valor(t, "Costo_Total_Ruta") for t in tramos)
+    return resumen_utilidad(ingreso, costo)
+
+
+def resumir_concluidos(df):
+    """Una fila por tráfico con ingreso, costo, utilidad bruta, indirectos y utilidad neta."""
+    resumen = df.groupby(["ID_Programacion", "Número_Trafico", "Fecha"]).agg({
+        "Ingreso Total": "sum",
+        "Costo_Total_Ruta": "sum"
+    }).reset_index()
+
+    resumen["Utilidad Bruta"] = resumen["Ingreso Total"] - resumen["Costo_Total_Ruta"]
+    resumen["% Utilidad Bruta"] = (resumen["Utilidad Bruta"] / resumen["Ingreso Total"] * 100).round(2)
+    resumen["Costos Indirectos (35%)"] = (resumen["Ingreso Total"] * COSTOS_INDIRECTOS).round(2)
+    resumen["Utilidad Neta"] = resumen["Utilidad Bruta"] - resumen["Costos Indirectos (35%)"]
+    resumen["% Utilidad Neta"] = (resumen["Utilidad Neta"] / resumen["Ingreso Total"] * 100).round(2)
+    return resumen